@@ -0,0 +1,151 @@
+""" Contention benchmark of mowhive.shared.ConcurrentMowController.
+
+    python -m benchmarks.bench_concurrent --threads 1,2,4,8 --output concurrent.json
+    python -m benchmarks.bench_concurrent --quick
+
+    The mowers of a seeded scenario are dealt to the threads, which register them all at once and
+    then drive them through their paths with move_mower and rotate_mower, one call per movement.
+    Every thread count is run with striped cell locks and with a single lock (stripes=1), reporting
+    operations per second and the speedup over one thread. A plain MowController driven by one thread
+    gives the cost of the locks themselves. With the GIL the threads take turns and the speedup stays
+    around 1; on a free-threaded build striped locks let it grow with the cores.
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from mowhive.mowcontroller import MowController
+from mowhive.mowerstate import Movements
+from mowhive.shared import ConcurrentMowController
+
+from .scenarios import Scenario, generate_scenario
+
+QUICK = {"fleet": 400, "path_length": 20, "threads": [1, 2, 4]}
+FULL = {"fleet": 10000, "path_length": 50, "threads": [1, 2, 4, 8, 16]}
+
+
+def gil_enabled() -> bool:
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_enabled is None else is_enabled()
+
+
+def consistent(controller: MowController) -> bool:
+    """ Whether the occupancy holds exactly one cell per mower, the one it is in
+    """
+    if len(controller.occupancy) != len(controller.mowers):
+        return False
+    return all(controller.occupancy.get((m.location.x, m.location.y)) == i for i, m in enumerate(controller.mowers))
+
+
+def drive(controller: MowController, scenario: Scenario, mowers: List[int], ids: List[int], barrier: Optional[threading.Barrier]) -> int:
+    # Register the given mowers, wait for the other threads, then run their paths. Returns the calls made
+    for i in mowers:
+        x, y, o, _ = scenario.mowers[i]
+        controller.register_mower(x, y, o)
+        ids[i] = controller.who_is_there(x, y)
+    if barrier is not None:
+        barrier.wait()
+    calls = 0
+    for i in mowers:
+        mow_id = ids[i]
+        for c in scenario.mowers[i][3]:
+            if c == "M":
+                controller.move_mower(mow_id)
+            else:
+                controller.rotate_mower(mow_id, Movements[c])
+            calls += 1
+    return calls
+
+
+def run_case(scenario: Scenario, threads: int, stripes: Optional[int]) -> Dict:
+    """ Time one run. stripes None is a plain MowController, which only a single thread may drive
+    """
+    size = scenario.plateau_size
+    if stripes is None:
+        controller = MowController(size[0], size[1], ignore_unregisterable_mowers=True)
+    else:
+        controller = ConcurrentMowController(size[0], size[1], ignore_unregisterable_mowers=True, stripes=stripes)
+    ids = [0] * len(scenario.mowers)
+    calls = [0] * threads
+    # Two barriers: every thread registered, then every thread finished
+    registered = threading.Barrier(threads + 1)
+    finished = threading.Barrier(threads + 1)
+
+    def worker(t: int):
+        calls[t] = drive(controller, scenario, list(range(t, len(scenario.mowers), threads)), ids, registered)
+        finished.wait()
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    registered.wait()
+    start = time.perf_counter()
+    finished.wait()
+    seconds = time.perf_counter() - start
+    for w in workers:
+        w.join()
+    return {
+        "controller": "plain" if stripes is None else f"stripes={stripes}",
+        "threads": threads,
+        "calls": sum(calls),
+        "seconds": seconds,
+        "calls_per_second": sum(calls) / seconds if seconds else float("inf"),
+        "consistent": consistent(controller),
+    }
+
+
+def run_suite(quick: bool = False, seed: int = 0, threads: Optional[List[int]] = None, stripes: int = 256) -> Dict:
+    params = QUICK if quick else FULL
+    scenario = generate_scenario(seed, params["fleet"], params["path_length"])
+    cases = [run_case(scenario, 1, None)]
+    for n in stripes, 1:
+        base = None
+        for t in threads or params["threads"]:
+            case = run_case(scenario, t, n)
+            base = base or case["calls_per_second"]
+            case["speedup"] = case["calls_per_second"] / base
+            cases.append(case)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "gil": gil_enabled(),
+            "quick": quick,
+            "seed": seed,
+            "fleet": params["fleet"],
+            "path_length": params["path_length"],
+        },
+        "cases": cases,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_concurrent", description="Benchmark ConcurrentMowController under contention.")
+    parser.add_argument("--quick", action="store_true", help="small fleet, runs in about a second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", help="comma separated thread counts")
+    parser.add_argument("--stripes", type=int, default=256, help="cell locks of the striped controller")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    threads = [int(t) for t in args.threads.split(",")] if args.threads else None
+    results = run_suite(args.quick, args.seed, threads, args.stripes)
+    print(f"python {results['meta']['python']}, GIL {'enabled' if results['meta']['gil'] else 'disabled'}")
+    for c in results["cases"]:
+        speedup = f"x{c['speedup']:.2f}" if "speedup" in c else ""
+        print(f"{c['controller']:<12} threads={c['threads']:<3} {c['calls_per_second']:>12.0f} calls/s {speedup}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    # A run that broke the occupancy is a bug, not a slow run
+    return 0 if all(c["consistent"] for c in results["cases"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
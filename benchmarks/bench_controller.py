@@ -0,0 +1,272 @@
+""" Benchmarks for the MowController hot paths.
+
+    python -m benchmarks.bench_controller --output results.json
+    python -m benchmarks.bench_controller --quick --compare results.json
+
+    python -m benchmarks.bench_controller --path-lengths 50,100,200 --densities 0.05,0.2 --plateau-sizes 100,400
+
+    Every case reports steps per second and peak traced memory, run_batch cases also their
+    speedup over move_swarm on the same scenario. move_swarm is swept along four axes, one at a
+    time, and a scaling exponent is fitted along each (time ~ value ** exponent):
+    - fleet: growing fleets at a fixed density and path length, also for the other hot paths
+    - path_length: longer routes for a fixed fleet and density
+    - density: more mowers on a fixed plateau
+    - plateau: a fixed fleet spread over growing plateaus, fitted against the number of cells
+    ABORT_ON_COLLITIONS runs on lanes, which have no density nor plateau of their own, so it is only
+    swept along fleet and path_length. Results are written as JSON so two runs can be diffed with --compare.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mowhive.mowcontroller import MowController
+from mowhive.mowerstate import CollitionProtocols, PathProgram
+
+from .scenarios import Scenario, generate_scenario
+
+# The sweeps other than fleet run sweep_fleet mowers, with path_length movements and at the given density
+QUICK = {"fleets": [10, 40, 160], "path_length": 20, "repeat": 1, "sweep_fleet": 40,
+         "path_lengths": [10, 20, 40], "densities": [0.05, 0.1, 0.2], "plateau_sizes": [20, 40, 80]}
+FULL = {"fleets": [1000, 4000, 16000, 64000], "path_length": 200, "repeat": 3, "sweep_fleet": 4000,
+        "path_lengths": [50, 100, 200, 400, 800], "densities": [0.01, 0.05, 0.1, 0.2, 0.4], "plateau_sizes": [100, 200, 400, 800]}
+# Case field each sweep is fitted against
+AXES = {"fleet": "fleet", "path_length": "path_length", "density": "density", "plateau": "cells"}
+
+
+def build(scenario: Scenario, protocol: CollitionProtocols) -> MowController:
+    controller = MowController(scenario.plateau_size[0], scenario.plateau_size[1], collition_protocol=protocol)
+    for x, y, o, path in scenario.mowers:
+        controller.register_mower(x, y, o, PathProgram.from_string(path))
+    return controller
+
+
+def measure(setup: Callable[[], object], run: Callable[[object], None], repeat: int):
+    """ Returns the best wall time of run over repeat fresh setups, and the peak memory of one more traced run
+    """
+    best = math.inf
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+
+    state = setup()
+    tracemalloc.start()
+    run(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def case(name: str, protocol: Optional[CollitionProtocols], scenario: Scenario, steps: int, seconds: float, peak: int) -> Dict:
+    cells = (scenario.plateau_size[0] + 1) * (scenario.plateau_size[1] + 1)
+    return {
+        "name": name,
+        "protocol": protocol.name if protocol else None,
+        "sweep": "fleet",
+        "plateau": list(scenario.plateau_size),
+        "cells": cells,
+        "fleet": len(scenario.mowers),
+        "density": len(scenario.mowers) / cells,
+        "path_length": len(scenario.mowers[0][3]) if scenario.mowers else 0,
+        "steps": steps,
+        "seconds": seconds,
+        "steps_per_second": steps / seconds if seconds else math.inf,
+        "peak_bytes": peak,
+    }
+
+
+def bench_register(scenario: Scenario, repeat: int) -> Dict:
+    def run(controller):
+        for x, y, o, _ in scenario.mowers:
+            controller.register_mower(x, y, o)
+    setup = lambda: MowController(scenario.plateau_size[0], scenario.plateau_size[1])
+    seconds, peak = measure(setup, run, repeat)
+    return case("register_mower", None, scenario, len(scenario.mowers), seconds, peak)
+
+
+def bench_move_mower(scenario: Scenario, repeat: int) -> Dict:
+    # One single step move per movement in the scenario, straight on the controller API
+    def run(controller):
+        for i in range(len(scenario.mowers)):
+            for _ in range(len(scenario.mowers[i][3])):
+                controller.move_mower(i)
+    seconds, peak = measure(lambda: build(scenario, CollitionProtocols.STOP_ON_COLLITIONS), run, repeat)
+    return case("move_mower", None, scenario, scenario.steps, seconds, peak)
+
+
+def bench_move_swarm(scenario: Scenario, protocol: CollitionProtocols, repeat: int) -> Dict:
+    seconds, peak = measure(lambda: build(scenario, protocol), lambda c: c.move_swarm(), repeat)
+    return case("move_swarm", protocol, scenario, scenario.steps, seconds, peak)
+
+
+def bench_run_batch(scenario: Scenario, repeat: int) -> Dict:
+    from mowhive.engine import run_batch
+    protocol = CollitionProtocols.STOP_ON_COLLITIONS
+    seconds, peak = measure(lambda: build(scenario, protocol), run_batch, repeat)
+    return case("run_batch", protocol, scenario, scenario.steps, seconds, peak)
+
+
+def scaling_exponent(cases: List[Dict], axis: str = "fleet") -> Optional[float]:
+    """ Least squares slope of log(seconds) against the log of an axis of the cases
+
+        :param axis: one of AXES
+    """
+    field = AXES[axis]
+    points = [(math.log(c[field]), math.log(c["seconds"])) for c in cases if c["seconds"] > 0]
+    if len(points) < 2:
+        return None
+    mx = sum(p[0] for p in points) / len(points)
+    my = sum(p[1] for p in points) / len(points)
+    den = sum((p[0] - mx) ** 2 for p in points)
+    return sum((p[0] - mx) * (p[1] - my) for p in points) / den if den else None
+
+
+def sweep(axis: str, values: List, scenario_for: Callable[[object, str], Scenario], protocols: List[CollitionProtocols], repeat: int) -> Tuple[List[Dict], Dict]:
+    """ move_swarm cases along one axis for each protocol, and their scaling exponents
+
+        :param scenario_for: gives the scenario of a value of the axis and a layout
+    """
+    cases = []
+    scaling = {}
+    for protocol in protocols:
+        # ABORT stops on the first collition, lanes never collide so the whole route is executed
+        layout = "lanes" if protocol is CollitionProtocols.ABORT_ON_COLLITIONS else "random"
+        protocol_cases = []
+        for value in values:
+            c = bench_move_swarm(scenario_for(value, layout), protocol, repeat)
+            c["sweep"] = axis
+            protocol_cases.append(c)
+        scaling[protocol.name] = scaling_exponent(protocol_cases, axis)
+        cases.extend(protocol_cases)
+    return cases, scaling
+
+
+def run_suite(quick: bool = False, seed: int = 0, density: float = 0.1, path_lengths: Optional[List[int]] = None,
+              densities: Optional[List[float]] = None, plateau_sizes: Optional[List[int]] = None) -> Dict:
+    """ Run every case. The sweep values default to the QUICK or FULL ones
+
+        :param density: fraction of plateau cells holding a mower, except along the density sweep
+        :param path_lengths: movements per mower along the path_length sweep
+        :param densities: densities along the density sweep
+        :param plateau_sizes: plateau sides along the plateau sweep
+    """
+    params = QUICK if quick else FULL
+    path_length, fleet, repeat = params["path_length"], params["sweep_fleet"], params["repeat"]
+    path_lengths = path_lengths or params["path_lengths"]
+    densities = densities or params["densities"]
+    plateau_sizes = plateau_sizes or params["plateau_sizes"]
+    protocols = list(CollitionProtocols)
+    spread = [p for p in protocols if p is not CollitionProtocols.ABORT_ON_COLLITIONS]
+    # The density sweep plateau is the one of sweep_fleet mowers at the default density
+    side = max(1, int((fleet / density) ** 0.5))
+
+    cases = []
+    scaling = {}
+    sweeps = [
+        ("fleet", params["fleets"], lambda n, layout: generate_scenario(seed, n, path_length, density=density, layout=layout), protocols),
+        ("path_length", path_lengths, lambda n, layout: generate_scenario(seed, fleet, n, density=density, layout=layout), protocols),
+        ("density", densities, lambda d, layout: generate_scenario(seed, max(1, int(d * (side + 1) ** 2)), path_length, plateau_size=(side, side)), spread),
+        ("plateau", plateau_sizes, lambda n, layout: generate_scenario(seed, fleet, path_length, plateau_size=(n, n)), spread),
+    ]
+    for axis, values, scenario_for, axis_protocols in sweeps:
+        axis_cases, scaling[axis] = sweep(axis, values, scenario_for, axis_protocols, repeat)
+        cases.extend(axis_cases)
+
+    # The batch engine on the STOP_ON_COLLITIONS fleet scenarios, with its speedup over move_swarm
+    batch_cases = []
+    stop_cases = [c for c in cases if c["sweep"] == "fleet" and c["protocol"] == CollitionProtocols.STOP_ON_COLLITIONS.name]
+    for n, reference in zip(params["fleets"], stop_cases):
+        scenario = generate_scenario(seed, n, path_length, density=density)
+        batch = bench_run_batch(scenario, repeat)
+        batch["speedup"] = batch["steps_per_second"] / reference["steps_per_second"]
+        batch_cases.append(batch)
+    scaling["fleet"]["run_batch"] = scaling_exponent(batch_cases)
+    cases.extend(batch_cases)
+
+    register_cases = []
+    for n in params["fleets"]:
+        scenario = generate_scenario(seed, n, path_length, density=density)
+        register_cases.append(bench_register(scenario, repeat))
+        cases.append(bench_move_mower(scenario, repeat))
+    scaling["fleet"]["register_mower"] = scaling_exponent(register_cases)
+    cases.extend(register_cases)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "quick": quick,
+            "seed": seed,
+            "density": density,
+            "path_lengths": path_lengths,
+            "densities": densities,
+            "plateau_sizes": plateau_sizes,
+        },
+        "cases": cases,
+        "scaling": scaling,
+    }
+
+
+def label(c: Dict) -> str:
+    # The value of the case along its sweep
+    sweep = c.get("sweep", "fleet")
+    value = f"{c['density']:.3f}" if sweep == "density" else c["plateau"][0] if sweep == "plateau" else c[sweep]
+    return f"{sweep}={value:<8}"
+
+
+def compare(old: Dict, new: Dict) -> List[str]:
+    """ Lines comparing steps per second of the cases present in both results
+    """
+    key = lambda c: (c["name"], c["protocol"], c.get("sweep", "fleet"), c["fleet"], c["path_length"], tuple(c["plateau"]))
+    before = {key(c): c for c in old["cases"]}
+    out = []
+    for c in new["cases"]:
+        b = before.get(key(c))
+        if b is None:
+            continue
+        ratio = c["steps_per_second"] / b["steps_per_second"]
+        out.append(f"{c['name']:<14} {c['protocol'] or '-':<20} {label(c)} {b['steps_per_second']:>14.0f} -> {c['steps_per_second']:>14.0f} steps/s  x{ratio:.2f}")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_controller", description="Benchmark the MowController hot paths.")
+    parser.add_argument("--quick", action="store_true", help="small sizes, runs in about a second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--density", type=float, default=0.1, help="fraction of plateau cells holding a mower")
+    parser.add_argument("--path-lengths", help="comma separated movements per mower of the path_length sweep")
+    parser.add_argument("--densities", help="comma separated densities of the density sweep")
+    parser.add_argument("--plateau-sizes", help="comma separated plateau sides of the plateau sweep")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    path_lengths = [int(n) for n in args.path_lengths.split(",")] if args.path_lengths else None
+    densities = [float(d) for d in args.densities.split(",")] if args.densities else None
+    plateau_sizes = [int(n) for n in args.plateau_sizes.split(",")] if args.plateau_sizes else None
+    results = run_suite(args.quick, args.seed, args.density, path_lengths, densities, plateau_sizes)
+    for c in results["cases"]:
+        speedup = f" x{c['speedup']:.2f}" if "speedup" in c else ""
+        print(f"{c['name']:<14} {c['protocol'] or '-':<20} {label(c)} {c['steps_per_second']:>14.0f} steps/s {c['peak_bytes'] / 1024:>10.1f} KiB{speedup}")
+    for axis, exponents in results["scaling"].items():
+        for name, exponent in exponents.items():
+            print(f"scaling {axis:<12} {name:<20} {'n/a' if exponent is None else f'{exponent:.2f}'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), results)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+""" Startup time of `python main.py`, which job schedulers start very often.
+
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --compare startup.json --tolerance 0.2
+
+    Every run is a new interpreter executing main.py on a two mower scenario. The wall times of the
+    runs are reported together with the modules main.py imported and the slowest ones to import,
+    from `python -X importtime`. Optional backends (NumPy, asyncio, process pools...) must not be
+    imported at all: the exit status is 1 if one is or, with --compare, if main.py got slower than
+    in the previous run by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+SCENARIO = b"5 5\n1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n"
+
+# Modules that main.py has no use for in text mode
+FORBIDDEN = ("numpy", "asyncio", "concurrent.futures", "multiprocessing", "mowhive.binary", "mowhive.cache", "mowhive.checkpoint",
+             "mowhive.engine", "mowhive.coverage", "mowhive.analysis", "mowhive.partition", "mowhive.planner",
+             "mowhive.live", "mowhive.batch", "mowhive.trace", "mowhive.history", "mowhive.shared")
+
+
+def run_main(args: Tuple[str, ...] = (), python_args: Tuple[str, ...] = ()) -> Tuple[float, bytes, bytes]:
+    """ Run main.py in a new interpreter, returns its wall time, standard output and standard error
+    """
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, *python_args, MAIN, *args], input=SCENARIO, capture_output=True, cwd=ROOT, check=True)
+    return time.perf_counter() - start, done.stdout, done.stderr
+
+
+def import_times(stderr: bytes) -> Dict[str, int]:
+    """ Cumulative import time in microseconds of every module, from the output of python -X importtime
+    """
+    out = {}
+    for line in stderr.decode().splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        out[name.strip()] = int(cumulative)
+    return out
+
+
+def run_suite(runs: int = 20) -> Dict:
+    run_main()    # Write the bytecode caches
+    times = sorted(run_main()[0] for _ in range(runs))
+    baseline = sorted(_bare_interpreter() for _ in range(runs))
+    modules = import_times(run_main(python_args=("-X", "importtime"))[2])
+    slowest = sorted(((name, us) for name, us in modules.items() if "." not in name or name.startswith("mowhive")),
+                     key=lambda m: -m[1])[:10]
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "runs": runs,
+        },
+        "median_seconds": statistics.median(times),
+        "min_seconds": times[0],
+        "p90_seconds": times[min(len(times) - 1, int(0.9 * len(times)))],
+        "interpreter_seconds": statistics.median(baseline),
+        "modules": len(modules),
+        "mowhive_modules": sorted(name for name in modules if name.startswith("mowhive")),
+        "forbidden": sorted(name for name in modules if name in FORBIDDEN),
+        "slowest_imports": slowest,
+    }
+
+
+def _bare_interpreter() -> float:
+    # What an interpreter doing nothing costs, for reference
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def compare(old: Dict, new: Dict, tolerance: float) -> List[str]:
+    """ Regressions of new against old, empty if there are none
+
+        :param tolerance: allowed relative slowdown of the median, over the bare interpreter time
+    """
+    out = [f"{name} is imported" for name in new["forbidden"]]
+    # Compare what main.py adds to the interpreter, which is what the code controls
+    before = old["median_seconds"] - old["interpreter_seconds"]
+    after = new["median_seconds"] - new["interpreter_seconds"]
+    if after > before * (1 + tolerance):
+        out.append(f"startup went from {before * 1000:.1f}ms to {after * 1000:.1f}ms over the bare interpreter")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_startup", description="Benchmark the startup time of main.py.")
+    parser.add_argument("--runs", type=int, default=20, help="interpreters started")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown with --compare")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.runs)
+    print(f"main.py     median {results['median_seconds'] * 1000:.1f}ms  min {results['min_seconds'] * 1000:.1f}ms  p90 {results['p90_seconds'] * 1000:.1f}ms")
+    print(f"interpreter median {results['interpreter_seconds'] * 1000:.1f}ms")
+    print(f"{results['modules']} modules imported, mowhive ones: {' '.join(results['mowhive_modules'])}")
+    for name, us in results["slowest_imports"]:
+        print(f"  {name:<28} {us / 1000:>7.1f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    regressions = [f"{name} is imported" for name in results["forbidden"]]
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+    for line in regressions:
+        print(line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
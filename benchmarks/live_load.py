@@ -0,0 +1,162 @@
+""" Load generator for the live fleet server of mowhive.live.
+
+    python -m benchmarks.live_load --fleet 1000 --commands 20 --connections 16
+    python -m benchmarks.live_load --port 7777 --fleet 1000    # against a running server
+    python -m benchmarks.live_load --unix /tmp/mowhive.sock
+
+    Every mower registers at a random free cell, then sends its commands one at a time, each one
+    as soon as the previous one is answered, like a real mower would. Without an address an
+    in-process server on a free port is used. Reports throughput and latency percentiles.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from mowhive.live import LiveController, serve
+from mowhive.mowcontroller import MowController
+from mowhive.mowerstate import CollitionProtocols
+
+
+class Client:
+    """ One connection, requests are pipelined and matched to their reply by tag
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.tags = itertools.count()
+        self.listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        async for raw in self.reader:
+            tag, _, reply = raw.decode().strip().partition(" ")
+            self.pending.pop(tag).set_result(reply)
+
+    async def request(self, line: str) -> str:
+        tag = str(next(self.tags))
+        future = asyncio.get_running_loop().create_future()
+        self.pending[tag] = future
+        self.writer.write(f"{tag} {line}\n".encode())
+        return await future
+
+    async def close(self):
+        # Let the server finish with the connection before closing it
+        self.writer.write_eof()
+        await self.listener
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def run_load(host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None, fleet: int = 100,
+                   commands: int = 10, command_length: int = 4, connections: int = 4, plateau_size: int = 100, seed: int = 0) -> Dict:
+    """ Drive a server and return its throughput and latencies
+
+        :param fleet: mowers to register
+        :param commands: commands sent by every mower
+        :param command_length: movements per command
+        :param connections: connections the mowers are spread over
+        :param plateau_size: plateau size of the server, used to pick starting cells
+        :param seed: random seed of the starting cells and movements
+    """
+    rng = random.Random(seed)
+    clients = []
+    for _ in range(connections):
+        if unix_path is not None:
+            clients.append(Client(*await asyncio.open_unix_connection(unix_path)))
+        else:
+            clients.append(Client(*await asyncio.open_connection(host, port)))
+
+    cells = rng.sample(range((plateau_size + 1) ** 2), fleet)
+    mowers = []
+    for n, cell in enumerate(cells):
+        client = clients[n % connections]
+        x, y = divmod(cell, plateau_size + 1)
+        reply = await client.request(f"REGISTER {x} {y} {rng.choice('NESW')}")
+        status, _, mow_id = reply.partition(" ")
+        if status == "OK":
+            mowers.append((client, int(mow_id)))
+    routes = [["".join(rng.choices("MMLR", k=command_length)) for _ in range(commands)] for _ in mowers]
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def drive(client: Client, mow_id: int, route: List[str]):
+        nonlocal errors
+        for path in route:
+            start = time.perf_counter()
+            reply = await client.request(f"MOVE {mow_id} {path}")
+            latencies.append(time.perf_counter() - start)
+            errors += not reply.startswith("OK")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(client, mow_id, route) for (client, mow_id), route in zip(mowers, routes)))
+    seconds = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    return {
+        "fleet": len(mowers),
+        "commands": len(latencies),
+        "errors": errors,
+        "seconds": seconds,
+        "commands_per_second": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+async def run_local(protocol: CollitionProtocols, wait_timeout: float = 0.5, **kwargs) -> Dict:
+    """ run_load against an in-process server on a free port. Mowers waiting on one that has sent
+        all its commands would wait forever, so waits time out after wait_timeout seconds
+    """
+    plateau_size = kwargs.get("plateau_size", 100)
+    controller = MowController(plateau_size, plateau_size, collition_protocol=protocol, ignore_unregisterable_mowers=True)
+    live = LiveController(controller, wait_timeout)
+    server = await serve(live)
+    async with server:
+        results = await run_load(port=server.sockets[0].getsockname()[1], **kwargs)
+    results["batches"] = live.batches
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.live_load", description="Load a live mowhive fleet server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server, an in-process one is used by default")
+    parser.add_argument("--unix", help="Unix socket of a running server")
+    parser.add_argument("--protocol", choices=[p.name for p in CollitionProtocols], default=CollitionProtocols.STOP_ON_COLLITIONS.name,
+                        help="protocol of the in-process server")
+    parser.add_argument("--wait-timeout", type=float, default=0.5, help="wait timeout of the in-process server")
+    parser.add_argument("--plateau", type=int, default=100, help="plateau size of the server")
+    parser.add_argument("--fleet", type=int, default=100)
+    parser.add_argument("--commands", type=int, default=10, help="commands per mower")
+    parser.add_argument("--command-length", type=int, default=4, help="movements per command")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    kwargs = dict(fleet=args.fleet, commands=args.commands, command_length=args.command_length,
+                  connections=args.connections, plateau_size=args.plateau, seed=args.seed)
+    if args.port is None and args.unix is None:
+        results = asyncio.run(run_local(CollitionProtocols[args.protocol], args.wait_timeout, **kwargs))
+    else:
+        results = asyncio.run(run_load(args.host, args.port or 0, args.unix, **kwargs))
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
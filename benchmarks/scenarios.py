@@ -0,0 +1,67 @@
+""" Seeded scenario generator for benchmarks.
+"""
+import random
+from typing import List, Optional, Tuple
+
+from mowhive.mowerstate import Cardinal
+
+
+class Scenario:
+    def __init__(self, plateau_size: Tuple[int, int], mowers: List[Tuple[int, int, Cardinal, str]]):
+        self.plateau_size = plateau_size
+        self.mowers = mowers
+
+    @property
+    def steps(self) -> int:
+        return sum(len(path) for _, _, _, path in self.mowers)
+
+    def lines(self) -> List[str]:
+        out = [f"{self.plateau_size[0]} {self.plateau_size[1]}"]
+        for x, y, o, path in self.mowers:
+            out.append(f"{x} {y} {o.name}")
+            out.append(path)
+        return out
+
+    def to_text(self) -> bytes:
+        return ("\n".join(self.lines()) + "\n").encode()
+
+
+def generate_scenario(seed: int, fleet_size: int, path_length: int, density: float = 0.1, plateau_size: Optional[Tuple[int, int]] = None, layout: str = "random") -> Scenario:
+    """ Generate a scenario. The plateau is sized so that fleet_size / cells is about density,
+        unless plateau_size is given.
+
+        :param seed: random seed, the same arguments always give the same scenario
+        :param fleet_size: number of mowers
+        :param path_length: movements per mower
+        :param density: fraction of the plateau cells holding a mower
+        :param plateau_size: explicit plateau size, overrides density
+        :param layout: "random" places mowers and movements at random, "lanes" gives every mower
+                       its own column and a back and forth route on it, so no collition ever happens
+    """
+    rng = random.Random(seed)
+    if layout == "lanes":
+        size_y = max(1, path_length // 4)
+        lap = "M" * size_y + "RR"
+        route = (lap * (path_length // len(lap) + 1))[:path_length]
+        mowers = [(x, 0, Cardinal.N, route) for x in range(fleet_size)]
+        return Scenario((fleet_size - 1, size_y), mowers)
+
+    if plateau_size is None:
+        side = max(1, int((fleet_size / density) ** 0.5))
+        plateau_size = (side, side)
+    cells = (plateau_size[0] + 1) * (plateau_size[1] + 1)
+    if fleet_size > cells:
+        raise ValueError(f"{fleet_size} mowers do not fit in a {plateau_size} plateau")
+
+    taken = set()
+    mowers = []
+    orientations = list(Cardinal)
+    while len(mowers) < fleet_size:
+        x, y = rng.randint(0, plateau_size[0]), rng.randint(0, plateau_size[1])
+        if (x, y) in taken:
+            continue
+        taken.add((x, y))
+        # Mostly moves, as in real routes
+        path = "".join(rng.choices("MMMMLR", k=path_length))
+        mowers.append((x, y, rng.choice(orientations), path))
+    return Scenario(plateau_size, mowers)
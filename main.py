@@ -1,20 +1,84 @@
+import argparse
+import mmap
 import sys
-from mowhive.utils import Cardinal, Movements, read_input, read_mower_line
+from mowhive.utils import read_header, read_input, read_swarm, stream_swarm
 from mowhive.mowcontroller import MowController
+from mowhive.stats import SwarmStats
+
+def read_all(stream):
+    # Map the standard input when it is a file, read it otherwise
+    try:
+        return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return stream.read()
 
 if __name__ == "__main__":
     """ It is assumed that data will come in through the standard input
     """
-    dimx = 0
-    dimy = 0
-    mow_hive = None
-    line = input()
-    dims = line.split(" ")
-    dimx = int(dims[0])
-    dimy = int(dims[1])
-    mow_hive = MowController(dimx, dimy, ignore_unregisterable_mowers=False)
-    read_input(sys.stdin, mow_hive)
+    parser = argparse.ArgumentParser(description="Execute the mower swarm described in the standard input.")
+    parser.add_argument("--stats", action="store_true", help="print execution statistics to the standard error")
+    parser.add_argument("--format", choices=["text", "binary"], default="text",
+                        help="format of the scenario read and of the results written, see mowhive.binary")
+    parser.add_argument("--check", action="store_true",
+                        help="analyse the routes without running them, exits with 1 if one leaves the plateau or enters an obstacle")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="reuse the results of identical scenarios stored in this directory, see mowhive.cache")
+    args = parser.parse_args()
+
+    # Only what the chosen mode needs is imported, main.py is started very often
+    if args.format == "binary":
+        from mowhive.binary import BinaryScenario, write_results
+    cache = None
+    if args.cache:
+        from mowhive.cache import ResultCache
+        cache = ResultCache(args.cache)
+
+    if args.check:
+        from mowhive.analysis import RouteAnalysis
+        stream = sys.stdin.buffer
+        if args.format == "binary":
+            scenario = BinaryScenario(read_all(stream))
+            mow_hive = MowController(*scenario.plateau_size, ignore_unregisterable_mowers=False)
+            scenario.register(mow_hive)
+        else:
+            mow_hive = MowController(*read_header(stream.readline()), ignore_unregisterable_mowers=False)
+            read_input((line.decode().rstrip("\r\n") for line in stream), mow_hive)
+        analysis = RouteAnalysis(mow_hive)
+        print("\n".join(analysis.report()))
+        sys.exit(1 if analysis.failing() else 0)
+
+    stats = SwarmStats() if args.stats else None
+    stream = sys.stdin.buffer
+    if args.format == "binary":
+        scenario = BinaryScenario(read_all(stream))
+        mow_hive = MowController(*scenario.plateau_size, ignore_unregisterable_mowers=False)
+        if stats is None:
+            scenario.register(mow_hive)
+        else:
+            with stats.phase("register"):
+                scenario.register(mow_hive)
+        mow_hive.move_swarm(stats if stats is not None else False, cache=cache)
+        output = lambda: write_results(sys.stdout.buffer, mow_hive)
+    else:
+        dimx, dimy = read_header(stream.readline())
+        mow_hive = MowController(dimx, dimy, ignore_unregisterable_mowers=False)
+        if cache is None:
+            stream_swarm(stream, mow_hive, stats)
+        else:
+            # The key needs every path, so the scenario is loaded before it runs
+            if stats is None:
+                read_swarm(stream, mow_hive)
+            else:
+                with stats.phase("register"):
+                    read_swarm(stream, mow_hive)
+            mow_hive.move_swarm(stats if stats is not None else False, cache=cache)
+        output = lambda: mow_hive.write_current_state(sys.stdout.buffer)
+    if cache is not None:
+        cache.flush()
 
-    mow_hive.move_swarm()
-    state = mow_hive.show_current_state()
-    mow_hive.print_current_state()
\ No newline at end of file
+    if stats is None:
+        output()
+    else:
+        with stats.phase("output"):
+            output()
+        print("\n".join(stats.report()), file=sys.stderr)
@@ -1,6 +1,82 @@
-from .utils import *
-from .mowcontroller import *
-from .mowerstate import *
-from .errors import *
+""" Mower swarm controller.
 
+    The public API is loaded lazily (PEP 562): `from mowhive import MowController` only imports the
+    modules MowController needs, and backends such as NumPy, the process pool or asyncio
+    are only imported when one of their names is first used.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
 
+# Public name -> module defining it
+_EXPORTS = {
+    "mowerstate": ("Cardinal", "CARDINALS", "Movements", "ROTATIONS", "MovementResult", "MovementSucess", "ObstructingMower",
+                   "OutOfBounds", "UnknownObstacle", "SUCCESS", "OUT_OF_BOUNDS", "UNKNOWN_OBSTACLE", "CollitionProtocols",
+                   "Coord", "PathProgram", "Mower"),
+    "errors": ("MownerRegisterException", "PlaceOccupied", "InvalidOperationExecution", "MovementException",
+               "AttemptedOutOfBoundsMovement", "MowerObstructingPath", "UnknownObstacleinPath", "UnsupportedCollitionProtocol",
+               "MowersDeadlocked"),
+    "mowcontroller": ("DISPLACEMENT_OPERATIONS", "DISPLACEMENT_DELTAS", "STATE_NAMES", "RESULT_COUNTERS", "MowController"),
+    "utils": ("read_mower_line", "read_input", "read_header", "read_mower_record", "read_swarm", "stream_swarm", "stream_swarm_file"),
+    "stats": ("SwarmStats",),
+    "fleet": ("Fleet",),
+    "obstacles": ("ObstacleMap",),
+    "plateau": ("Plateau", "TiledBitmap"),
+    "cache": ("ResultCache", "scenario_key"),
+    "checkpoint": ("Checkpointer", "Snapshot", "load_snapshot", "iter_snapshots"),
+    "trace": ("TraceRecorder",),
+    "binary": ("BinaryScenario", "load_scenario", "write_scenario", "write_results", "read_results"),
+    "planner": ("Planner",),
+    "partition": ("move_swarm_partitioned",),
+    "live": ("LiveController",),
+    "shared": ("ConcurrentMowController",),
+    "engine": ("run_batch",),
+    # NumPy backed
+    "coverage": ("Coverage",),
+    "analysis": ("RouteAnalysis",),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+# What `from mowhive import *` gives, the core API without the optional backends
+__all__ = [name for module in ("mowerstate", "errors", "mowcontroller", "utils") for name in _EXPORTS[module]]
+
+
+def __getattr__(name: str):
+    module = _MODULES.get(name)
+    if module is None:
+        # A submodule not imported yet, as mowhive.mowcontroller after a plain import mowhive
+        try:
+            return import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    # Later lookups find it without going through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
+
+
+if TYPE_CHECKING:
+    from .analysis import RouteAnalysis
+    from .binary import BinaryScenario, load_scenario, read_results, write_results, write_scenario
+    from .cache import ResultCache, scenario_key
+    from .checkpoint import Checkpointer, Snapshot, iter_snapshots, load_snapshot
+    from .coverage import Coverage
+    from .engine import run_batch
+    from .errors import *
+    from .fleet import Fleet
+    from .live import LiveController
+    from .mowcontroller import *
+    from .mowerstate import *
+    from .obstacles import ObstacleMap
+    from .partition import move_swarm_partitioned
+    from .planner import Planner
+    from .plateau import Plateau, TiledBitmap
+    from .shared import ConcurrentMowController
+    from .stats import SwarmStats
+    from .trace import TraceRecorder
+    from .utils import *
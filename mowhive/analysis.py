@@ -0,0 +1,174 @@
+""" Static analysis of the registered routes, before running them.
+
+    Rotations always succeed, so the heading of every M of a route is known beforehand: it is the
+    starting orientation plus the prefix sum of the quarter turns before it. The planned route, where
+    every move succeeds, is then the prefix sum of the displacements of the M's. Both sums are computed
+    with NumPy for all the mowers at once, giving each route's bounding box and the moves that would
+    leave the plateau or run into an obstacle.
+
+    Whatever fails along the way, a mower never leaves the box given by the M's of its route in each
+    heading (mowhive.partition.reachable_box). Mowers whose boxes overlap no other box can't be obstructed
+    by another mower, so MowController can skip the occupancy lookups of their moves.
+"""
+import heapq
+from typing import List, Tuple
+
+import numpy as np
+
+from .mowcontroller import MowController
+from .obstacles import ObstacleMap
+
+# Displacement of each Cardinal value, as in DISPLACEMENT_DELTAS
+DX = np.array([0, 1, 0, -1], dtype=np.int64)
+DY = np.array([1, 0, -1, 0], dtype=np.int64)
+
+
+def _first(owners: np.ndarray, moves: np.ndarray, mask: np.ndarray, n: int) -> np.ndarray:
+    # Index of the first move of each mower where mask is set, -1 if there is none
+    first = np.full(n, -1, dtype=np.int64)
+    hits = np.flatnonzero(mask)
+    found, where = np.unique(owners[hits], return_index=True)
+    first[found] = moves[hits[where]]
+    return first
+
+
+def overlapping_pairs(boxes: np.ndarray) -> np.ndarray:
+    """ Pairs (i, j), i < j, of boxes that overlap, sorted. Uses a sweep over x like mowhive.partition.partition
+
+        :param boxes: (n, 4) array of (x0, y0, x1, y1) boxes, corners included
+    """
+    pairs: List[Tuple[int, int]] = []
+    x0s, y0s, x1s, y1s = boxes.T.tolist() if len(boxes) else ([], [], [], [])
+    active: List[Tuple[int, int]] = []
+    for i in sorted(range(len(x0s)), key=lambda i: x0s[i]):
+        while active and active[0][0] < x0s[i]:
+            heapq.heappop(active)
+        for _, j in active:
+            if y0s[j] <= y1s[i] and y0s[i] <= y1s[j]:
+                pairs.append((min(i, j), max(i, j)))
+        heapq.heappush(active, (x1s[i], i))
+    pairs.sort()
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+class RouteAnalysis:
+    """ Routes of the mowers of a controller as they are now, from their current state to the end of
+        their programs. Moves are numbered from 0 for each mower, counting only M's.
+
+        - boxes: (n, 4) bounding box (x0, y0, x1, y1) of each planned route, corners included
+        - reach_boxes: (n, 4) box each mower stays in whatever fails, as mowhive.partition.reachable_box
+        - out_of_bounds: number of moves of each planned route that end outside the plateau
+        - first_out_of_bounds / first_obstacle: first move of each planned route that leaves the plateau
+          or enters an obstacle, -1 if none
+        - conflicts: (k, 2) pairs of mowers whose reach boxes overlap, the only ones that can collide
+        - isolated: mowers that are in no conflict
+
+        Moves after the first failure are where the mower would be had it succeeded, which is what
+        happens until then. Under ABORT_ON_COLLITIONS any failure stops the swarm, so a mower with a
+        first_failure makes the scenario fail, at that move or before.
+
+        :param controller: MowController with its mowers registered and their paths set
+    """
+    def __init__(self, controller: MowController):
+        self.controller = controller
+        size_x, size_y = controller.plateau_size
+        mowers = controller.mowers
+        n = len(mowers)
+        xs = np.fromiter((m.location.x for m in mowers), dtype=np.int64, count=n)
+        ys = np.fromiter((m.location.y for m in mowers), dtype=np.int64, count=n)
+        headings = np.fromiter((m.orientation.value for m in mowers), dtype=np.int64, count=n)
+
+        # Remaining opcodes of every mower one after the other
+        chunks = []
+        for m in mowers:
+            program = m.program
+            ops = np.array(program.ops[program.pc:], dtype=np.int64) if program is not None else np.zeros(0, dtype=np.int64)
+            if len(ops) and ops[0] > 0:
+                ops[0] -= program.offset
+            chunks.append(ops)
+        lengths = np.fromiter((len(c) for c in chunks), dtype=np.int64, count=n)
+        ops = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        owners = np.repeat(np.arange(n), lengths)
+
+        # Heading of every opcode: starting orientation plus the quarter turns before it in the same route
+        turns = np.concatenate(([0], np.cumsum(np.where(ops < 0, -ops, 0))))
+        starts = np.cumsum(lengths) - lengths
+        op_headings = (headings[owners] + turns[:-1] - turns[starts][owners]) % 4
+
+        # One entry per move
+        counts = np.where(ops > 0, ops, 0)
+        move_owners = np.repeat(owners, counts)
+        move_headings = np.repeat(op_headings, counts)
+        n_moves = np.bincount(owners, weights=counts, minlength=n).astype(np.int64)
+        move_starts = np.cumsum(n_moves) - n_moves
+        moves = np.arange(len(move_owners)) - move_starts[move_owners]
+
+        north, east, south, west = np.bincount(owners * 4 + op_headings, weights=counts, minlength=4 * n).astype(np.int64).reshape(n, 4).T
+        self.reach_boxes = np.stack((xs - west, ys - south, xs + east, ys + north), axis=1)
+
+        # Planned positions after every move
+        sx = np.concatenate(([0], np.cumsum(DX[move_headings])))
+        sy = np.concatenate(([0], np.cumsum(DY[move_headings])))
+        px = xs[move_owners] + sx[1:] - sx[move_starts][move_owners]
+        py = ys[move_owners] + sy[1:] - sy[move_starts][move_owners]
+
+        x0, y0, x1, y1 = xs.copy(), ys.copy(), xs.copy(), ys.copy()
+        np.minimum.at(x0, move_owners, px)
+        np.minimum.at(y0, move_owners, py)
+        np.maximum.at(x1, move_owners, px)
+        np.maximum.at(y1, move_owners, py)
+        self.boxes = np.stack((x0, y0, x1, y1), axis=1)
+
+        outside = (px < 0) | (px > size_x) | (py < 0) | (py > size_y)
+        self.out_of_bounds = np.bincount(move_owners[outside], minlength=n).astype(np.int64)
+        self.first_out_of_bounds = _first(move_owners, moves, outside, n)
+        blocked = np.zeros(len(px), dtype=bool)
+        obstacles = controller.obstacles
+        if obstacles is not None:
+            inside = np.flatnonzero(~outside)
+            if isinstance(obstacles, ObstacleMap):
+                cells = py[inside] * obstacles.width + px[inside]
+                bits = np.frombuffer(obstacles.bits, dtype=np.uint8)
+                blocked[inside] = (bits[cells >> 3] >> (cells & 7)) & 1
+            else:
+                blocked[inside] = [obstacles.is_blocked(x, y) for x, y in zip(px[inside].tolist(), py[inside].tolist())]
+        self.first_obstacle = _first(move_owners, moves, blocked, n)
+
+        self.conflicts = overlapping_pairs(self.reach_boxes)
+        self.isolated = np.bincount(self.conflicts.ravel(), minlength=n) == 0
+
+    @property
+    def first_failure(self) -> np.ndarray:
+        """ First move of each planned route that leaves the plateau or enters an obstacle, -1 if none
+        """
+        oob, obstacle = self.first_out_of_bounds, self.first_obstacle
+        both = (oob >= 0) & (obstacle >= 0)
+        return np.where(both, np.minimum(oob, obstacle), np.maximum(oob, obstacle))
+
+    def failing(self) -> List[int]:
+        """ Mowers whose planned route leaves the plateau or enters an obstacle
+        """
+        return np.flatnonzero(self.first_failure >= 0).tolist()
+
+    def skip_isolated_checks(self):
+        """ Let the controller skip the occupancy lookups of the isolated mowers' moves. Only valid for the
+            routes analysed and their next run: registering or moving a mower by hand, or giving one a new
+            program, turns it off again
+        """
+        self.controller.isolated = self.isolated.tobytes()
+        self.controller.isolated_programs = [m.program for m in self.controller.mowers]
+
+    def report(self) -> List[str]:
+        """ Human readable summary
+        """
+        n = len(self.isolated)
+        out = [f"{n} mowers, {len(self.conflicts)} pairs may collide, {int(self.isolated.sum())} isolated mowers"]
+        for i in self.failing():
+            x0, y0, x1, y1 = self.boxes[i].tolist()
+            problems = []
+            if self.first_out_of_bounds[i] >= 0:
+                problems.append(f"leaves the plateau at move {self.first_out_of_bounds[i]} ({self.out_of_bounds[i]} moves outside)")
+            if self.first_obstacle[i] >= 0:
+                problems.append(f"enters an obstacle at move {self.first_obstacle[i]}")
+            out.append(f"mower {i} {', '.join(problems)}, route box ({x0}, {y0}) ({x1}, {y1})")
+        return out
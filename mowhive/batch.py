@@ -0,0 +1,143 @@
+""" Run many independent scenarios across processes.
+
+    Usage:
+
+        python -m mowhive.batch scenarios/ > results.txt
+        cat *.txt | python -m mowhive.batch - --workers 8 --chunksize 64
+
+    Inputs are scenario files, directories of scenario files (read in name order) or "-" for
+    standard input. A stream may hold several concatenated scenarios: a line with two numbers
+    where a mower line is expected starts a new scenario, and blank lines between scenarios are
+    ignored. Results are written in input order, one block per scenario separated by a blank line.
+    A scenario that fails is reported as a single "ERROR <exception>: <message>" line.
+"""
+import argparse
+import io
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from .mowcontroller import MowController
+from .mowerstate import CollitionProtocols
+from .utils import read_header, stream_swarm
+
+
+def split_scenarios(stream: BinaryIO) -> Iterator[bytes]:
+    """ Split a binary stream of concatenated scenarios, yields each scenario as bytes
+
+        :param stream: binary stream with one or more scenarios
+    """
+    current: List[bytes] = []
+    # Index of the next line inside the current scenario, 0 is the header
+    n = 0
+    for line in stream:
+        if n == 0 and not line.strip():
+            continue
+        if n % 2 == 1 and len(line.split()) in (0, 2):
+            # Where a mower line is expected, a blank line or a new header closes the scenario
+            if current:
+                yield b"".join(current)
+            current = []
+            n = 0
+            if not line.strip():
+                continue
+        current.append(line if line.endswith(b"\n") else line + b"\n")
+        n += 1
+    if current:
+        yield b"".join(current)
+
+
+def read_scenarios(paths: Iterable[str]) -> Iterator[bytes]:
+    """ Yields every scenario found in files, directories or "-" for standard input
+
+        :param paths: inputs to read, in order
+    """
+    for path in paths:
+        if path == "-":
+            yield from split_scenarios(sys.stdin.buffer)
+        elif os.path.isdir(path):
+            yield from read_scenarios(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            with open(path, "rb") as f:
+                yield from split_scenarios(f)
+
+
+def run_scenario(scenario: bytes, collition_protocol: CollitionProtocols = CollitionProtocols.STOP_ON_COLLITIONS) -> Tuple[List[str], Optional[str]]:
+    """ Execute a single scenario. Returns the final state and None, or an empty state and
+        the error that stopped the scenario
+
+        :param scenario: scenario in the text format
+        :param collition_protocol: protocol to run it with
+    """
+    try:
+        stream = io.BytesIO(scenario)
+        dimx, dimy = read_header(stream.readline())
+        controller = MowController(dimx, dimy, collition_protocol=collition_protocol)
+        stream_swarm(stream, controller)
+        return controller.show_current_state(), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {str(e).strip()}"
+
+
+def run_chunk(scenarios: List[bytes], collition_protocol: CollitionProtocols) -> List[Tuple[List[str], Optional[str]]]:
+    """ Execute scenarios one after the other, as run_scenario
+    """
+    return [run_scenario(scenario, collition_protocol) for scenario in scenarios]
+
+
+def run_scenarios(scenarios: Iterable[bytes], collition_protocol: CollitionProtocols = CollitionProtocols.STOP_ON_COLLITIONS, workers: Optional[int] = None, chunksize: int = 16, window: Optional[int] = None) -> Iterator[Tuple[List[str], Optional[str]]]:
+    """ Execute scenarios over a pool of processes, yields run_scenario results in input order.
+        Scenarios are only read ahead of the results by a window of chunks, so a large or endless
+        input never sits whole in memory
+
+        :param scenarios: scenarios in the text format
+        :param collition_protocol: protocol to run them with
+        :param workers: number of processes, os.cpu_count() by default
+        :param chunksize: scenarios sent to a process at a time
+        :param window: chunks submitted and not yielded yet, twice the workers by default
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    scenarios = iter(scenarios)
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in iter(lambda: list(islice(scenarios, chunksize)), []):
+            pending.append(executor.submit(run_chunk, chunk, collition_protocol))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mowhive.batch", description="Run many mowhive scenarios in parallel.")
+    parser.add_argument("inputs", nargs="*", default=["-"], help="scenario files, directories or - for standard input")
+    parser.add_argument("--protocol", choices=[p.name for p in CollitionProtocols], default=CollitionProtocols.STOP_ON_COLLITIONS.name)
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, one per core by default")
+    parser.add_argument("--chunksize", type=int, default=16, help="scenarios handed to a process at a time")
+    parser.add_argument("--output", default="-", help="results file, standard output by default")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    failed = 0
+    try:
+        results = run_scenarios(read_scenarios(args.inputs), CollitionProtocols[args.protocol], args.workers, args.chunksize)
+        for n, (state, error) in enumerate(results):
+            if n:
+                out.write("\n")
+            if error is not None:
+                failed += 1
+                out.write(f"ERROR {error}\n")
+            else:
+                out.writelines(f"{s}\n" for s in state)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+""" Binary scenario and result formats, for inputs too big to parse as text.
+
+    python -m mowhive.binary to-binary scenario.txt scenario.bin
+    python -m mowhive.binary to-text scenario.bin scenario.txt
+    python -m mowhive.binary results-to-text results.bin results.txt
+
+    Scenario: the header SCENARIO_HEADER (magic, plateau size, number of mowers, number of opcodes),
+    then columns, each one starting at a multiple of 8 bytes:
+    - x and y of every mower, int64, as wide as the plateau size in the header
+    - orientation of every mower, uint8 (Cardinal value)
+    - offsets, int64, n + 1 of them: the path of mower i is ops[offsets[i]:offsets[i + 1]]
+    - ops, int32, the compiled PathProgram opcodes of every path one after the other
+    Result: the header RESULT_HEADER (magic, number of mowers), then the x, y and orientation columns,
+    with the same types as in a scenario.
+
+    Everything is little endian. Readers cast the columns of the buffer in place, so paths reach the
+    controller as memoryview slices of the file without being copied or decoded.
+"""
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from typing import BinaryIO, List, Optional, Sequence, Tuple, Union
+
+from .mowcontroller import MowController
+from .mowerstate import CARDINALS, PathProgram
+from .utils import read_header, read_mower_record
+
+SCENARIO_MAGIC = b"MOWSCEN2"
+RESULT_MAGIC = b"MOWRES02"
+SCENARIO_HEADER = struct.Struct("<8sQQQQ")
+RESULT_HEADER = struct.Struct("<8sQ")
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def _aligned(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _column(data: memoryview, start: int, n: int, fmt: str) -> Tuple[memoryview, int]:
+    # Returns a typed view of n items at start, and where the next column starts
+    size = struct.calcsize(fmt)
+    view = data[start:start + n * size]
+    if len(view) < n * size:
+        raise ValueError("Truncated file")
+    if sys.byteorder == "big" and size > 1:
+        swapped = array(fmt, view.tobytes())
+        swapped.byteswap()
+        view = memoryview(swapped)
+    else:
+        view = view.cast(fmt)
+    return view, _aligned(start + n * size)
+
+
+def _write_column(out: BinaryIO, values: Union[array, Sequence[int]], fmt: str) -> int:
+    column = values if isinstance(values, array) and values.typecode == fmt else array(fmt, values)
+    if sys.byteorder == "big" and column.itemsize > 1:
+        column = array(fmt, column)
+        column.byteswap()
+    data = column.tobytes()
+    out.write(data)
+    padding = _aligned(len(data)) - len(data)
+    out.write(b"\0" * padding)
+    return len(data) + padding
+
+
+class BinaryScenario:
+    """ A scenario read from the binary format. Columns are views of the buffer, nothing is copied
+
+        :param data: whole file contents, e.g. an mmap
+    """
+    def __init__(self, data: Buffer):
+        data = memoryview(data)
+        if len(data) < SCENARIO_HEADER.size or data[:len(SCENARIO_MAGIC)] != SCENARIO_MAGIC:
+            raise ValueError("Not a binary scenario")
+        magic, size_x, size_y, n, n_ops = SCENARIO_HEADER.unpack_from(data)
+        self.plateau_size = (size_x, size_y)
+        start = _aligned(SCENARIO_HEADER.size)
+        self.xs, start = _column(data, start, n, "q")
+        self.ys, start = _column(data, start, n, "q")
+        self.orientations, start = _column(data, start, n, "B")
+        self.offsets, start = _column(data, start, n + 1, "q")
+        self.ops, start = _column(data, start, n_ops, "i")
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def program(self, i: int) -> PathProgram:
+        return PathProgram(self.ops[self.offsets[i]:self.offsets[i + 1]])
+
+    def register(self, controller: MowController):
+        """ Register every mower with its path, like read_input does for the text format
+        """
+        xs, ys, orientations, offsets, ops = self.xs, self.ys, self.orientations, self.offsets, self.ops
+        for i in range(len(xs)):
+            controller.register_mower(xs[i], ys[i], CARDINALS[orientations[i]], PathProgram(ops[offsets[i]:offsets[i + 1]]))
+
+
+def load_scenario(path: str, use_mmap: bool = True) -> BinaryScenario:
+    """ Open a binary scenario file, memory mapped by default
+
+        :param path: scenario file
+        :param use_mmap: map the file instead of reading it into memory
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            return BinaryScenario(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return BinaryScenario(f.read())
+
+
+def write_scenario(out: BinaryIO, plateau_size: Tuple[int, int], xs: Sequence[int], ys: Sequence[int],
+                   orientations: Sequence[int], offsets: Sequence[int], ops: Sequence[int]):
+    """ Write a scenario given as columns, see the module documentation
+    """
+    out.write(SCENARIO_HEADER.pack(SCENARIO_MAGIC, plateau_size[0], plateau_size[1], len(xs), len(ops)))
+    out.write(b"\0" * (_aligned(SCENARIO_HEADER.size) - SCENARIO_HEADER.size))
+    _write_column(out, xs, "q")
+    _write_column(out, ys, "q")
+    _write_column(out, orientations, "B")
+    _write_column(out, offsets, "q")
+    _write_column(out, ops, "i")
+
+
+def write_results(out: BinaryIO, controller: MowController):
+    """ Write the current state of the mowers of a controller in the binary result format
+    """
+    mowers = controller.mowers
+    out.write(RESULT_HEADER.pack(RESULT_MAGIC, len(mowers)))
+    xs = getattr(mowers, "xs", None)
+    if xs is not None:
+        # A Fleet already holds its state as columns
+        _write_column(out, xs, "q")
+        _write_column(out, mowers.ys, "q")
+        _write_column(out, mowers.orientations, "B")
+        return
+    _write_column(out, [m.location.x for m in mowers], "q")
+    _write_column(out, [m.location.y for m in mowers], "q")
+    _write_column(out, [m.orientation.value for m in mowers], "B")
+
+
+def read_results(data: Buffer) -> Tuple[memoryview, memoryview, memoryview]:
+    """ Returns the x, y and orientation value columns of binary results
+    """
+    data = memoryview(data)
+    if len(data) < RESULT_HEADER.size or data[:len(RESULT_MAGIC)] != RESULT_MAGIC:
+        raise ValueError("Not a binary result")
+    magic, n = RESULT_HEADER.unpack_from(data)
+    xs, start = _column(data, RESULT_HEADER.size, n, "q")
+    ys, start = _column(data, start, n, "q")
+    orientations, _ = _column(data, start, n, "B")
+    return xs, ys, orientations
+
+
+def text_to_binary(src: BinaryIO, out: BinaryIO):
+    """ Convert a text scenario, read from a binary stream, to the binary format
+    """
+    plateau_size = read_header(src.readline())
+    xs, ys, orientations = array("q"), array("q"), array("B")
+    offsets, ops = array("q", [0]), array("i")
+    for n, line in enumerate(iter(src.readline, b"")):
+        if n % 2 == 0:
+            x, y, o = read_mower_record(line)
+            xs.append(x)
+            ys.append(y)
+            orientations.append(o.value)
+        else:
+            ops.fromlist(PathProgram.from_bytes(line).ops.tolist())
+            offsets.append(len(ops))
+    # A mower line without a path line after it has an empty path
+    offsets.extend([len(ops)] * (len(xs) + 1 - len(offsets)))
+    write_scenario(out, plateau_size, xs, ys, orientations, offsets, ops)
+
+
+def binary_to_text(data: Buffer, out: BinaryIO):
+    """ Convert a binary scenario to the text format. Paths are written in their compiled form,
+        so a LLL becomes RRR
+    """
+    scenario = BinaryScenario(data)
+    out.write(f"{scenario.plateau_size[0]} {scenario.plateau_size[1]}\n".encode())
+    for i in range(len(scenario)):
+        path = "".join(m.name for m in scenario.program(i).remaining())
+        out.write(f"{scenario.xs[i]} {scenario.ys[i]} {CARDINALS[scenario.orientations[i]].name}\n{path}\n".encode())
+
+
+def results_to_text(data: Buffer, out: BinaryIO):
+    """ Convert binary results to the text output of print_current_state
+    """
+    xs, ys, orientations = read_results(data)
+    names = [c.name for c in CARDINALS]
+    out.writelines(f"{x} {y} {names[o]}\n".encode() for x, y, o in zip(xs, ys, orientations))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mowhive.binary", description="Convert between the text and binary formats.")
+    parser.add_argument("conversion", choices=["to-binary", "to-text", "results-to-text"])
+    parser.add_argument("input", help="input file, - for standard input")
+    parser.add_argument("output", help="output file, - for standard output")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        if args.conversion == "to-binary":
+            text_to_binary(src, out)
+        elif args.conversion == "to-text":
+            binary_to_text(src.read(), out)
+        else:
+            results_to_text(src.read(), out)
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+        if out is not sys.stdout.buffer:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
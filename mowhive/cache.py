@@ -0,0 +1,363 @@
+""" On-disk cache of swarm results, keyed by the content of the scenario.
+
+    Usage:
+
+        cache = ResultCache("/var/cache/mowhive")
+        controller.move_swarm(cache=cache)
+        cache.flush()
+
+        python -m mowhive.cache /var/cache/mowhive            # hit and miss statistics
+        python -m mowhive.cache /var/cache/mowhive --clear
+
+    The key of a scenario is a hash of what decides its outcome: the plateau size, the collition
+    protocol, the obstacles and every mower's cell, orientation and remaining compiled program.
+    Compiled programs fold runs of movements and rotations, and the key only keeps the quarter turns
+    of each rotation, so scenarios written differently but doing the same moves ("MLRM" and "MM") share
+    a key. An entry holds the final state lines of
+    show_current_state, one file per key.
+
+    Several processes can share a directory. Entries are written to a temporary file and renamed into
+    place, so a reader sees a whole entry or none. Hits refresh the modification time of their entry,
+    and once the directory outgrows max_entries or max_bytes the least recently used entries are
+    removed. Eviction and the shared statistics file are guarded by an advisory lock (fcntl, so only
+    on POSIX systems; elsewhere entries are still written atomically but statistics may lose updates).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from array import array
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .mowerstate import Cardinal, PathProgram
+from .obstacles import ObstacleMap
+if TYPE_CHECKING:
+    from .mowcontroller import MowController
+
+# Changing how keys or entries are built must change VERSION, so old entries are never read
+VERSION = b"mowhive-results-1"
+MAGIC = "MOWRES1"
+SUFFIX = ".res"
+STATS_FILE = "stats.json"
+LOCK_FILE = ".lock"
+COUNTERS = ("hits", "misses", "stores", "evictions")
+# Temporary files older than this were left by a writer that died
+STALE_SECONDS = 3600
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def scenario_key(controller: "MowController") -> str:
+    """ Hex digest identifying the outcome of move_swarm on a controller in its current state
+
+        :param controller: MowController with its mowers registered and their programs set
+    """
+    h = hashlib.blake2b(VERSION, digest_size=20)
+    h.update(_pack(array("q", (*controller.plateau_size, controller.collition_protocol.value, len(controller.mowers)))))
+
+    obstacles = controller.obstacles
+    if obstacles is None:
+        h.update(b"-")
+    elif isinstance(obstacles, ObstacleMap):
+        h.update(b"O")
+        h.update(memoryview(obstacles.bits)[:(obstacles.width * obstacles.height + 7) // 8])
+    else:
+        # TiledBitmap, tiles allocated but left clear do not count
+        h.update(b"T" + _pack(array("q", [obstacles.tile_size])))
+        for (tx, ty), tile in sorted(obstacles.tiles.items()):
+            if any(tile):
+                h.update(_pack(array("q", (tx, ty))))
+                h.update(tile)
+
+    # Per mower: x, y, orientation value, number of opcodes left, the opcodes left
+    values = array("q")
+    for m in controller.mowers:
+        location = m.location
+        values.extend((location.x, location.y, m.orientation.value))
+        program = m.program
+        if program is None or program.finished():
+            values.append(0)
+            continue
+        ops = _outcome_ops(program)
+        values.append(len(ops))
+        values.extend(ops)
+    h.update(_pack(values))
+    return h.hexdigest()
+
+
+def _outcome_ops(program: PathProgram) -> List[int]:
+    # Opcodes left with only the quarter turns of each rotation, not how many L and R it was folded
+    # from, so an LR between two advances folds away as if it was never written
+    ops = []
+    offset = program.offset
+    for op in program.ops[program.pc:]:
+        if op < 0:
+            op = -(-op % len(Cardinal))
+            if op:
+                ops.append(op)
+            continue
+        # Part of the current advance was already travelled
+        op -= offset
+        offset = 0
+        if ops and ops[-1] > 0:
+            ops[-1] += op
+        else:
+            ops.append(op)
+    return ops
+
+
+def restore(controller: "MowController", states: List[str]):
+    """ Put the mowers of a controller in the final state of a run, with their programs finished
+
+        :param controller: MowController the states were computed for
+        :param states: "x y O" lines, one per mower
+    """
+    controller.occupancy.clear()
+    for i, (m, line) in enumerate(zip(controller.mowers, states)):
+        x, y, o = line.split()
+        location = m.location
+        location.x = x = int(x)
+        location.y = y = int(y)
+        m.orientation = Cardinal[o]
+        program = m.program
+        if program is not None:
+            program.pc = len(program.ops)
+            program.offset = 0
+        controller.plateau.place(x, y, i)
+    controller.wait_for = {}
+    controller.deadlocks = []
+
+
+class ResultCache:
+    """ Size bounded, least recently used cache of final swarm states in a directory, which several
+        processes can use at once. Pass it to MowController.move_swarm.
+
+        hits, misses, stores and evictions count what this object did since its last flush, which adds
+        them to the statistics shared by every user of the directory, see totals.
+
+        :param directory: cache directory, created if needed
+        :param max_entries: entries kept at most
+        :param max_bytes: bytes of entries kept at most
+        :param check_every: the size of the directory is checked on about one store out of this many
+    """
+    def __init__(self, directory: str, max_entries: int = 100_000, max_bytes: int = 1 << 30, check_every: int = 64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.check_every = check_every
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def key(self, controller: "MowController") -> str:
+        return scenario_key(controller)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    @contextmanager
+    def _locked(self, blocking: bool = True) -> Iterator[bool]:
+        # Yields whether the lock is held, which without blocking it may not be
+        with open(os.path.join(self.directory, LOCK_FILE), "a+b") as f:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """ Returns the final state stored for a key, None if there is none
+
+            :param key: scenario_key of the scenario
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                lines = f.read().decode(errors="replace").splitlines()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        if not lines or lines[0] != f"{MAGIC} {len(lines) - 1}":
+            # Cut short by a crash before it reached the disk
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return lines[1:]
+
+    def put(self, key: str, states: List[str]):
+        """ Store the final state of a scenario
+
+            :param key: scenario_key of the scenario
+            :param states: "x y O" lines, as show_current_state returns them
+        """
+        data = "".join([f"{MAGIC} {len(states)}\n"] + [f"{s}\n" for s in states]).encode()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.stores += 1
+        # Keys are uniformly spread, so this is about one store in check_every, even for short lived processes
+        if int(key[:8], 16) % self.check_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """ If the directory holds too many entries or bytes, remove the least recently used ones until
+            it is down to 90% of both limits. Returns how many were removed, none if another process is
+            already evicting
+        """
+        with self._locked(blocking=False) as locked:
+            if not locked:
+                return 0
+            now = time.time()
+            entries = []
+            for e in os.scandir(self.directory):
+                try:
+                    st = e.stat()
+                    if e.name.endswith(SUFFIX):
+                        entries.append((st.st_mtime_ns, st.st_size, e.path))
+                    elif e.name.startswith(".tmp-") and now - st.st_mtime > STALE_SECONDS:
+                        os.unlink(e.path)
+                except FileNotFoundError:
+                    continue
+            count = len(entries)
+            total = sum(size for _, size, _ in entries)
+            if count <= self.max_entries and total <= self.max_bytes:
+                return 0
+            entries.sort()
+            removed = 0
+            for _, size, path in entries:
+                if count <= self.max_entries * 9 // 10 and total <= self.max_bytes * 9 // 10:
+                    break
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                count -= 1
+                total -= size
+        self.evictions += removed
+        return removed
+
+    def _read_totals(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.directory, STATS_FILE)) as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            stored = {}
+        return {name: stored.get(name, 0) for name in COUNTERS}
+
+    def flush(self):
+        """ Add the counters of this object to the shared statistics of the directory and reset them
+        """
+        if not any(getattr(self, name) for name in COUNTERS):
+            return
+        with self._locked():
+            totals = self._read_totals()
+            for name in COUNTERS:
+                totals[name] += getattr(self, name)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(totals, f)
+            os.replace(tmp, os.path.join(self.directory, STATS_FILE))
+        for name in COUNTERS:
+            setattr(self, name, 0)
+
+    def totals(self) -> Dict[str, int]:
+        """ Counters of every user of the directory, including the ones of this object not flushed yet
+        """
+        totals = self._read_totals()
+        for name in COUNTERS:
+            totals[name] += getattr(self, name)
+        return totals
+
+    def entries(self) -> Iterator[os.DirEntry]:
+        for e in os.scandir(self.directory):
+            if e.name.endswith(SUFFIX):
+                yield e
+
+    def clear(self):
+        """ Remove every entry and the statistics
+        """
+        with self._locked():
+            for e in self.entries():
+                try:
+                    os.unlink(e.path)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.unlink(os.path.join(self.directory, STATS_FILE))
+            except FileNotFoundError:
+                pass
+        for name in COUNTERS:
+            setattr(self, name, 0)
+
+    def report(self) -> List[str]:
+        """ Human readable summary of the directory
+        """
+        totals = self.totals()
+        count = size = 0
+        for e in self.entries():
+            try:
+                size += e.stat().st_size
+                count += 1
+            except FileNotFoundError:
+                pass
+        lookups = totals["hits"] + totals["misses"]
+        out = [f"entries {count}, {size} bytes"]
+        out += [f"{name} {value}" for name, value in totals.items()]
+        out.append(f"hit rate {totals['hits'] / lookups:.1%}" if lookups else "hit rate -")
+        return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mowhive.cache", description="Show or clear a mowhive result cache.")
+    parser.add_argument("directory", help="cache directory")
+    parser.add_argument("--clear", action="store_true", help="remove every entry and the statistics")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+
+    cache = ResultCache(args.directory)
+    if args.clear:
+        cache.clear()
+    print("\n".join(cache.report()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
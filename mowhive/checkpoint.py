@@ -0,0 +1,298 @@
+""" Snapshots of a running swarm, to inspect it midway or resume it after the process died.
+
+    A checkpoint file is the MAGIC followed by a log of records. Each record is a tag, the payload
+    length and its crc32, then the payload as little endian int64:
+    - a base record (tag B) holds every mower, its compiled program and the scheduler state
+    - a delta record (tag D) holds only the mowers that ran since the previous record, how many
+      mowers left the front of the ready queue and where waiting mowers were put back in it, the
+      new deadlocks and the wait-for graph, which only holds the mowers parked right now
+    Programs never change while running, only their counters, so they are written once in the base.
+    A record cut short by a crash fails its crc and is ignored, the last complete one is used.
+"""
+import mmap
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .mowerstate import CollitionProtocols
+if TYPE_CHECKING:
+    from .mowcontroller import ReadyQueue
+
+MAGIC = b"MOWCKPT2"
+RECORD = struct.Struct("<cII")
+BASE = b"B"
+DELTA = b"D"
+
+
+def _pack(values: Sequence[int]) -> bytes:
+    data = array("q", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _unpack(payload: bytes) -> array:
+    data = array("q")
+    data.frombytes(payload)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data
+
+
+class Snapshot:
+    """ State of a swarm run at a checkpoint, as read by load_snapshot
+
+        :param plateau_size: plateau size of the controller
+        :param collition_protocol: protocol of the controller
+    """
+    def __init__(self, plateau_size: Tuple[int, int], collition_protocol: CollitionProtocols):
+        self.plateau_size = plateau_size
+        self.collition_protocol = collition_protocol
+        # Scheduler steps run so far, one step is one run_mower call
+        self.steps = 0
+        # Per mower: x, y, orientation value, pc, offset
+        self.mowers: List[List[int]] = []
+        # Per mower compiled program opcodes, None for mowers without a path
+        self.programs: List[Optional[array]] = []
+        self.ready: List[int] = []
+        self.wait_for: Dict[int, int] = {}
+        self.deadlocks: List[List[int]] = []
+
+    def finished(self) -> bool:
+        return not self.ready
+
+    def copy(self) -> "Snapshot":
+        s = Snapshot(self.plateau_size, self.collition_protocol)
+        s.steps = self.steps
+        s.mowers = [list(m) for m in self.mowers]
+        s.programs = self.programs
+        s.ready = list(self.ready)
+        s.wait_for = dict(self.wait_for)
+        s.deadlocks = [list(c) for c in self.deadlocks]
+        return s
+
+
+class Checkpointer:
+    """ Writes snapshots of a swarm run every so many scheduler steps and/or seconds. Pass it to
+        MowController.move_swarm or MowController.resume. A final snapshot is written when the run ends.
+
+        :param path: checkpoint file, overwritten
+        :param every_steps: write a snapshot every this many scheduler steps
+        :param every_seconds: write a snapshot when this many seconds went by since the last one
+        :param use_mmap: write through a memory mapping of the file, grown as needed, instead of write calls
+    """
+    def __init__(self, path: str, every_steps: Optional[int] = None, every_seconds: Optional[float] = None, use_mmap: bool = False):
+        self.path = path
+        self.every_steps = every_steps
+        self.every_seconds = every_seconds
+        self.use_mmap = use_mmap
+        self.snapshots = 0
+        self._file = open(path, "w+b")
+        self._map: Optional[mmap.mmap] = None
+        self._size = 0
+        self._dirty = set()
+        self._steps = 0
+        self._since = 0
+        # Woken mowers put back in the ready queue since the last record, as (pops before, position, mower),
+        # and number of deadlocks at the last record
+        self._requeued: List[int] = []
+        self._deadlocks = 0
+        self._last = time.monotonic()
+        self._write(MAGIC)
+
+    def __enter__(self) -> "Checkpointer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, data: bytes):
+        if not self.use_mmap:
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            return
+        end = self._size + len(data)
+        if self._map is None or end > len(self._map):
+            # Grow the file by doubling and map it again
+            capacity = max(end, 2 * (len(self._map) if self._map is not None else 0), mmap.PAGESIZE)
+            if self._map is not None:
+                self._map.close()
+            self._file.truncate(capacity)
+            self._map = mmap.mmap(self._file.fileno(), capacity)
+        self._map[self._size:end] = data
+        self._size = end
+
+    def _record(self, tag: bytes, values: List[int]):
+        payload = _pack(values)
+        self._write(RECORD.pack(tag, len(payload), zlib.crc32(payload)) + payload)
+        self.snapshots += 1
+        self._dirty.clear()
+        self._requeued.clear()
+        self._since = 0
+        self._last = time.monotonic()
+
+    def _scheduler(self, controller, values: List[int]) -> List[int]:
+        # Every step pops one mower from the front of the ready queue and may put woken ones back anywhere
+        # in it. values starts with the pops and the insertions to replay, or for a base -1 and the whole
+        # queue. The wait-for graph and the new deadlocks follow
+        values.append(len(controller.wait_for))
+        for w, b in controller.wait_for.items():
+            values += (w, b)
+        values.append(len(controller.deadlocks) - self._deadlocks)
+        for cycle in controller.deadlocks[self._deadlocks:]:
+            values.append(len(cycle))
+            values.extend(cycle)
+        self._deadlocks = len(controller.deadlocks)
+        return values
+
+    def begin(self, controller, ready: "ReadyQueue", steps: int = 0):
+        """ Write a base snapshot with the whole fleet
+
+            :param steps: scheduler steps already run, when resuming
+        """
+        self._steps = steps
+        self._requeued.clear()
+        self._deadlocks = 0
+        values = [controller.plateau_size[0], controller.plateau_size[1], controller.collition_protocol.value,
+                  self._steps, len(controller.mowers)]
+        for m in controller.mowers:
+            program = m.program
+            if program is None:
+                values += (m.location.x, m.location.y, m.orientation.value, 0, 0, -1)
+            else:
+                values += (m.location.x, m.location.y, m.orientation.value, program.pc, program.offset, len(program.ops))
+                values.extend(program.ops)
+        values += (-1, len(ready))
+        values.extend(ready)
+        self._record(BASE, self._scheduler(controller, values))
+
+    def requeue(self, position: int, mow_id: int):
+        """ Note that a woken mower was put back at a position of the ready queue, by the mower
+            running now
+        """
+        self._requeued += (self._since + 1, position, mow_id)
+
+    def step(self, controller, mow_id: int):
+        """ Note that mow_id just ran, and write a delta snapshot if one is due
+        """
+        self._dirty.add(mow_id)
+        self._steps += 1
+        self._since += 1
+        if (self.every_steps is not None and self._since >= self.every_steps) or \
+           (self.every_seconds is not None and time.monotonic() - self._last >= self.every_seconds):
+            self.snapshot(controller)
+
+    def snapshot(self, controller):
+        """ Write a delta snapshot with the mowers that ran since the last one
+        """
+        values = [self._steps, len(self._dirty)]
+        for i in sorted(self._dirty):
+            m = controller.mowers[i]
+            program = m.program
+            values += (i, m.location.x, m.location.y, m.orientation.value,
+                       program.pc if program is not None else 0, program.offset if program is not None else 0)
+        values += (self._since, len(self._requeued) // 3)
+        values.extend(self._requeued)
+        self._record(DELTA, self._scheduler(controller, values))
+
+    def end(self, controller):
+        """ Write the final snapshot of a run
+        """
+        if self._since:
+            self.snapshot(controller)
+
+    def close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.truncate(self._size)
+        self._file.close()
+
+
+def _read_scheduler(s: Snapshot, values: array, i: int):
+    popped, n = values[i], values[i + 1]
+    i += 2
+    if popped < 0:
+        s.ready = values[i:i + n].tolist()
+        i += n
+    else:
+        done = 0
+        for _ in range(n):
+            pops, position, mow_id = values[i:i + 3]
+            del s.ready[:pops - done]
+            done = pops
+            s.ready.insert(position, mow_id)
+            i += 3
+        del s.ready[:popped - done]
+    n = values[i]
+    pairs = values[i + 1:i + 1 + 2 * n]
+    s.wait_for = dict(zip(pairs[::2], pairs[1::2]))
+    i += 1 + 2 * n
+    for _ in range(values[i]):
+        i += 1
+        s.deadlocks.append(values[i + 1:i + 1 + values[i]].tolist())
+        i += values[i]
+
+
+def _replay(path: str, fresh: bool) -> Iterator[Snapshot]:
+    # With fresh every snapshot is a new object, otherwise deltas are applied in place
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")
+    pos = len(MAGIC)
+    state: Optional[Snapshot] = None
+    while pos + RECORD.size <= len(data):
+        tag, length, crc = RECORD.unpack_from(data, pos)
+        payload = data[pos + RECORD.size:pos + RECORD.size + length]
+        if tag not in (BASE, DELTA) or len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        pos += RECORD.size + length
+        values = _unpack(payload)
+        if tag == BASE:
+            state = Snapshot((values[0], values[1]), CollitionProtocols(values[2]))
+            state.steps = values[3]
+            i = 5
+            for _ in range(values[4]):
+                x, y, o, pc, offset, n = values[i:i + 6]
+                state.mowers.append([x, y, o, pc, offset])
+                state.programs.append(None if n < 0 else values[i + 6:i + 6 + n])
+                i += 6 + max(n, 0)
+        elif state is None:
+            break
+        else:
+            if fresh:
+                state = state.copy()
+            state.steps = values[0]
+            i = 2
+            for _ in range(values[1]):
+                state.mowers[values[i]] = values[i + 1:i + 6].tolist()
+                i += 6
+        _read_scheduler(state, values, i)
+        yield state
+
+
+def iter_snapshots(path: str) -> Iterator[Snapshot]:
+    """ Yields the state at every snapshot of a checkpoint file, oldest first
+
+        :param path: file written by a Checkpointer
+    """
+    return _replay(path, True)
+
+
+def load_snapshot(path: str) -> Snapshot:
+    """ Returns the state at the last complete snapshot of a checkpoint file
+
+        :param path: file written by a Checkpointer
+    """
+    state = None
+    for state in _replay(path, False):
+        pass
+    if state is None:
+        raise ValueError(f"{path} has no complete snapshot")
+    return state
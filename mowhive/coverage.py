@@ -0,0 +1,283 @@
+""" Mowed area of a swarm run.
+
+    Every advance of a mower is a straight segment, so visited cells are recorded as segments: a
+    row interval (y, x0, x1) for east/west moves and a column interval (x, y0, y1) for north/south
+    ones, in flat arrays. Intervals are merged with NumPy by laying every row end to end on a line
+    (cell (x, y) is y * (plateau_size_x + 2) + x), and every column on another one, then sorting
+    them and taking a running maximum. Totals add up both merged sets and take off the cells where
+    a row and a column interval cross, counted with a sweep along x, so nothing is stored per cell.
+    Only the row interval outputs split merged columns into their distinct cells.
+"""
+from array import array
+from typing import List, Tuple
+
+import numpy as np
+
+from .mowcontroller import MowController
+from .obstacles import ObstacleMap
+
+Region = Tuple[int, int, int, int, int]
+
+
+def _merge(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Union of half open intervals as disjoint sorted intervals
+    """
+    if not len(starts):
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    # An interval opens a new run when it starts after everything before it has ended
+    new = np.concatenate(([True], starts[1:] > reach[:-1]))
+    first = np.flatnonzero(new)
+    last = np.concatenate((first[1:], [len(starts)])) - 1
+    return starts[first], reach[last]
+
+
+def _merge_segments(segments: np.ndarray, lines: int, stride: int, by_owner: bool) -> np.ndarray:
+    """ Union of (mow_id, line, start, end) segments, corners included, as disjoint ones sorted by
+        owner, line and start. With by_owner each mower is merged apart, otherwise the owner is 0
+
+        :param lines: number of lines, plateau rows or columns
+        :param stride: cells of a line plus one, so the intervals of two lines never touch
+    """
+    owners = segments[:, 0] if by_owner else np.zeros(len(segments), dtype=np.int64)
+    base = (owners * lines + segments[:, 1]) * stride
+    starts, ends = _merge(base + segments[:, 2], base + segments[:, 3] + 1)
+    line, start = np.divmod(starts, stride)
+    owner, line = np.divmod(line, lines)
+    return np.stack((owner, line, start, start + ends - starts - 1), axis=1)
+
+
+def _crossings(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """ Cells each merged column segment (owner, x, y0, y1) shares with the merged row segments
+        (owner, y, x0, x1) of the same owner. A sweep along x keeps a Fenwick tree of the rows open,
+        so it costs a few operations per segment whatever their length
+    """
+    counts = np.zeros(len(columns), dtype=np.int64)
+    if not len(rows) or not len(columns):
+        return counts
+    height = int(max(rows[:, 1].max(), columns[:, 3].max())) + 1
+    row_keys = rows[:, 0] * height + rows[:, 1]
+    keys = np.unique(row_keys)
+    slots = (np.searchsorted(keys, row_keys) + 1).tolist()
+    column_keys = columns[:, 0] * height
+    lows = np.searchsorted(keys, column_keys + columns[:, 2]).tolist()
+    highs = np.searchsorted(keys, column_keys + columns[:, 3], side="right").tolist()
+
+    # A row opens at x0 and closes past x1, a column is counted once every row up to its x is in
+    n_rows = len(rows)
+    xs = np.concatenate((rows[:, 2], rows[:, 3] + 1, columns[:, 1]))
+    kinds = np.concatenate((np.zeros(2 * n_rows, dtype=np.int64), np.ones(len(columns), dtype=np.int64)))
+    tree = [0] * (len(keys) + 1)
+    size = len(keys)
+    for e in np.lexsort((kinds, xs)).tolist():
+        if e < 2 * n_rows:
+            slot, delta = (slots[e], 1) if e < n_rows else (slots[e - n_rows], -1)
+            while slot <= size:
+                tree[slot] += delta
+                slot += slot & -slot
+            continue
+        c = e - 2 * n_rows
+        total = 0
+        k = highs[c]
+        while k:
+            total += tree[k]
+            k -= k & -k
+        k = lows[c]
+        while k:
+            total -= tree[k]
+            k -= k & -k
+        counts[c] = total
+    return counts
+
+
+class Coverage:
+    """ Records the cells visited by the mowers of a controller from now on: where they stand when
+        attached or registered, and every cell they advance into through the controller. Mowers moved
+        by other means (mowhive.engine, mowhive.partition workers) are not seen.
+
+        :param controller: MowController to record
+    """
+    def __init__(self, controller: MowController):
+        self.controller = controller
+        self.size_x, self.size_y = controller.plateau_size
+        # Line coordinate of cell (x, y) is y * stride + x, the extra cell keeps rows apart
+        self.stride = self.size_x + 2
+        # Flat (mow_id, y, x0, x1) and (mow_id, x, y0, y1), corners included
+        self.rows = array("q")
+        self.columns = array("q")
+        for i, m in enumerate(controller.mowers):
+            self.add(i, m.location.x, m.location.y)
+        controller.coverage = self
+
+    def detach(self):
+        if self.controller.coverage is self:
+            self.controller.coverage = None
+
+    def add(self, mow_id: int, x: int, y: int):
+        self.rows.extend((mow_id, y, x, x))
+
+    def segment(self, mow_id: int, x0: int, y0: int, x1: int, y1: int):
+        """ Record a straight move from (x0, y0) to (x1, y1)
+        """
+        if y0 == y1:
+            self.rows.extend((mow_id, y0, min(x0, x1), max(x0, x1)))
+        else:
+            self.columns.extend((mow_id, x0, min(y0, y1), max(y0, y1)))
+
+    @staticmethod
+    def _clip(segments: np.ndarray, size_line: int, size_along: int) -> np.ndarray:
+        # Only the part of (mow_id, line, start, end) segments inside the plateau, mowers can stand outside it
+        start = np.maximum(segments[:, 2], 0)
+        end = np.minimum(segments[:, 3], size_along)
+        keep = (segments[:, 1] >= 0) & (segments[:, 1] <= size_line) & (start <= end)
+        return np.stack((segments[keep, 0], segments[keep, 1], start[keep], end[keep]), axis=1)
+
+    def _merged(self, by_owner: bool) -> Tuple[np.ndarray, np.ndarray]:
+        # Recorded rows (owner, y, x0, x1) and columns (owner, x, y0, y1) inside the plateau, each set merged
+        rows = self._clip(np.frombuffer(self.rows, dtype=np.int64).reshape(-1, 4), self.size_y, self.size_x)
+        columns = self._clip(np.frombuffer(self.columns, dtype=np.int64).reshape(-1, 4), self.size_x, self.size_y)
+        return (_merge_segments(rows, self.size_y + 1, self.stride, by_owner),
+                _merge_segments(columns, self.size_x + 1, self.size_y + 2, by_owner))
+
+    def _intervals(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Every covered cell as half open row-major line intervals, merged columns split into their cells
+        rows, columns = self._merged(False)
+        lengths = columns[:, 3] - columns[:, 2] + 1
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        column_cells = (np.repeat(columns[:, 2], lengths) + offsets) * self.stride + np.repeat(columns[:, 1], lengths)
+        starts = np.concatenate((rows[:, 1] * self.stride + rows[:, 2], column_cells))
+        ends = np.concatenate((rows[:, 1] * self.stride + rows[:, 3] + 1, column_cells + 1))
+        return _merge(starts, ends)
+
+    def _totals(self, by_owner: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Cells of every merged row and column, less the ones a column shares with rows, with their owners
+        rows, columns = self._merged(by_owner)
+        column_cells = columns[:, 3] - columns[:, 2] + 1 - _crossings(rows, columns)
+        return rows[:, 0], rows[:, 3] - rows[:, 2] + 1, columns[:, 0], column_cells
+
+    def covered_cells(self) -> int:
+        """ Number of distinct cells visited by any mower
+        """
+        _, row_cells, _, column_cells = self._totals(False)
+        return int(row_cells.sum() + column_cells.sum())
+
+    def mowable_cells(self) -> int:
+        """ Cells of the plateau without an obstacle
+        """
+        return (self.size_x + 1) * (self.size_y + 1) - _count_obstacles(self.controller.obstacles)
+
+    def percentage(self) -> float:
+        """ Covered cells as a percentage of the mowable cells
+        """
+        mowable = self.mowable_cells()
+        return 100.0 * self.covered_cells() / mowable if mowable else 100.0
+
+    def per_mower(self) -> np.ndarray:
+        """ Distinct cells visited by each mower, indexed like MowController.mowers
+        """
+        n = len(self.controller.mowers)
+        row_owners, row_cells, column_owners, column_cells = self._totals(True)
+        return np.bincount(row_owners, weights=row_cells, minlength=n).astype(np.int64) + \
+            np.bincount(column_owners, weights=column_cells, minlength=n).astype(np.int64)
+
+    def row_intervals(self) -> np.ndarray:
+        """ Covered cells as merged row intervals, one (y, x0, x1) row each, corners included,
+            sorted by y and x0
+        """
+        return self._to_rows(*self._intervals())
+
+    def _to_rows(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        y = starts // self.stride
+        return np.stack((y, starts - y * self.stride, ends - 1 - y * self.stride), axis=1) if len(starts) else np.zeros((0, 3), dtype=np.int64)
+
+    def uncovered_intervals(self) -> np.ndarray:
+        """ Mowable cells nobody visited, as (y, x0, x1) row intervals, corners included, sorted by y and x0
+        """
+        starts, ends = self._intervals()
+        obstacle_starts, obstacle_ends = _obstacle_intervals(self.controller.obstacles, self.stride)
+        starts, ends = _merge(np.concatenate((starts, obstacle_starts)), np.concatenate((ends, obstacle_ends)))
+        # Every row as a full interval, minus the blocked ones
+        row_starts = np.arange(self.size_y + 1, dtype=np.int64) * self.stride
+        bounds = np.concatenate((row_starts, row_starts + self.size_x + 1, starts, ends))
+        kinds = np.concatenate((np.ones(len(row_starts), np.int64), -np.ones(len(row_starts), np.int64),
+                                -np.ones(len(starts), np.int64), np.ones(len(ends), np.int64)))
+        order = np.lexsort((kinds, bounds))
+        bounds, depth = bounds[order], np.cumsum(kinds[order])
+        # Free stretches are where the row is open and no blocked interval is, depth 1
+        opening = np.flatnonzero(depth == 1)
+        free_starts, free_ends = bounds[opening], bounds[opening + 1]
+        keep = free_ends > free_starts
+        return self._to_rows(free_starts[keep], free_ends[keep])
+
+    def uncovered_regions(self) -> List[Region]:
+        """ 4-connected regions of uncovered mowable cells, as (cells, x0, y0, x1, y1) with the
+            bounding box corners included, largest first
+        """
+        intervals = self.uncovered_intervals()
+        parent = list(range(len(intervals)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Intervals of consecutive rows touch when their x ranges overlap, walk both rows at once.
+        # Only rows holding intervals are visited, and only next to another one
+        present, firsts = np.unique(intervals[:, 0], return_index=True)
+        bounds = np.append(firsts, len(intervals)).tolist()
+        x0s, x1s = intervals[:, 1].tolist(), intervals[:, 2].tolist()
+        for k in np.flatnonzero(np.diff(present) == 1).tolist():
+            i, i_end = bounds[k], bounds[k + 1]
+            j, j_end = i_end, bounds[k + 2]
+            while i < i_end and j < j_end:
+                if x0s[i] <= x1s[j] and x0s[j] <= x1s[i]:
+                    ri, rj = find(i), find(j)
+                    if ri != rj:
+                        parent[max(ri, rj)] = min(ri, rj)
+                if x1s[i] < x1s[j]:
+                    i += 1
+                else:
+                    j += 1
+
+        regions = {}
+        for k, (y, x0, x1) in enumerate(intervals.tolist()):
+            r = find(k)
+            cells, rx0, ry0, rx1, ry1 = regions.get(r, (0, x0, y, x1, y))
+            regions[r] = (cells + x1 - x0 + 1, min(rx0, x0), min(ry0, y), max(rx1, x1), max(ry1, y))
+        return sorted(regions.values(), key=lambda region: -region[0])
+
+    def report(self) -> List[str]:
+        """ Human readable summary
+        """
+        covered, mowable = self.covered_cells(), self.mowable_cells()
+        out = [f"covered {covered} of {mowable} mowable cells ({self.percentage():.2f}%)"]
+        contributions = self.per_mower()
+        out += [f"mower {i} {int(c)}" for i, c in enumerate(contributions)]
+        return out
+
+
+def _count_obstacles(obstacles) -> int:
+    if obstacles is None:
+        return 0
+    if isinstance(obstacles, ObstacleMap):
+        return int(np.unpackbits(np.frombuffer(obstacles.bits, dtype=np.uint8)).sum())
+    return int(sum(np.unpackbits(np.frombuffer(tile, dtype=np.uint8)).sum() for tile in obstacles.tiles.values()))
+
+
+def _obstacle_intervals(obstacles, stride: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Obstacle cells as half open line intervals
+    if obstacles is None:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    if isinstance(obstacles, ObstacleMap):
+        n = obstacles.width * obstacles.height
+        cells = np.flatnonzero(np.unpackbits(np.frombuffer(obstacles.bits, dtype=np.uint8), bitorder="little")[:n])
+        x, y = cells % obstacles.width, cells // obstacles.width
+    else:
+        found = np.array(list(obstacles.cells()), dtype=np.int64).reshape(-1, 2)
+        x, y = found[:, 0], found[:, 1]
+    starts = np.sort(y * stride + x)
+    return _merge(starts, starts + 1)
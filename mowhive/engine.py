@@ -0,0 +1,76 @@
+""" Batch execution engine for STOP_ON_COLLITIONS.
+
+    Mowers still run one after the other (mower i finishes before mower i+1 starts), but each
+    route is executed straight from its compiled program in a single loop: a rotation is one
+    addition, and a whole advance run is one segment check, limited by the plateau bounds and the
+    obstacle map at once and then walked against the occupancy dict. There is no per step
+    dispatch, no MovementResult, and a mower only leaves and re-enters the occupancy once per
+    route. Nothing is allocated per plateau cell.
+"""
+from .errors import UnsupportedCollitionProtocol
+from .mowcontroller import DISPLACEMENT_DELTAS, MowController
+from .mowerstate import CARDINALS, CollitionProtocols
+
+
+def run_batch(controller: MowController):
+    """ Execute the swarm of a controller like MowController.move_swarm, with every advance run
+        checked as one segment. Only STOP_ON_COLLITIONS is supported, and no statistics, traces
+        or coverage are recorded.
+
+        :param controller: MowController with its mowers registered
+    """
+    if controller.collition_protocol is not CollitionProtocols.STOP_ON_COLLITIONS:
+        raise UnsupportedCollitionProtocol(controller.collition_protocol)
+    controller.isolated = None
+    controller.history = None
+
+    plateau = controller.plateau
+    occupancy = plateau.occupancy
+    obstacles = plateau.obstacles
+    size_x, size_y = plateau.size_x, plateau.size_y
+    for i, m in enumerate(controller.mowers):
+        program = m.program
+        if program is None or program.finished():
+            continue
+        ops = program.ops
+        n = len(ops)
+        pc, offset = program.pc, program.offset
+        location = m.location
+        x, y = location.x, location.y
+        o = m.orientation.value
+        dx, dy = DISPLACEMENT_DELTAS[o]
+
+        # Out of the occupancy while it runs, nobody else moves meanwhile
+        del occupancy[(x, y)]
+        while pc < n:
+            operation = ops[pc]
+            pc += 1
+            if operation < 0:
+                o = (o - operation) % len(CARDINALS)
+                dx, dy = DISPLACEMENT_DELTAS[o]
+                continue
+
+            steps = operation - offset
+            offset = 0
+            if 0 <= x <= size_x and 0 <= y <= size_y:
+                if dx:
+                    room = size_x - x if dx > 0 else x
+                else:
+                    room = size_y - y if dy > 0 else y
+            else:
+                room = plateau.free_run(x, y, dx, dy)
+            reach = steps if steps < room else room
+            if obstacles is not None and reach:
+                reach = obstacles.free_run(x, y, dx, dy, reach)
+            # A failed move drops the rest of the run, as every following M targets the same cell
+            while reach and (x + dx, y + dy) not in occupancy:
+                x += dx
+                y += dy
+                reach -= 1
+
+        occupancy[(x, y)] = i
+        location.x = x
+        location.y = y
+        m.orientation = CARDINALS[o]
+        program.pc = n
+        program.offset = 0
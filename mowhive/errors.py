@@ -1,4 +1,5 @@
-from .mowerstate import Movements, Mower
+from typing import List, Optional
+from .mowerstate import CollitionProtocols, Movements, Mower
 
 class MownerRegisterException(Exception):
     def __str__(self) -> str:
@@ -34,7 +35,8 @@ class AttemptedOutOfBoundsMovement(MovementException):
         return f"{super().__str__()} Attempted to move mower out of plateau bounds."
 
 class MowerObstructingPath(MovementException):
-    def __init__(self, x:int, y:int):
+    def __init__(self, x:int, y:int, m: Optional[Mower]=None):
+        super().__init__(m)
         self.x = x
         self.y = y
     
@@ -44,3 +46,19 @@ class MowerObstructingPath(MovementException):
 class UnknownObstacleinPath(MovementException):
     def __str__(self) -> str:
         return f"{super().__str__()} Unknown Obstacle in front of mower."
+
+class UnsupportedCollitionProtocol(Exception):
+    def __init__(self, protocol: CollitionProtocols, *args: object):
+        super().__init__(*args)
+        self.protocol = protocol
+
+    def __str__(self) -> str:
+        return f"{super().__str__()} Collition protocol {self.protocol.name} is not supported here."
+
+class MowersDeadlocked(Exception):
+    def __init__(self, cycle: List[int], *args: object):
+        super().__init__(*args)
+        self.cycle = cycle
+
+    def __str__(self) -> str:
+        return f"{super().__str__()} Mowers {self.cycle} are waiting on each other."
@@ -0,0 +1,102 @@
+from array import array
+from typing import Iterator, List, Optional
+from .mowerstate import CARDINALS, Cardinal, Coord, Mower, PathProgram
+
+
+class CoordView(Coord):
+    """ Coord whose x and y live in a Fleet's arrays, writes go straight to the fleet
+    """
+    __slots__ = ("_fleet", "_i")
+
+    def __init__(self, fleet: "Fleet", i: int):
+        self._fleet = fleet
+        self._i = i
+
+    @property
+    def x(self) -> int:
+        return self._fleet.xs[self._i]
+
+    @x.setter
+    def x(self, value: int):
+        self._fleet.xs[self._i] = value
+
+    @property
+    def y(self) -> int:
+        return self._fleet.ys[self._i]
+
+    @y.setter
+    def y(self, value: int):
+        self._fleet.ys[self._i] = value
+
+
+class MowerView(Mower):
+    """ Mower backed by the i-th slot of a Fleet. Views are cheap and disposable,
+        the state is always read from and written to the fleet arrays.
+    """
+    __slots__ = ("_fleet", "_i")
+
+    def __init__(self, fleet: "Fleet", i: int):
+        self._fleet = fleet
+        self._i = i
+
+    @property
+    def location(self) -> Coord:
+        return CoordView(self._fleet, self._i)
+
+    @location.setter
+    def location(self, c: Coord):
+        self._fleet.xs[self._i] = c.x
+        self._fleet.ys[self._i] = c.y
+
+    @property
+    def orientation(self) -> Cardinal:
+        return CARDINALS[self._fleet.orientations[self._i]]
+
+    @orientation.setter
+    def orientation(self, o: Cardinal):
+        self._fleet.orientations[self._i] = o.value
+
+    @property
+    def program(self) -> Optional[PathProgram]:
+        return self._fleet.programs[self._i]
+
+    @program.setter
+    def program(self, program: Optional[PathProgram]):
+        self._fleet.programs[self._i] = program
+
+
+class Fleet:
+    """ Struct-of-arrays storage for mowers: x, y and orientation are kept in typed arrays
+        instead of one Mower and one Coord object per mower. It behaves as a list of Mower,
+        indexing returns a MowerView over the arrays.
+
+        :param typecode: array typecode used for the coordinates, 'l' by default
+    """
+    def __init__(self, typecode: str = "l"):
+        self.xs = array(typecode)
+        self.ys = array(typecode)
+        self.orientations = array("b")
+        self.programs: List[Optional[PathProgram]] = []
+
+    def append(self, m: Mower):
+        self.xs.append(m.location.x)
+        self.ys.append(m.location.y)
+        self.orientations.append(m.orientation.value)
+        self.programs.append(m.program)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __getitem__(self, i: int) -> MowerView:
+        if i < 0:
+            i += len(self.xs)
+        if not 0 <= i < len(self.xs):
+            raise IndexError("Fleet index out of range")
+        return MowerView(self, i)
+
+    def __iter__(self) -> Iterator[MowerView]:
+        for i in range(len(self.xs)):
+            yield MowerView(self, i)
+
+    def __eq__(self, other) -> bool:
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
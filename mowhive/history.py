@@ -0,0 +1,115 @@
+""" Per mower record of a STOP_ON_COLLITIONS swarm run, to re-run it after one path changes.
+
+    Under STOP_ON_COLLITIONS mowers run once each in registration order, and mower i only sees the
+    final cells of the mowers before it and the starting cells of the mowers after it. So when the
+    path of mower k changes, mowers 0..k-1 keep their final state and only k onwards need a look.
+    A later mower can only try to enter cells inside the box its program can reach from its start
+    (see mowhive.partition), and it only behaves differently if one of those cells changed: the
+    old or new final cell of a mower re-run before it that ended elsewhere. Mowers whose box holds
+    none of them get their recorded final state back without running.
+"""
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .mowerstate import CARDINALS, PathProgram
+from .stats import SwarmStats
+if TYPE_CHECKING:
+    from .mowcontroller import MowController
+
+Box = Tuple[int, int, int, int]
+# x, y and orientation value of a mower
+State = Tuple[int, int, int]
+
+
+def _box(state: State, program: Optional[PathProgram]) -> Box:
+    x, y, o = state
+    if program is None:
+        return x, y, x, y
+    north, east, south, west = program.reach(CARDINALS[o])
+    return x - west, y - south, x + east, y + north
+
+
+def _copy(program: Optional[PathProgram]) -> Optional[PathProgram]:
+    return None if program is None else PathProgram(program.ops, program.pc, program.offset)
+
+
+class RunHistory:
+    """ State of every mower before and after its run, kept by MowController.move_swarm_incremental.
+        Created before the run, end is called after it
+
+        :param controller: MowController about to run, under STOP_ON_COLLITIONS
+    """
+    def __init__(self, controller: "MowController"):
+        self.starts: List[State] = []
+        # Programs as they were before the run, the controller's ones are used up by it
+        self.programs: List[Optional[PathProgram]] = []
+        self.boxes: List[Box] = []
+        self.finals: List[State] = []
+        for m in controller.mowers:
+            state = (m.location.x, m.location.y, m.orientation.value)
+            self.starts.append(state)
+            self.programs.append(_copy(m.program))
+            self.boxes.append(_box(state, m.program))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def end(self, controller: "MowController"):
+        """ Record the final state of every mower
+        """
+        self.finals = [(m.location.x, m.location.y, m.orientation.value) for m in controller.mowers]
+
+    def rerun(self, controller: "MowController", mow_id: int, program: Optional[PathProgram], stats: Optional[SwarmStats] = None) -> List[int]:
+        """ Give mow_id a new program and bring the controller to the final state of a full run with it.
+            Returns the mowers that were run again, mow_id first
+
+            :param controller: MowController in the final state recorded by end
+            :param mow_id: index of the mower whose program changed
+            :param program: new program of the mower
+            :param stats: optional SwarmStats where the movements of the mowers run again are counted
+        """
+        starts, finals, boxes = self.starts, self.finals, self.boxes
+        mowers = controller.mowers
+        plateau = controller.plateau
+        occupancy = controller.occupancy
+        n = len(starts)
+        if stats is not None:
+            stats.collition_protocol = controller.collition_protocol
+            stats.resize(n)
+
+        # Put the occupancy back to what mow_id saw: mowers after it in their starting cells.
+        # All of them leave first, a final cell can be the starting cell of another one
+        for i in range(mow_id, n):
+            if finals[i][:2] != starts[i][:2]:
+                del occupancy[finals[i][:2]]
+        for i in range(mow_id, n):
+            if finals[i][:2] != starts[i][:2]:
+                plateau.place(starts[i][0], starts[i][1], i)
+
+        self.programs[mow_id] = _copy(program)
+        boxes[mow_id] = _box(starts[mow_id], program)
+        # Cells whose occupancy differs from the recorded run, at the point the loop is at
+        changed: List[Tuple[int, int]] = []
+        out = []
+        for i in range(mow_id, n):
+            x0, y0, x1, y1 = boxes[i]
+            if i != mow_id and (not changed or not any(x0 <= x <= x1 and y0 <= y <= y1 for x, y in changed)):
+                # Same cells seen as in the recorded run, so same moves: the mower is still in its final state
+                if finals[i][:2] != starts[i][:2]:
+                    plateau.relocate(starts[i][0], starts[i][1], finals[i][0], finals[i][1], i)
+                continue
+
+            m = mowers[i]
+            x, y, o = starts[i]
+            location = m.location
+            location.x = x
+            location.y = y
+            m.orientation = CARDINALS[o]
+            m.program = _copy(self.programs[i])
+            controller.run_mower(i, stats)
+            final = (location.x, location.y, m.orientation.value)
+            if final[:2] != finals[i][:2]:
+                changed.append(finals[i][:2])
+                changed.append(final[:2])
+            finals[i] = final
+            out.append(i)
+        return out
@@ -0,0 +1,309 @@
+""" Asyncio front end for a live fleet, where each mower sends its commands as it goes instead of
+    the whole route up front.
+
+    python -m mowhive.live 1000 1000 --protocol AWAIT_ON_COLLITIONS --port 7777
+    python -m mowhive.live 1000 1000 --unix /tmp/mowhive.sock
+
+    Commands submitted during an event loop iteration are executed together on the next one, in
+    arrival order, with the collition protocol of the controller. Under AWAIT_ON_COLLITIONS an
+    obstructed mower keeps its command pending and is resumed once its blocker has left the cell,
+    like in MowController.move_swarm. A blocker may never move again, so waits can be given a timeout.
+
+    Line protocol of the server, every request starts with a tag echoed in its reply so requests
+    can be pipelined and replies come back as soon as they are ready:
+        <tag> REGISTER <x> <y> <orientation>  ->  <tag> OK <mower id>
+        <tag> MOVE <mower id> <movements>     ->  <tag> OK <x> <y> <orientation>
+        <tag> STATE <mower id>                ->  <tag> OK <x> <y> <orientation>
+    A failed request is answered with <tag> ERR <reason>.
+"""
+import argparse
+import asyncio
+import sys
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from .errors import MovementException, MowersDeadlocked, PlaceOccupied
+from .mowcontroller import MowController, ReadyQueue
+from .mowerstate import Cardinal, CollitionProtocols, PathProgram
+
+MowerState = Tuple[int, int, Cardinal]
+
+
+class LiveController:
+    """ Runs the commands of live mowers on a MowController, batched per event loop iteration.
+        Must be used from the thread running the event loop.
+
+        :param controller: MowController holding the plateau and the fleet
+        :param wait_timeout: seconds a command can wait on a blocker before failing with asyncio.TimeoutError,
+                             forever by default
+    """
+    def __init__(self, controller: MowController, wait_timeout: Optional[float] = None):
+        self.controller = controller
+        self.wait_timeout = wait_timeout
+        self.handlers = controller.PROTOCOL_HANDLERS[controller.collition_protocol]
+        controller.wait_for = {}
+        controller.deadlocks = []
+        # Mower -> commands not finished yet, the first one is being executed
+        self._commands: Dict[int, Deque[Tuple[PathProgram, asyncio.Future]]] = {}
+        # Blocker -> mowers waiting on it, in the order they started waiting
+        self._waiters: Dict[int, List[int]] = {}
+        # Mowers that got a command while idle since the last batch
+        self._incoming: List[int] = []
+        # Waiting mower -> timer failing its command
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._scheduled = False
+        # Mower -> its position in the round of the batch running, and the mowers in that order
+        self._round: Dict[int, int] = {}
+        self._round_ids: List[int] = []
+        self.batches = 0
+        self.commands = 0
+
+    def register(self, x: int, y: int, o: Cardinal) -> int:
+        """ Register a mower and return its id
+        """
+        if not self.controller.register_mower(x, y, o):
+            raise PlaceOccupied(x, y)
+        return len(self.controller.mowers) - 1
+
+    def state(self, mow_id: int) -> MowerState:
+        m = self.controller.mowers[mow_id]
+        return m.location.x, m.location.y, m.orientation
+
+    def submit(self, mow_id: int, path: Union[str, PathProgram]) -> asyncio.Future:
+        """ Queue movements for a mower, after the ones it already has. Returns a future with the
+            state of the mower once they are executed, or the exception of the protocol
+
+            :param mow_id: mower id, as returned by register
+            :param path: movements, such as "LMLMM", or a compiled PathProgram
+        """
+        if not 0 <= mow_id < len(self.controller.mowers):
+            raise IndexError(f"Unknown mower {mow_id}")
+        program = PathProgram.from_string(path) if isinstance(path, str) else path
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._commands.setdefault(mow_id, deque())
+        queue.append((program, future))
+        if len(queue) == 1:
+            self._wake(mow_id)
+        return future
+
+    def _wake(self, mow_id: int):
+        # Run mow_id in the next batch
+        self._incoming.append(mow_id)
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._run_batch)
+
+    async def move(self, mow_id: int, path: Union[str, PathProgram]) -> MowerState:
+        return await self.submit(mow_id, path)
+
+    def _run_batch(self):
+        self._scheduled = False
+        self.batches += 1
+        # The ready queue goes round the positions of the mowers in the batch, arrival order as
+        # move_swarm's registration order
+        self._round_ids = self._incoming
+        self._incoming = []
+        self._round = {mow_id: k for k, mow_id in enumerate(self._round_ids)}
+        ready = ReadyQueue(range(len(self._round_ids)))
+        while ready:
+            self._run(self._round_ids[ready.popleft()], ready)
+
+    def _requeue(self, w: int, ready: ReadyQueue):
+        # Put w back in the ready queue where the round gets to it next.
+        # Mowers waiting since an earlier batch join the round at its end
+        position = self._round.get(w)
+        if position is None:
+            position = self._round[w] = len(self._round_ids)
+            self._round_ids.append(w)
+        ready.insert(position)
+
+    def _run(self, mow_id: int, ready: ReadyQueue):
+        # Execute the pending commands of a mower until they are done or it has to wait
+        controller = self.controller
+        m = controller.mowers[mow_id]
+        location = m.location
+        x, y = location.x, location.y
+        queue = self._commands[mow_id]
+        obstruction = None
+        while queue:
+            program, future = queue[0]
+            m.program = program
+            try:
+                obstruction = controller.run_mower(mow_id, None, self.handlers)
+            except MovementException as e:
+                queue.popleft()
+                _settle(future, exception=e)
+                continue
+            if obstruction is not None:
+                break
+            queue.popleft()
+            self.commands += 1
+            _settle(future, (location.x, location.y, m.orientation))
+        if not queue:
+            del self._commands[mow_id]
+            m.program = None
+
+        # Wake up whoever was waiting on this mower if it vacated its cell
+        if mow_id in self._waiters and (location.x, location.y) != (x, y):
+            for w in self._waiters.pop(mow_id):
+                del controller.wait_for[w]
+                if controller.trace is not None:
+                    controller.trace.requeue(w)
+                if w in self._timers:
+                    self._timers.pop(w).cancel()
+                self._requeue(w, ready)
+
+        if obstruction is not None:
+            blocker = obstruction.mow_int
+            controller.wait_for[mow_id] = blocker
+            self._waiters.setdefault(blocker, []).append(mow_id)
+            chain = controller.blocking_chain(mow_id)
+            if chain[-1] == mow_id:
+                self._break_deadlock(chain[:-1], ready)
+            elif self.wait_timeout is not None:
+                self._timers[mow_id] = asyncio.get_running_loop().call_later(self.wait_timeout, self._expire, mow_id)
+
+    def _unpark(self, mow_id: int, error: BaseException) -> bool:
+        # Take a waiting mower out of the wait-for graph and fail its command.
+        # Returns whether it has more commands to run
+        blocker = self.controller.wait_for.pop(mow_id)
+        self._waiters[blocker].remove(mow_id)
+        if not self._waiters[blocker]:
+            del self._waiters[blocker]
+        if mow_id in self._timers:
+            self._timers.pop(mow_id).cancel()
+        queue = self._commands[mow_id]
+        _settle(queue.popleft()[1], exception=error)
+        if queue:
+            return True
+        del self._commands[mow_id]
+        self.controller.mowers[mow_id].program = None
+        return False
+
+    def _expire(self, mow_id: int):
+        self._timers.pop(mow_id, None)
+        if mow_id in self.controller.wait_for and self._unpark(mow_id, asyncio.TimeoutError(f"Mower {mow_id} waited too long")):
+            self._wake(mow_id)
+
+    def _break_deadlock(self, cycle: List[int], ready: ReadyQueue):
+        # Nobody in the cycle can ever move, fail their current command and let them carry on with the next
+        self.controller.deadlocks.append(cycle)
+        error = MowersDeadlocked(cycle)
+        for w in cycle:
+            if self._unpark(w, error):
+                self._requeue(w, ready)
+
+
+def _settle(future: asyncio.Future, result=None, exception: Optional[BaseException] = None):
+    # The client may have given up on the command
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def _format_state(state: MowerState) -> str:
+    x, y, o = state
+    return f"OK {x} {y} {o.name}"
+
+
+async def _reply(writer: asyncio.StreamWriter, tag: str, request):
+    try:
+        reply = await request
+    except Exception as e:
+        reply = f"ERR {type(e).__name__} {e}".rstrip()
+    if not writer.is_closing():
+        writer.write(f"{tag} {reply}\n".encode())
+
+
+def _handle(live: LiveController, line: str):
+    # Returns the reply of a request, or an awaitable for MOVE
+    words = line.split()
+    command, args = words[0].upper(), words[1:]
+    if command == "REGISTER":
+        return f"OK {live.register(int(args[0]), int(args[1]), Cardinal[args[2]])}"
+    if command == "MOVE":
+        mow_id = int(args[0])
+        return live.submit(mow_id, args[1] if len(args) > 1 else "")
+    if command == "STATE":
+        return _format_state(live.state(int(args[0])))
+    raise ValueError(f"Unknown command {command}")
+
+
+async def _serve_client(live: LiveController, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    pending = set()
+    try:
+        async for raw in reader:
+            line = raw.decode().strip()
+            if not line:
+                continue
+            tag, _, request = line.partition(" ")
+            try:
+                reply = _handle(live, request)
+            except Exception as e:
+                writer.write(f"{tag} ERR {type(e).__name__} {e}".rstrip().encode() + b"\n")
+                continue
+            if isinstance(reply, str):
+                writer.write(f"{tag} {reply}\n".encode())
+            else:
+                task = asyncio.ensure_future(_reply(writer, tag, _moved(reply)))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await writer.drain()
+        if pending:
+            await asyncio.gather(*pending)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _moved(future: asyncio.Future) -> str:
+    return _format_state(await future)
+
+
+async def serve(live: LiveController, host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+    """ Start serving the line protocol of this module, on TCP or on a Unix socket.
+        Returns the started server, port 0 picks a free port
+
+        :param live: LiveController executing the commands
+        :param host: TCP address to listen on
+        :param port: TCP port to listen on
+        :param unix_path: listen on this Unix socket instead of TCP
+    """
+    client = lambda reader, writer: _serve_client(live, reader, writer)
+    if unix_path is not None:
+        return await asyncio.start_unix_server(client, unix_path)
+    return await asyncio.start_server(client, host, port)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m mowhive.live", description="Serve a live mowhive fleet.")
+    parser.add_argument("plateau_size_x", type=int)
+    parser.add_argument("plateau_size_y", type=int)
+    parser.add_argument("--protocol", choices=[p.name for p in CollitionProtocols], default=CollitionProtocols.AWAIT_ON_COLLITIONS.name)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--unix", help="Unix socket path, instead of TCP")
+    parser.add_argument("--wait-timeout", type=float, help="seconds a command can wait on a blocker, forever by default")
+    args = parser.parse_args(argv)
+
+    async def run():
+        controller = MowController(args.plateau_size_x, args.plateau_size_y, collition_protocol=CollitionProtocols[args.protocol])
+        server = await serve(LiveController(controller, args.wait_timeout), args.host, args.port, args.unix)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
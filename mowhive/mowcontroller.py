@@ -1,22 +1,110 @@
 import enum
-from queue import Queue
-from typing import List, Tuple, Optional
-from .mowerstate import Mower, Cardinal, Coord, CollitionProtocols, MovementResult, MovementSucess, Movements, ObstructingMower, OutOfBounds, UnknownObstacle
+import sys
+import time
+from bisect import bisect_left
+from operator import is_not
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Iterator, List, Tuple, Optional, Union
+from .fleet import Fleet
+from .obstacles import ObstacleMap
+from .plateau import Plateau, TiledBitmap
+from .stats import SwarmStats
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .checkpoint import Checkpointer, Snapshot
+    from .coverage import Coverage
+    from .history import RunHistory
+    from .trace import TraceRecorder
+from .mowerstate import CARDINALS, OUT_OF_BOUNDS, ROTATIONS, SUCCESS, UNKNOWN_OBSTACLE, Mower, Cardinal, Coord, CollitionProtocols, MovementResult, Movements, ObstructingMower, OutOfBounds, PathProgram, UnknownObstacle
 from .errors import AttemptedOutOfBoundsMovement, InvalidOperationExecution, PlaceOccupied, MowerObstructingPath, UnknownObstacleinPath
 
 # Thought as North East South West, 
 # how much you'd need to add to a coordinate to displace in that direction
 DISPLACEMENT_OPERATIONS = [Coord(0,1), Coord(1,0), Coord(0,-1), Coord(-1,0)]
+# Same displacements as plain tuples, so moving a mower does not allocate a Coord
+DISPLACEMENT_DELTAS = [(c.x, c.y) for c in DISPLACEMENT_OPERATIONS]
+
+# Orientation of every Cardinal value as written by write_current_state
+STATE_NAMES = [c.name.encode() for c in CARDINALS]
+
+# SwarmStats counter of each rejected movement
+RESULT_COUNTERS = {ObstructingMower: "obstructions", OutOfBounds: "out_of_bounds", UnknownObstacle: "obstacles"}
+
+
+class ReadyQueue:
+    """ Ready queue of a swarm run going round its keys in ascending order. The keys after the last one
+        popped come first, then the ones before it for the next round, so a key put back waits for the
+        round to get to it again.
+        Each part is a list of negated keys in ascending order: the next key is popped from the end, and
+        a key is put back with one bisect.
+
+        :param keys: keys in queue order, an ascending run then the keys of the next round
+    """
+    __slots__ = ("_now", "_next", "last")
+
+    def __init__(self, keys: Iterable[int] = ()):
+        keys = list(keys)
+        split = next((k for k in range(1, len(keys)) if keys[k] < keys[k - 1]), len(keys))
+        self._now = [-k for k in reversed(keys[:split])]
+        self._next = [-k for k in reversed(keys[split:])]
+        # Key popped last, the round is after it
+        self.last = -1
+
+    def popleft(self) -> int:
+        if not self._now:
+            self._now, self._next = self._next, self._now
+        self.last = -self._now.pop()
+        return self.last
+
+    def insert(self, key: int) -> int:
+        """ Put a key back where the round gets to it. Returns its position in the queue
+        """
+        part = self._now if key > self.last else self._next
+        k = bisect_left(part, -key)
+        part.insert(k, -key)
+        position = len(part) - 1 - k
+        return position if part is self._now else position + len(self._now)
+
+    def __iter__(self) -> Iterator[int]:
+        for part in (self._now, self._next):
+            for k in reversed(part):
+                yield -k
+
+    def __len__(self) -> int:
+        return len(self._now) + len(self._next)
 
 
 class MowController:
-    def __init__(self, plateau_size_x: int, plateau_size_y: int, collition_protocol: CollitionProtocols = CollitionProtocols.STOP_ON_COLLITIONS, ignore_unregisterable_mowers=False):
-        self.mowers: List[Mower] = []
+    def __init__(self, plateau_size_x: int, plateau_size_y: int, collition_protocol: CollitionProtocols = CollitionProtocols.STOP_ON_COLLITIONS, ignore_unregisterable_mowers=False, compact_fleet=False, obstacles: Optional[Union[ObstacleMap, TiledBitmap]]=None):
+        # compact_fleet keeps the mowers in a struct-of-arrays Fleet, meant for very large fleets
+        # obstacles is an optional ObstacleMap or TiledBitmap, moving into one of its cells gives UnknownObstacle
+        self.plateau = Plateau(plateau_size_x, plateau_size_y, obstacles)
+        self.mowers: Union[List[Mower], Fleet] = Fleet() if compact_fleet else []
+        # Coordinate -> index in self.mowers, kept in sync by register_mower and move_mower
+        self.occupancy: Dict[Tuple[int, int], int] = self.plateau.occupancy
         self.plateau_size: Tuple[int, int] = (plateau_size_x, plateau_size_y)
         self.ignore_unregisterable_mowers = ignore_unregisterable_mowers
         #TODO implement collition protocols
         self.collition_protocol = collition_protocol
+        # Wait-for graph and deadlocks found by the last move_swarm under AWAIT_ON_COLLITIONS
+        self.wait_for: Dict[int, int] = {}
+        self.deadlocks: List[List[int]] = []
+        # TraceRecorder attached with mowhive.trace.TraceRecorder(controller), nothing is recorded by default
+        self.trace: Optional["TraceRecorder"] = None
+        # Coverage attached with mowhive.coverage.Coverage(controller), visited cells are not recorded by default
+        self.coverage: Optional["Coverage"] = None
+        # One byte per mower, set for the mowers no other mower can obstruct: their moves skip the occupancy
+        # lookups. Set by mowhive.analysis.RouteAnalysis.skip_isolated_checks, cleared by register_mower, move_mower
+        # and the end of a swarm run, and ignored once a mower got another program than the analysed one
+        self.isolated: Optional[bytes] = None
+        self.isolated_programs: List[Optional[PathProgram]] = []
+        # Per mower states of the last move_swarm_incremental run, which change_path re-runs from.
+        # Cleared by register_mower, move_mower, move_swarm and resume
+        self.history: Optional["RunHistory"] = None
     
+    @property
+    def obstacles(self) -> Optional[Union[ObstacleMap, TiledBitmap]]:
+        return self.plateau.obstacles
+
     def who_is_there_c(self, c: Coord) -> int:
         """ Returns the index of the mower in the coordinate c present in controller.mowers.
             If there is none, None will be returned
@@ -32,9 +120,7 @@ class MowController:
             :param x: x coordinate to check
             :param y: y coordinate to check
         """
-        for i, m in enumerate(self.mowers):
-            if m.location.x == x and m.location.y == y:
-                return i
+        return self.plateau.mower_at(x, y)
 
     def is_a_mower_there_c(self, c: Coord)-> bool:
         """ Returns a boolean according to whether there is a mower in the Coord c's x and y components
@@ -49,23 +135,39 @@ class MowController:
             :param x: x coordinate to check
             :param y: y coordinate to check
         """
-        return any(m.location.x == x and m.location.y == y for m in self.mowers)
+        return self.plateau.is_occupied(x, y)
+
+    def is_an_obstacle_there(self, x: int, y: int) -> bool:
+        """ Returns a boolean according to whether there is an obstacle in the x and y coordinate
+
+            :param x: x coordinate to check
+            :param y: y coordinate to check
+        """
+        return self.plateau.obstacle_at(x, y)
 
-    def register_mower(self, x: int, y: int, o: Cardinal, desired_path: Optional[List[Movements]]=None) -> bool:
+    def register_mower(self, x: int, y: int, o: Cardinal, desired_path: Optional[Union[List[Movements], PathProgram]]=None) -> bool:
         """ Register mower in controller with the respective coordinates, orientation and optional desired path
 
             :param x: x coordinate of mower
             :param y: y coordinate of mower
             :param o: Orientation of mower of type Cardinal
-            :param desired_path: Optional desired path, List[Movements] with default None
+            :param desired_path: Optional desired path, List[Movements] or an already compiled PathProgram with default None.
+                                 It is compiled into a PathProgram on registration
         """
-        if self.is_a_mower_there(x,y):
+        if self.is_a_mower_there(x,y) or self.is_an_obstacle_there(x, y):
             if self.ignore_unregisterable_mowers:
                 return False
             else:
                 raise PlaceOccupied(x,y)
         
+        self.isolated = None
+        self.history = None
+        self.plateau.place(x, y, len(self.mowers))
         self.mowers.append(Mower(Coord(x,y), o, desired_path))
+        if self.trace is not None:
+            self.trace.add(x, y, o)
+        if self.coverage is not None:
+            self.coverage.add(len(self.mowers) - 1, x, y)
         return True
     
     def move_mower(self, mow_id: int) -> MovementResult:
@@ -73,98 +175,449 @@ class MowController:
 
             :param mow_id: index of mower in MowerController.mowers
         """
+        self.isolated = None
+        self.history = None
+        done, result = self.advance_mower(mow_id, 1)
+        if self.trace is not None:
+            if done:
+                self.trace.forward(mow_id, done)
+            else:
+                self.trace.reject(mow_id, result)
+        return result
+
+    def advance_mower(self, mow_id: int, steps: int, check_occupancy: bool = True) -> Tuple[int, MovementResult]:
+        """ Move mower up to steps cells towards the direction it is facing, stopping before the first
+            cell it cannot enter. The bounds and obstacles are checked once for the whole segment.
+            Returns how many cells the mower advanced and the result of its last attempted move
+
+            :param mow_id: index of mower in MowerController.mowers
+            :param steps: number of cells to advance
+            :param check_occupancy: look for other mowers on the way, only safe to turn off for a mower no other can obstruct
+        """
         mowie = self.mowers[mow_id]
-        destination_coord = mowie.location + DISPLACEMENT_OPERATIONS[mowie.orientation.value]
+        location = mowie.location
+        x, y = location.x, location.y
+        dx, dy = DISPLACEMENT_DELTAS[mowie.orientation.value]
+        plateau = self.plateau
+        reach = min(steps, plateau.free_run(x, y, dx, dy))
+        blocked = False
+        if plateau.obstacles is not None:
+            clear = plateau.obstacles.free_run(x, y, dx, dy, reach)
+            blocked = clear < reach
+            reach = clear
 
-        # Check that is within the plateau
-        if 0 <= destination_coord.x <= self.plateau_size[0] and 0 <= destination_coord.y <= self.plateau_size[1]:
-            if self.is_a_mower_there_c(destination_coord):
-                who_is = self.who_is_there_c(destination_coord)
-                return ObstructingMower(who_is)
-            else:
-                mowie.location = destination_coord
-                return MovementSucess()
+        occupancy = plateau.occupancy
+        who_is = None
+        done = 0
+        if not check_occupancy:
+            x += dx * reach
+            y += dy * reach
+            done = reach
+        while done < reach:
+            who_is = occupancy.get((x + dx, y + dy))
+            if who_is is not None:
+                break
+            x += dx
+            y += dy
+            done += 1
+
+        if done:
+            if self.coverage is not None:
+                self.coverage.segment(mow_id, location.x, location.y, x, y)
+            plateau.relocate(location.x, location.y, x, y, mow_id)
+            location.x = x
+            location.y = y
+
+        if done == steps:
+            return done, SUCCESS
+        elif who_is is not None:
+            return done, ObstructingMower(who_is)
+        elif blocked:
+            return done, UNKNOWN_OBSTACLE
         else:
-            return OutOfBounds()
-        
+            return done, OUT_OF_BOUNDS
+
     def rotate_mower(self, mow_id: int, direction: Movements) -> MovementResult:
         """ Rotate mower in mow_id according to direction
 
             :param mow_id: index of mower in MowerController.mowers
             :param direction: direction of type Movements. Should be L or R
         """
-        if direction not in [Movements.L, Movements.R]:
+        if direction not in ROTATIONS:
             raise InvalidOperationExecution(direction, "Tried to use a Movement that is not of rotation kind.")
 
+        result = self.turn_mower(mow_id, direction.value)
+        if self.trace is not None:
+            self.trace.turn(mow_id, direction.value)
+        return result
+
+    def turn_mower(self, mow_id: int, quarter_turns: int) -> MovementResult:
+        """ Rotate mower in mow_id clockwise by a number of quarter turns
+
+            :param mow_id: index of mower in MowerController.mowers
+            :param quarter_turns: quarter turns to rotate, Movements.R.value per R and Movements.L.value per L
+        """
         mowie = self.mowers[mow_id]
-        final_direction_value = (mowie.orientation.value + direction.value) % len(Cardinal)
-        final_direction = Cardinal(final_direction_value)
+        final_direction_value = (mowie.orientation.value + quarter_turns) % len(Cardinal)
+        final_direction = CARDINALS[final_direction_value]
         mowie.orientation = final_direction
-        return MovementSucess()
+        return SUCCESS
     
-    def move_swarm(self):
-        """ Perform mower movement simulation/execution
-            we use a queue to allow for AWAIT_ON_COLLITIONS protocol
-            but if not needed, a simple cycle around the mowers is enough
-        """
-        to_process: Queue[Tuple[int, Mower]] = Queue()
-        for i, m in enumerate(self.mowers):
-            to_process.put((i,m))
-
-        deferred = 0
-        # Continue until all mowers are ready or all are deferred (in case of AWAIT_ON_COLLITIONS) 
-        while to_process.qsize() !=0 and deferred != len(self.mowers):
-            i, m = to_process.get()
-            if m.desired_path:
-                # Try to complete the mower's route
-                while len(m.desired_path) != 0:
-                    operation = m.desired_path[0]
-                    result = MovementResult()
-
-                    if operation in [Movements.L, Movements.R]:
-                        result = self.rotate_mower(i, operation)
-                    elif operation == Movements.M:
-                        result = self.move_mower(i)
-
-                    # All good
-                    if type(result) is MovementSucess:
-                        deferred = 0
-                        m.desired_path.pop(0)
-                    
-                    # Something came up, work according protocols
-                    # Ignore collitions
-                    if self.collition_protocol is CollitionProtocols.STOP_ON_COLLITIONS:
-                        if type(result) in [ObstructingMower, OutOfBounds, UnknownObstacle]:
-                            m.desired_path.pop(0)                    
-                    
-                    # Abort on colliition
-                    elif self.collition_protocol is CollitionProtocols.ABORT_ON_COLLITIONS:
-                        if type(result) is ObstructingMower:
-                            raise MowerObstructingPath( self.mowers[result.mow_int].location.x,
-                                                        self.mowers[result.mow_int].location.y)
-                        elif type(result) is OutOfBounds:
-                            raise AttemptedOutOfBoundsMovement(m)
-                        elif type(result) is UnknownObstacle:
-                            raise UnknownObstacleinPath(m)
-                    
-                    # Await on colliition
-                    elif self.collition_protocol is CollitionProtocols.AWAIT_ON_COLLITIONS:
-                        # Requeue mower in hope the obstructing one will move
-                        if type(result) is ObstructingMower:
-                            deferred +=1
-                            to_process.put((i,m))
-                            break
-                        # Ignore other situations
-                        elif type(result) in [OutOfBounds, UnknownObstacle]:
-                            deferred = 0
-                            m.desired_path.pop(0)
+    def _skip(self, mow_id: int, program: PathProgram, result: MovementResult, rejected: int, stats: Optional[SwarmStats]) -> bool:
+        # Drop the rest of the failed advance and carry on with the route
+        if stats is not None:
+            getattr(stats, RESULT_COUNTERS[type(result)])[mow_id] += rejected
+        if self.trace is not None:
+            self.trace.reject(mow_id, result, rejected)
+        program.pc += 1
+        program.offset = 0
+        return False
+
+    def _abort(self, mow_id: int, program: PathProgram, result: MovementResult, rejected: int, stats: Optional[SwarmStats]) -> bool:
+        m = self.mowers[mow_id]
+        if stats is not None:
+            getattr(stats, RESULT_COUNTERS[type(result)])[mow_id] += 1
+        if self.trace is not None:
+            self.trace.reject(mow_id, result)
+        if type(result) is ObstructingMower:
+            raise MowerObstructingPath( self.mowers[result.mow_int].location.x,
+                                        self.mowers[result.mow_int].location.y,
+                                        m)
+        elif type(result) is OutOfBounds:
+            raise AttemptedOutOfBoundsMovement(m)
+        else:
+            raise UnknownObstacleinPath(m)
+
+    def _defer(self, mow_id: int, program: PathProgram, result: MovementResult, rejected: int, stats: Optional[SwarmStats]) -> bool:
+        # Stop here, the mower is requeued in hope the obstructing one will move
+        if stats is not None:
+            stats.obstructions[mow_id] += 1
+        if self.trace is not None:
+            self.trace.defer(mow_id)
+        return True
+
+    # What each protocol does with each rejected movement. A handler returns whether the mower is deferred
+    PROTOCOL_HANDLERS = {
+        # Ignore collitions
+        CollitionProtocols.STOP_ON_COLLITIONS: {ObstructingMower: _skip, OutOfBounds: _skip, UnknownObstacle: _skip},
+        # Abort on colliition
+        CollitionProtocols.ABORT_ON_COLLITIONS: {ObstructingMower: _abort, OutOfBounds: _abort, UnknownObstacle: _abort},
+        # Await on colliition, only other mowers are waited for
+        CollitionProtocols.AWAIT_ON_COLLITIONS: {ObstructingMower: _defer, OutOfBounds: _skip, UnknownObstacle: _skip},
+    }
+
+    def run_mower(self, mow_id: int, stats: Optional[SwarmStats] = None, handlers: Optional[dict] = None) -> Optional[ObstructingMower]:
+        """ Execute the program of a mower until it is finished or, under AWAIT_ON_COLLITIONS,
+            until another mower obstructs it. Returns the obstruction that deferred the mower, if any
+
+            :param mow_id: index of mower in MowerController.mowers
+            :param stats: optional SwarmStats where movement outcomes are counted
+            :param handlers: entry of PROTOCOL_HANDLERS to use, looked up from the collition protocol by default
+        """
+        program = self.mowers[mow_id].program
+        if program is None:
+            return None
+        if handlers is None:
+            handlers = self.PROTOCOL_HANDLERS[self.collition_protocol]
+        ops = program.ops
+        trace = self.trace
+        check_occupancy = self.isolated is None or not self.isolated[mow_id]
+        # Try to complete the mower's route
+        while program.pc < len(ops):
+            operation = ops[program.pc]
+
+            # Rotations always succeed
+            if operation < 0:
+                self.turn_mower(mow_id, -operation)
+                program.pc += 1
+                if stats is not None:
+                    stats.successes[mow_id] += -operation // len(Cardinal)
+                if trace is not None:
+                    trace.turn(mow_id, -operation)
+                continue
+
+            steps = operation - program.offset
+            done, result = self.advance_mower(mow_id, steps, check_occupancy)
+            if stats is not None:
+                stats.successes[mow_id] += done
+            if trace is not None and done:
+                trace.forward(mow_id, done)
+
+            # All good
+            if result is SUCCESS:
+                program.pc += 1
+                program.offset = 0
+                continue
+
+            # Something came up, the mower may have advanced part of the way.
+            # Every remaining M of the run would hit the same obstacle, as nothing else moves meanwhile
+            program.offset += done
+            if handlers[type(result)](self, mow_id, program, result, steps - done, stats):
+                return result
+        return None
+
+    def move_swarm(self, stats: Union[bool, SwarmStats, None] = False, checkpoint: Optional["Checkpointer"] = None, cache: Optional["ResultCache"] = None) -> Optional[SwarmStats]:
+        """ Perform mower movement simulation/execution, mowers run one after the other in registration order.
+
+            Under AWAIT_ON_COLLITIONS a mower obstructed by another one is parked in a wait-for graph
+            (MowController.wait_for, waiting mower -> blocking mower) and is only put back in the ready
+            queue once its blocker has left the cell, where it runs when the round of the mowers in
+            registration order gets to it again. Cycles in the graph are deadlocks, they are
+            recorded in MowController.deadlocks. Mowers still waiting at the end are left in wait_for.
+
+            :param stats: True or a SwarmStats to collect execution statistics, which are then returned.
+                          Nothing is collected by default
+            :param checkpoint: optional Checkpointer writing snapshots of the run, see MowController.resume
+            :param cache: optional mowhive.cache.ResultCache. If it holds the outcome of the same scenario the
+                          mowers are put in their final state without running, otherwise the outcome is stored
+                          once the run ends with every program finished. A cached outcome only has the cache
+                          phase in its stats, which are marked cached. Not used with a checkpoint, trace or coverage, which need the run
+        """
+        self.wait_for = {}
+        self.deadlocks = []
+        self.history = None
+        if cache is not None and checkpoint is None and self.trace is None and self.coverage is None:
+            return self._cached_swarm(cache, stats)
+        return self._run_swarm(ReadyQueue(range(len(self.mowers))), 0, stats, checkpoint)
+
+    def move_swarm_incremental(self, stats: Union[bool, SwarmStats, None] = False) -> Optional[SwarmStats]:
+        """ move_swarm under STOP_ON_COLLITIONS, keeping the state of every mower before and after its run
+            in MowController.history, so change_path can later re-run only what a path change affects
+
+            :param stats: True or a SwarmStats to collect execution statistics, which are then returned
+        """
+        if self.collition_protocol is not CollitionProtocols.STOP_ON_COLLITIONS:
+            raise ValueError(f"Incremental runs need STOP_ON_COLLITIONS, not {self.collition_protocol.name}")
+        from .history import RunHistory
+        history = RunHistory(self)
+        stats = self.move_swarm(stats)
+        history.end(self)
+        self.history = history
+        return stats
+
+    def change_path(self, mow_id: int, desired_path: Optional[Union[List[Movements], PathProgram]], stats: Optional[SwarmStats] = None) -> List[int]:
+        """ Replace the path of a mower of the last move_swarm_incremental run and bring the swarm to the
+            final state a full run with the new path gives. Mowers before mow_id keep their state, and later
+            mowers are only run again if a cell they can reach was left or taken differently than before.
+            Returns the mowers run again, mow_id first
+
+            :param mow_id: index of mower in MowerController.mowers
+            :param desired_path: new path, List[Movements] or a compiled PathProgram, run from the mower's
+                                 starting state
+            :param stats: optional SwarmStats where the movements of the mowers run again are counted
+        """
+        if self.history is None or len(self.history) != len(self.mowers):
+            raise ValueError("change_path needs a move_swarm_incremental run and no changes to the swarm since")
+        if self.trace is not None or self.coverage is not None:
+            raise ValueError("change_path cannot be used with a trace or coverage attached")
+        if desired_path is not None and not isinstance(desired_path, PathProgram):
+            desired_path = PathProgram.compile(desired_path)
+        self.isolated = None
+        return self.history.rerun(self, mow_id, desired_path, stats)
+
+    def _cached_swarm(self, cache: "ResultCache", stats: Union[bool, SwarmStats, None]) -> Optional[SwarmStats]:
+        from .cache import restore
+        start = time.perf_counter()
+        key = cache.key(self)
+        states = cache.get(key)
+        if states is None:
+            lookup = time.perf_counter() - start
+            stats = self._run_swarm(ReadyQueue(range(len(self.mowers))), 0, stats, None)
+            start = time.perf_counter()
+            # Mowers left waiting are not a final state, nor is a run stopped by an exception
+            if not self.wait_for:
+                cache.put(key, self.show_current_state())
+        else:
+            lookup = 0.0
+            restore(self, states)
+            if stats is True:
+                stats = SwarmStats()
+            elif stats is False:
+                stats = None
+            if stats is not None:
+                stats.collition_protocol = self.collition_protocol
+                stats.resize(len(self.mowers))
+                stats.cached = True
+        if stats is not None:
+            stats.add_time("cache", lookup + time.perf_counter() - start)
+        return stats
+
+    def resume(self, snapshot: Union[str, "Snapshot"], stats: Union[bool, SwarmStats, None] = False, checkpoint: Optional["Checkpointer"] = None) -> Optional[SwarmStats]:
+        """ Continue a move_swarm run from a snapshot written by a Checkpointer. The final state is the same
+            as if the run had never stopped. The controller must have the plateau size, collition protocol and
+            obstacles of the interrupted one; if it has no mowers they are registered from the snapshot,
+            otherwise its mowers are rewound or fast-forwarded to it.
+
+            :param snapshot: Snapshot or path of a checkpoint file, whose last complete snapshot is used
+            :param stats: True or a SwarmStats to collect execution statistics of the rest of the run
+            :param checkpoint: optional Checkpointer writing snapshots of the rest of the run
+        """
+        if isinstance(snapshot, str):
+            from .checkpoint import load_snapshot
+            snapshot = load_snapshot(snapshot)
+        if snapshot.plateau_size != self.plateau_size or snapshot.collition_protocol is not self.collition_protocol:
+            raise ValueError(f"Snapshot of a {snapshot.collition_protocol.name} run on a {snapshot.plateau_size} plateau does not match the controller")
+        if self.mowers and len(self.mowers) != len(snapshot.mowers):
+            raise ValueError(f"Snapshot has {len(snapshot.mowers)} mowers, the controller {len(self.mowers)}")
+
+        register = not self.mowers
+        self.isolated = None
+        self.history = None
+        self.occupancy.clear()
+        for i, ((x, y, o, pc, offset), ops) in enumerate(zip(snapshot.mowers, snapshot.programs)):
+            program = None if ops is None else PathProgram(ops, pc, offset)
+            if register:
+                self.register_mower(x, y, CARDINALS[o], program)
+                continue
+            m = self.mowers[i]
+            location = m.location
+            location.x = x
+            location.y = y
+            m.orientation = CARDINALS[o]
+            m.program = program
+            self.plateau.place(x, y, i)
+
+        self.wait_for = dict(snapshot.wait_for)
+        self.deadlocks = [list(cycle) for cycle in snapshot.deadlocks]
+        return self._run_swarm(ReadyQueue(snapshot.ready), snapshot.steps, stats, checkpoint)
+
+    def _run_swarm(self, ready: ReadyQueue, steps: int, stats: Union[bool, SwarmStats, None], checkpoint: Optional["Checkpointer"]) -> Optional[SwarmStats]:
+        if stats is True:
+            stats = SwarmStats()
+        elif stats is False:
+            stats = None
+        if stats is not None:
+            stats.collition_protocol = self.collition_protocol
+            stats.resize(len(self.mowers))
+            start = time.perf_counter()
+
+        if self.isolated is not None:
+            programs = self.mowers.programs if isinstance(self.mowers, Fleet) else [m.program for m in self.mowers]
+            if any(map(is_not, programs, self.isolated_programs)):
+                self.isolated = None
+        handlers = self.PROTOCOL_HANDLERS[self.collition_protocol]
+        # Blocker -> mowers waiting on it, in the order they started waiting, as in wait_for
+        waiters: Dict[int, List[int]] = {}
+        for w, blocker in self.wait_for.items():
+            waiters.setdefault(blocker, []).append(w)
+        if checkpoint is not None:
+            checkpoint.begin(self, ready, steps)
+
+        while ready:
+            i = ready.popleft()
+            location = self.mowers[i].location
+            x, y = location.x, location.y
+            obstruction = self.run_mower(i, stats, handlers)
+
+            # Wake up whoever was waiting on this mower if it vacated its cell. The ready queue goes round
+            # the mowers in registration order, a woken mower gets back its place in that round
+            if i in waiters and (location.x, location.y) != (x, y):
+                for w in waiters.pop(i):
+                    del self.wait_for[w]
+                    position = ready.insert(w)
+                    if checkpoint is not None:
+                        checkpoint.requeue(position, w)
+                    if stats is not None:
+                        stats.requeues[w] += 1
+                    if self.trace is not None:
+                        self.trace.requeue(w)
+
+            if obstruction is not None:
+                blocker = obstruction.mow_int
+                self.wait_for[i] = blocker
+                waiters.setdefault(blocker, []).append(i)
+                chain = self.blocking_chain(i)
+                if chain[-1] == i:
+                    self.deadlocks.append(chain[:-1])
+                if stats is not None:
+                    stats.defers[i] += 1
+                    stats.record_chain(chain)
+
+            if checkpoint is not None:
+                checkpoint.step(self, i)
+
+        if checkpoint is not None:
+            checkpoint.end(self)
+        # The analysis was of the programs this run used up
+        self.isolated = None
+        if stats is not None:
+            stats.add_time("simulate", time.perf_counter() - start)
+        return stats
+
+    def blocking_chain(self, mow_id: int) -> List[int]:
+        """ Follow the wait-for graph from a mower. Returns the mowers in the chain, starting with mow_id.
+            If the chain is a cycle it ends with mow_id again
+
+            :param mow_id: index of mower in MowerController.mowers
+        """
+        chain = [mow_id]
+        seen = {mow_id}
+        blocker = self.wait_for.get(mow_id)
+        while blocker is not None:
+            chain.append(blocker)
+            if blocker in seen:
+                break
+            seen.add(blocker)
+            blocker = self.wait_for.get(blocker)
+        return chain
+
+    def iter_current_state(self) -> Iterator[str]:
+        """ Yields the state of every mower, as show_current_state, without building the whole list
+        """
+        mowers = self.mowers
+        if isinstance(mowers, Fleet):
+            names = [c.name for c in CARDINALS]
+            for x, y, o in zip(mowers.xs, mowers.ys, mowers.orientations):
+                yield f"{x} {y} {names[o]}"
+            return
+        for m in mowers:
+            location = m.location
+            yield f"{location.x} {location.y} {m.orientation.name}"
 
     def show_current_state(self):
-        out = []
-        for m in self.mowers:
-            out.append(f"{m.location.x} {m.location.y} {m.orientation.name}")
-        return out
-    
+        return list(self.iter_current_state())
+
+    def write_current_state(self, out: BinaryIO, buffer_size: int = 1 << 16) -> int:
+        """ Write the state of every mower, one "x y O" line each, to a binary file object.
+            Lines are gathered in a buffer that is written out and reused whenever it fills up.
+            Returns the number of mowers written
+
+            :param out: binary file object, such as sys.stdout.buffer
+            :param buffer_size: bytes gathered before each write
+        """
+        mowers = self.mowers
+        if isinstance(mowers, Fleet):
+            states = zip(mowers.xs, mowers.ys, mowers.orientations)
+        else:
+            states = ((m.location.x, m.location.y, m.orientation.value) for m in mowers)
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+        pos = 0
+        n = 0
+        for x, y, o in states:
+            line = b"%d %d %s\n" % (x, y, STATE_NAMES[o])
+            size = len(line)
+            n += 1
+            # Written out before it overflows, a line that does not fit even alone skips the buffer
+            if pos + size > buffer_size:
+                if pos:
+                    out.write(view[:pos])
+                    pos = 0
+                if size > buffer_size:
+                    out.write(line)
+                    continue
+            view[pos:pos + size] = line
+            pos += size
+        if pos:
+            out.write(view[:pos])
+        return n
+
     def print_current_state(self):
-        for s in self.show_current_state():
-            print(s)
\ No newline at end of file
+        out = getattr(sys.stdout, "buffer", None)
+        if out is None:
+            for s in self.iter_current_state():
+                print(s)
+            return
+        sys.stdout.flush()
+        self.write_current_state(out)
+        out.flush()
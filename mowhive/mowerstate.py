@@ -1,5 +1,8 @@
+import re
+from array import array
 from enum import Enum
-from typing import Optional, List
+from itertools import groupby
+from typing import Iterable, Optional, List, Tuple, Union
 
 class Cardinal(Enum):
     N = 0
@@ -7,27 +10,40 @@ class Cardinal(Enum):
     S = 2
     W = 3
 
+# Cardinal by value, cheaper than calling Cardinal(value) on every rotation
+CARDINALS = tuple(Cardinal)
+
 class Movements(Enum):
     # We take advantage of the algebraic properties of the modulo N set (modulo 4 in this case) 
     L = len(Cardinal) - 1
     R = 1
     M = 2
 
+ROTATIONS = frozenset((Movements.L, Movements.R))
+
 class MovementResult:
-    pass
+    __slots__ = ()
 
 class MovementSucess(MovementResult):
-    pass
+    __slots__ = ()
 
 class ObstructingMower(MovementResult):
+    __slots__ = ("mow_int",)
+
     def __init__(self, mow_id: int) -> None:
         self.mow_int = mow_id
 
 class OutOfBounds(MovementResult):
-    pass
+    __slots__ = ()
 
 class UnknownObstacle(MovementResult):
-    pass
+    __slots__ = ()
+
+# Results without details are shared, the controller never allocates them.
+# Only ObstructingMower, which carries the obstructing mower, is created per collition
+SUCCESS = MovementSucess()
+OUT_OF_BOUNDS = OutOfBounds()
+UNKNOWN_OBSTACLE = UnknownObstacle()
 
 class CollitionProtocols(Enum):
     STOP_ON_COLLITIONS=0
@@ -35,6 +51,8 @@ class CollitionProtocols(Enum):
     AWAIT_ON_COLLITIONS=3
 
 class Coord:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -51,11 +69,142 @@ class Coord:
     def __sub__(self, other):
         return Coord(self.x - other.x, self.y - other.y)
 
+class PathProgram:
+    """ A desired path compiled into a compact opcode stream, executed with a program counter.
+        Each opcode is an int: a positive k advances the mower k cells, a negative -(r + 4 * c)
+        rotates it r quarter turns clockwise, c being the number of L and R it was folded from.
+        Consecutive rotations are folded (LLL turns like a single R) and runs of M are merged into
+        one advance. Turning by -opcode modulo 4 ignores c, which only counts movements.
+
+        :param ops: compiled opcodes
+        :param pc: index of the opcode to execute next
+        :param offset: cells of the current advance already travelled
+    """
+    __slots__ = ("ops", "pc", "offset")
+
+    def __init__(self, ops: Iterable[int], pc: int = 0, offset: int = 0):
+        self.ops = ops if isinstance(ops, (array, memoryview)) else array("l", ops)
+        self.pc = pc
+        self.offset = offset
+
+    @classmethod
+    def compile(cls, path: Iterable[Movements]) -> "PathProgram":
+        """ Compile a sequence of Movements
+
+            :param path: movements to compile
+        """
+        return cls.from_runs((op, sum(1 for _ in run)) for op, run in groupby(path))
+
+    @classmethod
+    def from_string(cls, line: str) -> "PathProgram":
+        """ Compile a path written as a string such as "LMLMLMLMM". Movements are looked up
+            once per run of equal characters instead of once per character
+
+            :param line: path to compile
+        """
+        return cls.from_runs((Movements[c], sum(1 for _ in run)) for c, run in groupby(line))
+
+    @classmethod
+    def from_bytes(cls, line: bytes) -> "PathProgram":
+        """ Compile a path read from a binary stream, such as b"LMLMLMLMM". Runs of equal
+            movements are found with a regular expression, so no Python code runs per character
+
+            :param line: path to compile, trailing newline characters are ignored
+        """
+        line = line.rstrip(b"\r\n")
+        unknown = line.translate(None, b"LRM")
+        if unknown:
+            raise KeyError(unknown[:1].decode(errors="replace"))
+        return cls.from_runs((_BYTE_MOVEMENTS[run[0]], len(run)) for run in _BYTE_RUNS.findall(line))
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[Tuple[Movements, int]]) -> "PathProgram":
+        """ Compile a path given as (movement, repetitions) runs
+
+            :param runs: iterable of movement and how many times in a row it is performed
+        """
+        ops = array("l")
+        rotation = rotations = 0
+        for op, n in runs:
+            if op is Movements.M:
+                if rotations:
+                    ops.append(-(rotation % len(Cardinal) + len(Cardinal) * rotations))
+                    rotation = rotations = 0
+                if ops and ops[-1] > 0:
+                    ops[-1] += n
+                else:
+                    ops.append(n)
+            else:
+                rotation += op.value * n
+                rotations += n
+        if rotations:
+            ops.append(-(rotation % len(Cardinal) + len(Cardinal) * rotations))
+        return cls(ops)
+
+    def finished(self) -> bool:
+        return self.pc >= len(self.ops)
+
+    def reach(self, orientation: Cardinal) -> Tuple[int, int, int, int]:
+        """ Most cells the rest of the program can take the mower towards N, E, S and W, starting
+            with the given orientation. Rotations always succeed, so the heading of every move is
+            known beforehand whatever happens to the moves
+
+            :param orientation: current orientation of the mower
+        """
+        out = [0, 0, 0, 0]
+        heading = orientation.value
+        offset = self.offset
+        for op in self.ops[self.pc:]:
+            if op > 0:
+                out[heading] += op - offset
+                offset = 0
+            else:
+                heading = (heading - op) % len(Cardinal)
+        return out[0], out[1], out[2], out[3]
+
+    def remaining(self) -> List[Movements]:
+        """ Movements still to be executed, in their folded form: each rotation is written as R
+            then L, as many of them as it was folded from, so they compile back to the same program
+        """
+        out = []
+        offset = self.offset
+        for op in self.ops[self.pc:]:
+            if op > 0:
+                out.extend([Movements.M] * (op - offset))
+                offset = 0
+            else:
+                quarter_turns, rotations = -op % len(Cardinal), -op // len(Cardinal)
+                # Each L turns two quarters more than an R
+                lefts = (quarter_turns - rotations) % len(Cardinal) // 2
+                out.extend([Movements.R] * (rotations - lefts))
+                out.extend([Movements.L] * lefts)
+        return out
+
+
+_BYTE_MOVEMENTS = {ord(op.name): op for op in Movements}
+_BYTE_RUNS = re.compile(rb"M+|L+|R+")
+
+
 class Mower:
-    def __init__(self, location: Coord, orientation: Cardinal, desired_path: Optional[List[Movements]]=None):
+    __slots__ = ("location", "orientation", "program")
+
+    def __init__(self, location: Coord, orientation: Cardinal, desired_path: Optional[Union[List[Movements], PathProgram]]=None):
         self.location = location
         self.orientation = orientation
         self.desired_path = desired_path
+
+    @property
+    def desired_path(self) -> Optional[List[Movements]]:
+        """ Remaining movements of the mower, decoded from its compiled program
+        """
+        return None if self.program is None else self.program.remaining()
+
+    @desired_path.setter
+    def desired_path(self, path: Optional[Union[List[Movements], PathProgram]]):
+        if path is None or isinstance(path, PathProgram):
+            self.program = path
+        else:
+            self.program = PathProgram.compile(path)
     
     def __str__(self):
         return f"Mower<location:{self.location}, orientation:{self.orientation.name}, remaining_path:{self.desired_path}>"
@@ -0,0 +1,155 @@
+import mmap
+import struct
+from typing import Iterable, Optional, Tuple, Union
+
+# File layout: magic, width and height as little endian uint32, then the packed bitmap
+MAGIC = b"MOWOBST1"
+HEADER = struct.Struct("<8sII")
+
+
+class ObstacleMap:
+    """ Static obstacles of a plateau (trees, ponds, sheds...) kept as a packed bitmap, one bit per cell.
+        Cell (x, y) is bit y * width + x, least significant bit first, so a 10k x 10k plateau takes 12.5MB.
+
+        :param plateau_size_x: plateau size in x, as given to MowController
+        :param plateau_size_y: plateau size in y, as given to MowController
+        :param bits: existing bitmap to use (bytes, bytearray, mmap or memoryview), a clear one is allocated by default
+    """
+    def __init__(self, plateau_size_x: int, plateau_size_y: int, bits: Optional[Union[bytearray, memoryview, bytes]] = None):
+        self.width = plateau_size_x + 1
+        self.height = plateau_size_y + 1
+        size = (self.width * self.height + 7) // 8
+        self.bits = bytearray(size) if bits is None else bits
+        if len(self.bits) < size:
+            raise ValueError(f"Bitmap of {len(self.bits)} bytes is too small for a {self.width}x{self.height} plateau")
+
+    def __reduce__(self):
+        # Memory mapped bitmaps cannot be pickled, send a copy of the bits instead
+        return (ObstacleMap, (self.width - 1, self.height - 1, bytearray(self.bits)))
+
+    @classmethod
+    def from_rectangles(cls, plateau_size_x: int, plateau_size_y: int, rectangles: Iterable[Tuple[int, int, int, int]]) -> "ObstacleMap":
+        """ Build a map from rectangles given as (x0, y0, x1, y1), corners included
+
+            :param rectangles: obstacle rectangles
+        """
+        obstacles = cls(plateau_size_x, plateau_size_y)
+        for rectangle in rectangles:
+            obstacles.add_rectangle(*rectangle)
+        return obstacles
+
+    @classmethod
+    def from_raster(cls, lines: Iterable[str], blocked: str = "#") -> "ObstacleMap":
+        """ Build a map from a text raster, one line per row. As on a map, the first line is the
+            northmost row (y = plateau_size_y) and the first column is x = 0. The plateau size is
+            taken from the raster.
+
+            :param lines: raster rows, e.g. the lines of a file
+            :param blocked: character marking an obstacle, any other character is free
+        """
+        rows = [line.rstrip("\r\n") for line in lines]
+        rows = [row for row in rows if row]
+        width = max((len(row) for row in rows), default=1)
+        obstacles = cls(width - 1, max(len(rows), 1) - 1)
+        for i, row in enumerate(rows):
+            y = len(rows) - 1 - i
+            for x, c in enumerate(row):
+                if c == blocked:
+                    obstacles.add(x, y)
+        return obstacles
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> "ObstacleMap":
+        """ Load a map saved with ObstacleMap.save. By default the file is memory mapped
+            instead of read, so large maps are paged in on demand
+
+            :param path: map file
+            :param use_mmap: map the file instead of reading it into memory
+        """
+        with open(path, "rb") as f:
+            if use_mmap:
+                data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                data = memoryview(f.read())
+        magic, width, height = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an obstacle map")
+        return cls(width - 1, height - 1, data[HEADER.size:])
+
+    def save(self, path: str):
+        """ Write the map in the binary format read by ObstacleMap.load
+        """
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.width, self.height))
+            f.write(self.bits)
+
+    def add(self, x: int, y: int):
+        i = y * self.width + x
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def add_rectangle(self, x0: int, y0: int, x1: int, y1: int):
+        """ Mark a rectangle as blocked, corners included and clipped to the plateau
+        """
+        x0, x1 = max(min(x0, x1), 0), min(max(x0, x1), self.width - 1)
+        y0, y1 = max(min(y0, y1), 0), min(max(y0, y1), self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+        for y in range(y0, y1 + 1):
+            self._set_range(y * self.width + x0, y * self.width + x1 + 1)
+
+    def _set_range(self, start: int, end: int):
+        # Set bits [start, end): partial bytes one bit at a time, whole bytes at once
+        while start < end and start & 7:
+            self.bits[start >> 3] |= 1 << (start & 7)
+            start += 1
+        whole = (end - start) >> 3
+        if whole:
+            self.bits[start >> 3:(start >> 3) + whole] = b"\xff" * whole
+            start += whole << 3
+        while start < end:
+            self.bits[start >> 3] |= 1 << (start & 7)
+            start += 1
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        """ Returns whether there is an obstacle in (x, y), which must be inside the plateau
+        """
+        i = y * self.width + x
+        return bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def __contains__(self, c: Tuple[int, int]) -> bool:
+        return self.is_blocked(c[0], c[1])
+
+    def free_run(self, x: int, y: int, dx: int, dy: int, limit: int) -> int:
+        """ Returns how many cells a mower in (x, y) can advance in the (dx, dy) direction before the
+            first obstacle, up to limit. The limit cells must be inside the plateau. Along x the bits
+            of the row segment are read as one integer instead of one cell at a time
+
+            :param x: x coordinate to start from
+            :param y: y coordinate to start from
+            :param dx: x displacement of one step
+            :param dy: y displacement of one step
+            :param limit: maximum cells to check
+        """
+        if limit <= 0:
+            return 0
+        if dx:
+            # Bits of the segment between the start cell (excluded) and the farthest cell
+            start = y * self.width + x + (1 if dx > 0 else -limit)
+            first, last = start >> 3, (start + limit - 1) >> 3
+            segment = int.from_bytes(self.bits[first:last + 1], "little") >> (start & 7)
+            segment &= (1 << limit) - 1
+            if not segment:
+                return limit
+            if dx > 0:
+                return (segment & -segment).bit_length() - 1
+            return limit - segment.bit_length()
+
+        bits = self.bits
+        width = self.width
+        i = y * width + x
+        step = width if dy > 0 else -width
+        for n in range(limit):
+            i += step
+            if bits[i >> 3] >> (i & 7) & 1:
+                return n
+        return limit
@@ -0,0 +1,144 @@
+""" Spatially partitioned execution of a swarm across processes.
+
+    Every move a mower attempts stays inside a bounding box known before running: rotations always
+    succeed, so the heading of each M is fixed, and the mower can go at most as many cells north,
+    east, south or west as it has M's with that heading. Two mowers can only interact if their boxes
+    overlap, so mowers are grouped with union-find over overlapping boxes and each group is run on
+    its own MowController, in parallel. Within a group the registration order is kept, which gives
+    the same final state as MowController.move_swarm under STOP_ON_COLLITIONS and AWAIT_ON_COLLITIONS.
+"""
+import heapq
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .mowcontroller import MowController
+from .mowerstate import CARDINALS, CollitionProtocols, Mower, PathProgram
+
+Box = Tuple[int, int, int, int]
+# Mower sent to a worker: x, y, orientation value, opcodes, pc, offset
+MowerRecord = Tuple[int, int, int, Optional[array], int, int]
+
+
+def reachable_box(m: Mower) -> Box:
+    """ Returns (x0, y0, x1, y1), corners included, holding every cell the mower can occupy or try to
+        move into while executing the rest of its program
+
+        :param m: mower to check
+    """
+    x, y = m.location.x, m.location.y
+    if m.program is None:
+        return x, y, x, y
+    north, east, south, west = m.program.reach(m.orientation)
+    return x - west, y - south, x + east, y + north
+
+
+def partition(boxes: List[Box]) -> List[List[int]]:
+    """ Group the indices of boxes so that overlapping boxes end up in the same group.
+        Groups are sorted by their first index, and indices within a group are sorted.
+        Uses a sweep over x with union-find
+
+        :param boxes: (x0, y0, x1, y1) boxes, corners included
+    """
+    parent = list(range(len(boxes)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    active: List[Tuple[int, int]] = []
+    for i in sorted(range(len(boxes)), key=lambda i: boxes[i][0]):
+        x0, y0, x1, y1 = boxes[i]
+        while active and active[0][0] < x0:
+            heapq.heappop(active)
+        for _, j in active:
+            if boxes[j][1] <= y1 and y0 <= boxes[j][3]:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+        heapq.heappush(active, (x1, i))
+
+    groups = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+_worker = {}
+
+
+def _init_worker(plateau_size: Tuple[int, int], collition_protocol: CollitionProtocols, obstacles):
+    # Obstacles are shared by every group, send them once per process
+    _worker["args"] = (plateau_size, collition_protocol, obstacles)
+
+
+def _run_group(mowers: List[MowerRecord]):
+    plateau_size, collition_protocol, obstacles = _worker["args"]
+    controller = MowController(plateau_size[0], plateau_size[1], collition_protocol=collition_protocol, obstacles=obstacles)
+    for x, y, o, ops, pc, offset in mowers:
+        program = None if ops is None else PathProgram(ops, pc, offset)
+        controller.register_mower(x, y, CARDINALS[o], program)
+    controller.move_swarm()
+    final = [(m.location.x, m.location.y, m.orientation.value, m.program.pc if m.program else 0, m.program.offset if m.program else 0)
+             for m in controller.mowers]
+    return final, controller.wait_for, controller.deadlocks
+
+
+def _run_groups(groups: List[List[MowerRecord]]):
+    return [_run_group(g) for g in groups]
+
+
+def move_swarm_partitioned(controller: MowController, workers: Optional[int] = None, chunksize: int = 64) -> List[List[int]]:
+    """ Execute the swarm of a controller like MowController.move_swarm, running independent groups
+        of mowers in parallel processes, and leave the controller in the final state.
+        ABORT_ON_COLLITIONS stops everything at the first collition, so it runs serially.
+        Returns the groups of mower indices that were run independently
+
+        :param controller: MowController with its mowers registered
+        :param workers: number of processes, one per core by default. With 1 every group runs in this process
+        :param chunksize: groups sent to a process at a time
+    """
+    mowers = controller.mowers
+    if controller.collition_protocol is CollitionProtocols.ABORT_ON_COLLITIONS:
+        controller.move_swarm()
+        return [list(range(len(mowers)))]
+
+    groups = partition([reachable_box(m) for m in mowers])
+    records = []
+    for group in groups:
+        records.append([(m.location.x, m.location.y, m.orientation.value,
+                         None if m.program is None else array("l", m.program.ops),
+                         m.program.pc if m.program else 0, m.program.offset if m.program else 0)
+                        for m in (mowers[i] for i in group)])
+
+    init_args = (controller.plateau_size, controller.collition_protocol, controller.obstacles)
+    if workers == 1:
+        _init_worker(*init_args)
+        results = [_run_group(r) for r in records]
+    else:
+        chunks = [records[i:i + chunksize] for i in range(0, len(records), chunksize)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as executor:
+            results = [result for chunk in executor.map(_run_groups, chunks) for result in chunk]
+
+    # Merge back in registration order
+    controller.wait_for = {}
+    controller.deadlocks = []
+    occupancy = controller.plateau.occupancy
+    occupancy.clear()
+    for group, (final, wait_for, deadlocks) in zip(groups, results):
+        for i, (x, y, o, pc, offset) in zip(group, final):
+            m = mowers[i]
+            location = m.location
+            location.x = x
+            location.y = y
+            m.orientation = CARDINALS[o]
+            if m.program is not None:
+                m.program.pc = pc
+                m.program.offset = offset
+        controller.wait_for.update({group[w]: group[b] for w, b in wait_for.items()})
+        controller.deadlocks.extend([group[i] for i in cycle] for cycle in deadlocks)
+    for i, m in enumerate(mowers):
+        occupancy[(m.location.x, m.location.y)] = i
+    return groups
@@ -0,0 +1,345 @@
+""" Collision free routes for a fleet, planned before it runs.
+
+    Mowers are planned one after the other, each one with A* over (x, y, orientation) where every
+    movement takes one tick. Planned routes are kept in a space-time reservation table, a dict from
+    cell to the tick intervals during which a mower stands on it, and later mowers only move into
+    cells that are free at the tick they get there. A mower stays on its last cell forever, and mowers
+    not planned yet hold their starting cell.
+
+    Routes are meant for MowController.move_swarm, which runs the mowers one at a time in registration
+    order: a mower starts at the tick the previous one ends, so while it runs every earlier mower is on
+    its last cell and every later one on its starting cell. Routes planned that way are never obstructed
+    and AWAIT_ON_COLLITIONS never has to park a mower.
+
+    The A* heuristic is the Manhattan distance plus the quarter turns it needs at least. Behind an obstacle
+    A* then goes through most of the cells closer to the target, so on plateaus with obstacles and up to
+    max_field_cells cells, the distance of every cell to a target avoiding obstacles is computed with a
+    breadth first search, cheaper than that, and cached for the mowers going to the same target. It also
+    tells the mowers that can't reach their target apart without searching.
+"""
+import heapq
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .errors import PlaceOccupied
+from .mowcontroller import DISPLACEMENT_DELTAS, MowController
+from .mowerstate import Cardinal, Movements, PathProgram
+
+# End of the interval of a mower that never leaves its cell
+FOREVER = sys.maxsize
+
+Cell = Tuple[int, int]
+Box = Tuple[int, int, int, int]
+# Final x, y and orientation value of a planned route
+State = Tuple[int, int, int]
+
+
+class ReservationTable:
+    """ Cells reserved by mowers over time: cell -> list of (start, end, mow_id) tick intervals, end excluded
+    """
+    def __init__(self):
+        self.cells: Dict[Cell, List[Tuple[int, int, int]]] = {}
+
+    def reserve(self, cell: Cell, start: int, end: int, mow_id: int):
+        self.cells.setdefault(cell, []).append((start, end, mow_id))
+
+    def release(self, cell: Cell, mow_id: int):
+        """ Drop every reservation of a mower on a cell
+        """
+        intervals = [r for r in self.cells.get(cell, ()) if r[2] != mow_id]
+        if intervals:
+            self.cells[cell] = intervals
+        else:
+            self.cells.pop(cell, None)
+
+    def is_free(self, cell: Cell, tick: int, mow_id: int) -> bool:
+        """ Whether no other mower than mow_id stands on the cell at tick
+        """
+        for start, end, owner in self.cells.get(cell, ()):
+            if start <= tick < end and owner != mow_id:
+                return False
+        return True
+
+    def free_from(self, cell: Cell, tick: int, mow_id: int) -> bool:
+        """ Whether no other mower than mow_id stands on the cell at tick or after
+        """
+        for _, end, owner in self.cells.get(cell, ()):
+            if end > tick and owner != mow_id:
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return sum(len(intervals) for intervals in self.cells.values())
+
+
+def _rotation(a: int, b: int) -> int:
+    # Fewest quarter turns from orientation value a to b
+    return min((b - a) % len(Cardinal), (a - b) % len(Cardinal))
+
+
+def _min_turns(o: int, dx: int, dy: int) -> int:
+    # Fewest quarter turns a mower facing o needs to get dx, dy away
+    needed = [d for d, wanted in ((Cardinal.N.value, dy > 0), (Cardinal.E.value, dx > 0), (Cardinal.S.value, dy < 0), (Cardinal.W.value, dx < 0)) if wanted]
+    if not needed:
+        return 0
+    return min(_rotation(o, d) for d in needed) + len(needed) - 1
+
+
+# _min_turns by orientation and the signs of dx and dy, TURNS[o][sign(dx) + 1][sign(dy) + 1]
+TURNS = [[[_min_turns(o, dx, dy) for dy in (-1, 0, 1)] for dx in (-1, 0, 1)] for o in range(len(Cardinal))]
+
+
+def boustrophedon(area: Box) -> List[Cell]:
+    """ Cells of a box (x0, y0, x1, y1), corners included, row by row from y0, every other row
+        walked backwards, so that consecutive cells are neighbours
+
+        :param area: box to cover
+    """
+    x0, y0, x1, y1 = area
+    cells = []
+    for n, y in enumerate(range(y0, y1 + 1)):
+        xs = range(x0, x1 + 1) if n % 2 == 0 else range(x1, x0 - 1, -1)
+        cells.extend((x, y) for x in xs)
+    return cells
+
+
+class Planner:
+    """ Plans the routes of new mowers of a controller so that they don't obstruct each other, then
+        registers them. The mowers already registered are in the way, they must have nothing left to run.
+
+        Every new mower gets either a target cell (add_target) or a box to cover with a boustrophedon
+        sweep (add_coverage). Targets that can't be reached get no route, and the cells of an area that
+        can't be reached are skipped.
+
+        :param controller: MowController the mowers are registered on
+        :param weight: weight of the A* heuristic. Above 1 routes can be up to weight times longer than the
+                       shortest, but a mower in the way of the shortest ones no longer makes A* try every other
+                       route of the same length
+        :param max_expansions: A* states expanded at most per search before giving up
+        :param cache_size: target distance fields kept
+        :param max_field_cells: largest plateau, in cells, for which distance fields are used
+    """
+    def __init__(self, controller: MowController, weight: float = 1.5, max_expansions: int = 1 << 18, cache_size: int = 64, max_field_cells: int = 1 << 16):
+        for m in controller.mowers:
+            if m.program is not None and not m.program.finished():
+                raise ValueError("Mowers already registered must have run their paths before planning")
+        self.controller = controller
+        self.size_x, self.size_y = controller.plateau_size
+        self.max_expansions = max_expansions
+        self.weight = weight
+        self.cache_size = cache_size
+        self.is_blocked = controller.obstacles.is_blocked if controller.obstacles is not None else None
+        self.use_fields = self.is_blocked is not None and (self.size_x + 1) * (self.size_y + 1) <= max_field_cells
+        self.grid: Optional[bytearray] = None
+        self.fields: "OrderedDict[Cell, array]" = OrderedDict()
+        self.field_hits = 0
+        self.field_misses = 0
+        self.reservations = ReservationTable()
+        self.first_id = len(controller.mowers)
+        for i, m in enumerate(controller.mowers):
+            self.reservations.reserve((m.location.x, m.location.y), 0, FOREVER, i)
+        # x, y, orientation and goal of every new mower: a target Cell or a coverage Box
+        self.mowers: List[Tuple[int, int, Cardinal, tuple]] = []
+        self.paths: List[Optional[List[Movements]]] = []
+        # Tick the next planned mower starts at
+        self.tick = 0
+        self.registered = 0
+
+    def _add(self, x: int, y: int, o: Cardinal, goal: tuple) -> int:
+        mow_id = self.first_id + len(self.mowers)
+        if not self._free_cell(x, y) or not self.reservations.free_from((x, y), 0, mow_id):
+            raise PlaceOccupied(x, y)
+        # Until it is planned, the mower stays where it is
+        self.reservations.reserve((x, y), 0, FOREVER, mow_id)
+        self.mowers.append((x, y, o, goal))
+        return mow_id
+
+    def add_target(self, x: int, y: int, o: Cardinal, target: Cell) -> int:
+        """ Add a mower that has to end on target. Returns the index it will be registered with
+
+            :param x: x coordinate of mower
+            :param y: y coordinate of mower
+            :param o: orientation of mower
+            :param target: (x, y) cell to go to
+        """
+        return self._add(x, y, o, tuple(target))
+
+    def add_coverage(self, x: int, y: int, o: Cardinal, area: Box) -> int:
+        """ Add a mower that has to mow a box with a boustrophedon sweep, clipped to the plateau.
+            Returns the index it will be registered with
+
+            :param x: x coordinate of mower
+            :param y: y coordinate of mower
+            :param o: orientation of mower
+            :param area: (x0, y0, x1, y1) box, corners included
+        """
+        x0, y0, x1, y1 = area
+        return self._add(x, y, o, (max(x0, 0), max(y0, 0), min(x1, self.size_x), min(y1, self.size_y)))
+
+    def _free_cell(self, x: int, y: int) -> bool:
+        return 0 <= x <= self.size_x and 0 <= y <= self.size_y and (self.is_blocked is None or not self.is_blocked(x, y))
+
+    def distance_field(self, target: Cell) -> Optional[array]:
+        """ Fewest moves from every cell to target avoiding obstacles, -1 where it can't be reached,
+            indexed by y * (plateau_size_x + 1) + x. None without obstacles, where the Manhattan distance
+            is exact, or if the plateau is too big for fields
+        """
+        if not self.use_fields:
+            return None
+        field = self.fields.get(target)
+        if field is not None:
+            self.fields.move_to_end(target)
+            self.field_hits += 1
+            return field
+        self.field_misses += 1
+        width, height = self.size_x + 1, self.size_y + 1
+        if self.grid is None:
+            # Obstacles as one byte per cell, looked up once
+            self.grid = bytearray(width * height)
+            for y in range(height):
+                for x in range(width):
+                    self.grid[y * width + x] = self.is_blocked(x, y)
+        grid, n = self.grid, width * height
+        field = array("l", [-1]) * n
+        if self._free_cell(*target):
+            start = target[1] * width + target[0]
+            field[start] = 0
+            frontier = [start]
+            while frontier:
+                following = []
+                for c in frontier:
+                    d = field[c] + 1
+                    x = c % width
+                    for nc, inside in ((c + width, c + width < n), (c - width, c >= width), (c + 1, x < width - 1), (c - 1, x > 0)):
+                        if inside and field[nc] < 0 and not grid[nc]:
+                            field[nc] = d
+                            following.append(nc)
+                frontier = following
+        self.fields[target] = field
+        if len(self.fields) > self.cache_size:
+            self.fields.popitem(last=False)
+        return field
+
+    def _search(self, mow_id: int, start: State, tick: int, target: Cell, park: bool,
+                field: Optional[array]) -> Optional[Tuple[List[Movements], State]]:
+        # A* from start at tick to target, avoiding obstacles and the cells reserved by other mowers.
+        # With park the mower must be able to stay on target forever
+        tx, ty = target
+        width = self.size_x + 1
+        if field is not None and field[start[1] * width + start[0]] < 0:
+            return None
+        reservations = self.reservations
+        weight = self.weight
+
+        def heuristic(x: int, y: int, o: int) -> int:
+            dx, dy = tx - x, ty - y
+            h = abs(dx) + abs(dy) + TURNS[o][(dx > 0) - (dx < 0) + 1][(dy > 0) - (dy < 0) + 1]
+            if field is None:
+                return h
+            d = field[y * width + x]
+            if d:
+                # Unless the cell ahead is closer, the mower has to turn or go the long way
+                ax, ay = x + DISPLACEMENT_DELTAS[o][0], y + DISPLACEMENT_DELTAS[o][1]
+                if not (0 <= ax <= self.size_x and 0 <= ay <= self.size_y and field[ay * width + ax] == d - 1):
+                    d += 1
+            return max(h, d)
+
+        best = {start: 0}
+        parents: Dict[State, Tuple[State, Movements]] = {}
+        # Ties go to the deepest state, which is the one closest to the target
+        heap = [(weight * heuristic(*start), 0, start)]
+        expansions = 0
+        while heap:
+            _, g, state = heapq.heappop(heap)
+            g = -g
+            if g > best[state]:
+                continue
+            x, y, o = state
+            if x == tx and y == ty and (not park or reservations.free_from(target, tick + g, mow_id)):
+                movements = []
+                while state != start:
+                    state, movement = parents[state]
+                    movements.append(movement)
+                movements.reverse()
+                return movements, (x, y, o)
+            expansions += 1
+            if expansions > self.max_expansions:
+                return None
+
+            following = []
+            if reservations.is_free((x, y), tick + g + 1, mow_id):
+                following.append(((x, y, (o + 3) & 3), Movements.L))
+                following.append(((x, y, (o + 1) & 3), Movements.R))
+            dx, dy = DISPLACEMENT_DELTAS[o]
+            nx, ny = x + dx, y + dy
+            if self._free_cell(nx, ny) and reservations.is_free((nx, ny), tick + g + 1, mow_id):
+                following.append(((nx, ny, o), Movements.M))
+            for nxt, movement in following:
+                if g + 1 < best.get(nxt, FOREVER):
+                    best[nxt] = g + 1
+                    parents[nxt] = (state, movement)
+                    heapq.heappush(heap, (g + 1 + weight * heuristic(*nxt), -g - 1, nxt))
+        return None
+
+    def _plan_mower(self, mow_id: int, x: int, y: int, o: Cardinal, goal: tuple, tick: int) -> Optional[List[Movements]]:
+        state = (x, y, o.value)
+        if len(goal) == 2:
+            found = self._search(mow_id, state, tick, goal, True, self.distance_field(goal))
+            return None if found is None else found[0]
+
+        # Coverage: go through the cells of the sweep in order, skipping the ones that can't be reached
+        path: List[Movements] = []
+        waypoints = boustrophedon(goal)
+        for n, cell in enumerate(waypoints):
+            last = n == len(waypoints) - 1
+            if (state[0], state[1]) == cell or not self._free_cell(*cell) \
+                    or not self.reservations.is_free(cell, tick + len(path), mow_id):
+                continue
+            found = self._search(mow_id, state, tick + len(path), cell, last, None)
+            if found is not None:
+                path.extend(found[0])
+                state = found[1]
+        return path
+
+    def _reserve_route(self, mow_id: int, x: int, y: int, o: Cardinal, tick: int, path: List[Movements]):
+        # The mower stands on its starting cell from the beginning and on its last cell forever
+        self.reservations.release((x, y), mow_id)
+        o = o.value
+        enter = 0
+        for t, movement in enumerate(path, tick + 1):
+            if movement is Movements.M:
+                self.reservations.reserve((x, y), enter, t, mow_id)
+                dx, dy = DISPLACEMENT_DELTAS[o]
+                x, y, enter = x + dx, y + dy, t
+            else:
+                o = (o + movement.value) % len(Cardinal)
+        self.reservations.reserve((x, y), enter, FOREVER, mow_id)
+
+    def plan(self) -> List[Optional[List[Movements]]]:
+        """ Plan the routes of the mowers added since the last call, in the order they were added.
+            Returns the routes of every added mower, None for targets that can't be reached
+        """
+        for k in range(len(self.paths), len(self.mowers)):
+            x, y, o, goal = self.mowers[k]
+            mow_id = self.first_id + k
+            path = self._plan_mower(mow_id, x, y, o, goal, self.tick)
+            self._reserve_route(mow_id, x, y, o, self.tick, path or [])
+            self.tick += len(path or [])
+            self.paths.append(path)
+        return self.paths
+
+    def register(self) -> List[bool]:
+        """ Plan the routes if needed and register the mowers not registered yet on the controller, with
+            their routes. A mower without a route is registered without a path. Returns whether each one
+            was registered, as MowController.register_mower
+        """
+        if len(self.controller.mowers) != self.first_id + self.registered:
+            raise ValueError("Mowers were registered on the controller since planning started")
+        self.plan()
+        registered = []
+        for (x, y, o, _), path in zip(self.mowers[self.registered:], self.paths[self.registered:]):
+            registered.append(self.controller.register_mower(x, y, o, PathProgram.compile(path or [])))
+        self.registered = len(self.mowers)
+        return registered
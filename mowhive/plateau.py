@@ -0,0 +1,194 @@
+from typing import Dict, Iterator, Optional, Tuple, Union
+from .obstacles import ObstacleMap
+
+
+class TiledBitmap:
+    """ One bit per plateau cell, stored in square tiles that are only allocated once one of their
+        cells is set. Memory is proportional to the area where bits are set, not to the plateau, so
+        it works for plateaus far too big for a dense ObstacleMap. It has the same interface as
+        ObstacleMap and can be used as the obstacles of a controller.
+
+        :param plateau_size_x: plateau size in x, as given to MowController
+        :param plateau_size_y: plateau size in y, as given to MowController
+        :param tile_size: side of a tile in cells, a multiple of 8
+    """
+    def __init__(self, plateau_size_x: int, plateau_size_y: int, tile_size: int = 64):
+        if tile_size <= 0 or tile_size % 8:
+            raise ValueError("tile_size must be a positive multiple of 8")
+        self.width = plateau_size_x + 1
+        self.height = plateau_size_y + 1
+        self.tile_size = tile_size
+        self.row_bytes = tile_size // 8
+        self.tiles: Dict[Tuple[int, int], bytearray] = {}
+
+    def _tile(self, tx: int, ty: int) -> bytearray:
+        tile = self.tiles.get((tx, ty))
+        if tile is None:
+            tile = self.tiles[(tx, ty)] = bytearray(self.row_bytes * self.tile_size)
+        return tile
+
+    def add(self, x: int, y: int):
+        t = self.tile_size
+        lx, ly = x % t, y % t
+        self._tile(x // t, y // t)[ly * self.row_bytes + (lx >> 3)] |= 1 << (lx & 7)
+
+    def add_rectangle(self, x0: int, y0: int, x1: int, y1: int):
+        """ Set a rectangle, corners included and clipped to the plateau
+        """
+        x0, x1 = max(min(x0, x1), 0), min(max(x0, x1), self.width - 1)
+        y0, y1 = max(min(y0, y1), 0), min(max(y0, y1), self.height - 1)
+        t = self.tile_size
+        for ty in range(y0 // t, y1 // t + 1):
+            for tx in range(x0 // t, x1 // t + 1):
+                tile = self._tile(tx, ty)
+                # Part of the rectangle inside this tile, as a bit mask per row
+                lx0, lx1 = max(x0 - tx * t, 0), min(x1 - tx * t, t - 1)
+                mask = ((1 << (lx1 - lx0 + 1)) - 1) << lx0
+                for ly in range(max(y0 - ty * t, 0), min(y1 - ty * t, t - 1) + 1):
+                    start = ly * self.row_bytes
+                    row = int.from_bytes(tile[start:start + self.row_bytes], "little") | mask
+                    tile[start:start + self.row_bytes] = row.to_bytes(self.row_bytes, "little")
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        t = self.tile_size
+        tile = self.tiles.get((x // t, y // t))
+        if tile is None:
+            return False
+        lx, ly = x % t, y % t
+        return bool(tile[ly * self.row_bytes + (lx >> 3)] >> (lx & 7) & 1)
+
+    def __contains__(self, c: Tuple[int, int]) -> bool:
+        return self.is_blocked(c[0], c[1])
+
+    def free_run(self, x: int, y: int, dx: int, dy: int, limit: int) -> int:
+        """ Returns how many cells a mower in (x, y) can advance in the (dx, dy) direction before the
+            first set cell, up to limit. Missing tiles are skipped whole and rows of present tiles are
+            read as one integer. The limit cells must be inside the plateau
+
+            :param x: x coordinate to start from
+            :param y: y coordinate to start from
+            :param dx: x displacement of one step
+            :param dy: y displacement of one step
+            :param limit: maximum cells to check
+        """
+        t = self.tile_size
+        n = 0
+        while n < limit:
+            cx, cy = x + dx * (n + 1), y + dy * (n + 1)
+            lx, ly = cx % t, cy % t
+            if dx:
+                span = t - lx if dx > 0 else lx + 1
+            else:
+                span = t - ly if dy > 0 else ly + 1
+            span = min(span, limit - n)
+            tile = self.tiles.get((cx // t, cy // t))
+            if tile is not None:
+                if dx:
+                    start = ly * self.row_bytes
+                    row = int.from_bytes(tile[start:start + self.row_bytes], "little")
+                    mask = (1 << span) - 1
+                    if dx > 0:
+                        segment = (row >> lx) & mask
+                        if segment:
+                            return n + (segment & -segment).bit_length() - 1
+                    else:
+                        segment = (row >> (lx - span + 1)) & mask
+                        if segment:
+                            return n + span - segment.bit_length()
+                else:
+                    byte, bit = lx >> 3, lx & 7
+                    for k in range(span):
+                        if tile[(ly + dy * k) * self.row_bytes + byte] >> bit & 1:
+                            return n + k
+            n += span
+        return limit
+
+    def cells(self) -> Iterator[Tuple[int, int]]:
+        """ Yields every set cell
+        """
+        t = self.tile_size
+        for (tx, ty), tile in self.tiles.items():
+            for ly in range(t):
+                start = ly * self.row_bytes
+                row = int.from_bytes(tile[start:start + self.row_bytes], "little")
+                while row:
+                    low = row & -row
+                    yield tx * t + low.bit_length() - 1, ty * t + ly
+                    row ^= low
+
+    def nbytes(self) -> int:
+        """ Bytes held by the allocated tiles
+        """
+        return len(self.tiles) * self.row_bytes * self.tile_size
+
+
+class Plateau:
+    """ Bounds, mower occupancy and obstacles of a plateau. The controller goes through it for every
+        bounds check and occupancy query.
+
+        Nothing here is dense: occupancy is a coordinate -> mower index dict, so it grows with the fleet,
+        and obstacles are either a dense ObstacleMap (fine up to ~10k x 10k) or a TiledBitmap, which only
+        allocates tiles where there are obstacles. add_obstacles picks the TiledBitmap on its own.
+
+        :param plateau_size_x: highest x coordinate
+        :param plateau_size_y: highest y coordinate
+        :param obstacles: optional ObstacleMap or TiledBitmap
+    """
+    def __init__(self, plateau_size_x: int, plateau_size_y: int, obstacles: Optional[Union[ObstacleMap, TiledBitmap]] = None):
+        if obstacles is not None and (obstacles.width, obstacles.height) != (plateau_size_x + 1, plateau_size_y + 1):
+            raise ValueError(f"Obstacle map of {obstacles.width}x{obstacles.height} cells does not match the plateau")
+        self.size_x = plateau_size_x
+        self.size_y = plateau_size_y
+        self.obstacles = obstacles
+        self.occupancy: Dict[Tuple[int, int], int] = {}
+
+    def contains(self, x: int, y: int) -> bool:
+        return 0 <= x <= self.size_x and 0 <= y <= self.size_y
+
+    def free_run(self, x: int, y: int, dx: int, dy: int) -> int:
+        """ Returns how many consecutive cells inside the plateau there are from (x, y) in the (dx, dy) direction,
+            not counting (x, y) itself
+
+            :param x: x coordinate to start from
+            :param y: y coordinate to start from
+            :param dx: x displacement of one step
+            :param dy: y displacement of one step
+        """
+        if dx:
+            if not 0 <= y <= self.size_y:
+                return 0
+            room = (self.size_x - x if x >= -1 else 0) if dx > 0 else (x if x <= self.size_x + 1 else 0)
+        else:
+            if not 0 <= x <= self.size_x:
+                return 0
+            room = (self.size_y - y if y >= -1 else 0) if dy > 0 else (y if y <= self.size_y + 1 else 0)
+        return max(room, 0)
+
+    def mower_at(self, x: int, y: int) -> Optional[int]:
+        return self.occupancy.get((x, y))
+
+    def is_occupied(self, x: int, y: int) -> bool:
+        return (x, y) in self.occupancy
+
+    def place(self, x: int, y: int, mow_id: int):
+        self.occupancy[(x, y)] = mow_id
+
+    def relocate(self, x0: int, y0: int, x1: int, y1: int, mow_id: int):
+        """ Move mow_id from (x0, y0) to (x1, y1)
+        """
+        del self.occupancy[(x0, y0)]
+        self.occupancy[(x1, y1)] = mow_id
+
+    def obstacle_at(self, x: int, y: int) -> bool:
+        return self.obstacles is not None and self.contains(x, y) and self.obstacles.is_blocked(x, y)
+
+    def add_obstacles(self, rectangles):
+        """ Add obstacle rectangles (x0, y0, x1, y1), corners included. If the plateau has no obstacles
+            yet a TiledBitmap is created for them
+
+            :param rectangles: obstacle rectangles
+        """
+        if self.obstacles is None:
+            self.obstacles = TiledBitmap(self.size_x, self.size_y)
+        for rectangle in rectangles:
+            self.obstacles.add_rectangle(*rectangle)
@@ -0,0 +1,115 @@
+""" A MowController several threads can register, move and rotate mowers on at once.
+
+    Cells are not guarded by one global lock but by a fixed set of striped locks: the plateau is cut
+    in square regions and every region maps to one stripe, so a move, which goes from a cell to its
+    neighbour, mostly takes a single lock, and threads working on different parts of the plateau
+    seldom wait for each other. A move across two stripes takes both in increasing stripe order, and
+    a thread always takes its mower's lock before any cell lock, so locks are never waited on in a
+    cycle. Mowers are striped the same way by id, which keeps two threads from moving one mower at once.
+
+    The occupancy dict is only changed by a thread holding the stripes of the cells it touches, each
+    dict operation on its own being atomic, also on free-threaded builds of Python, where the threads
+    then run in parallel.
+"""
+import threading
+from typing import List, Optional, Tuple, Union
+
+from .errors import PlaceOccupied
+from .mowcontroller import DISPLACEMENT_DELTAS, MowController
+from .mowerstate import Cardinal, CollitionProtocols, Coord, MovementResult, Movements, Mower, PathProgram
+from .obstacles import ObstacleMap
+from .plateau import TiledBitmap
+
+# Odd multipliers spreading neighbouring regions over the stripes
+_HASH_X = 0x9E3779B1
+_HASH_Y = 0x85EBCA77
+
+
+class ConcurrentMowController(MowController):
+    """ MowController whose register_mower, move_mower, rotate_mower and turn_mower can be called from
+        several threads at once. move_swarm, resume and the other whole swarm operations are not
+        synchronized: run them while no other thread uses the controller. Traces and coverage are not
+        supported, and the mowers are always kept as a list of Mower.
+
+        :param stripes: number of cell locks, and of mower locks, a power of 2
+        :param region_size: side in cells of the square regions sharing a cell lock, a power of 2
+    """
+    def __init__(self, plateau_size_x: int, plateau_size_y: int, collition_protocol: CollitionProtocols = CollitionProtocols.STOP_ON_COLLITIONS, ignore_unregisterable_mowers=False, obstacles: Optional[Union[ObstacleMap, TiledBitmap]] = None, stripes: int = 256, region_size: int = 8):
+        if stripes <= 0 or stripes & (stripes - 1):
+            raise ValueError("stripes must be a power of 2")
+        if region_size <= 0 or region_size & (region_size - 1):
+            raise ValueError("region_size must be a power of 2")
+        super().__init__(plateau_size_x, plateau_size_y, collition_protocol, ignore_unregisterable_mowers, obstacles=obstacles)
+        self.stripes = stripes
+        self.region_shift = region_size.bit_length() - 1
+        self._mask = stripes - 1
+        self._cell_locks = [threading.Lock() for _ in range(stripes)]
+        self._mower_locks = [threading.Lock() for _ in range(stripes)]
+        # Held while a new mower gets its id, only for the append
+        self._fleet_lock = threading.Lock()
+
+    def stripe(self, x: int, y: int) -> int:
+        """ Index of the lock guarding cell (x, y)
+        """
+        s = self.region_shift
+        return ((x >> s) * _HASH_X ^ (y >> s) * _HASH_Y) & self._mask
+
+    def _forget_analyses(self):
+        # Only written when set, so threads don't all write the same attributes on every move
+        if self.isolated is not None or self.history is not None:
+            self.isolated = None
+            self.history = None
+
+    def register_mower(self, x: int, y: int, o: Cardinal, desired_path: Optional[Union[List[Movements], PathProgram]]=None) -> bool:
+        """ Register mower in controller with the respective coordinates, orientation and optional desired path.
+            Mower ids are given in the order registrations get through, which between threads is not known beforehand
+
+            :param x: x coordinate of mower
+            :param y: y coordinate of mower
+            :param o: Orientation of mower of type Cardinal
+            :param desired_path: Optional desired path, List[Movements] or an already compiled PathProgram
+        """
+        mower = Mower(Coord(x, y), o, desired_path)
+        with self._cell_locks[self.stripe(x, y)]:
+            if self.is_a_mower_there(x, y) or self.is_an_obstacle_there(x, y):
+                if self.ignore_unregisterable_mowers:
+                    return False
+                raise PlaceOccupied(x, y)
+            self._forget_analyses()
+            with self._fleet_lock:
+                mow_id = len(self.mowers)
+                self.mowers.append(mower)
+            self.plateau.place(x, y, mow_id)
+        return True
+
+    def move_mower(self, mow_id: int) -> MovementResult:
+        """ Move mower towards the direction it is facing
+
+            :param mow_id: index of mower in MowerController.mowers
+        """
+        with self._mower_locks[mow_id & self._mask]:
+            mowie = self.mowers[mow_id]
+            x, y = mowie.location.x, mowie.location.y
+            dx, dy = DISPLACEMENT_DELTAS[mowie.orientation.value]
+            a = self.stripe(x, y)
+            b = self.stripe(x + dx, y + dy)
+            self._forget_analyses()
+            if a == b:
+                with self._cell_locks[a]:
+                    return self.advance_mower(mow_id, 1)[1]
+            # Increasing order, so two moves in opposite directions can't hold one lock each
+            if a > b:
+                a, b = b, a
+            with self._cell_locks[a], self._cell_locks[b]:
+                return self.advance_mower(mow_id, 1)[1]
+
+    def turn_mower(self, mow_id: int, quarter_turns: int) -> MovementResult:
+        with self._mower_locks[mow_id & self._mask]:
+            return super().turn_mower(mow_id, quarter_turns)
+
+    def mower_state(self, mow_id: int) -> Tuple[int, int, Cardinal]:
+        """ Returns x, y and orientation of a mower, read while no other thread moves it
+        """
+        with self._mower_locks[mow_id & self._mask]:
+            m = self.mowers[mow_id]
+            return m.location.x, m.location.y, m.orientation
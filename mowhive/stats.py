@@ -0,0 +1,82 @@
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from .mowerstate import CollitionProtocols
+
+COUNTERS = ("successes", "out_of_bounds", "obstructions", "obstacles", "defers", "requeues")
+
+
+class SwarmStats:
+    """ Execution statistics of a swarm run, collected only when requested.
+
+        Per mower counters are kept in arrays indexed like MowController.mowers:
+        - successes: movements performed, every L and R of a folded rotation counts
+        - out_of_bounds, obstructions, obstacles: movements rejected for each reason
+        - defers: times the mower was parked waiting on another one (AWAIT_ON_COLLITIONS)
+        - requeues: times it was put back in the ready queue after its blocker moved
+
+        :param collition_protocol: protocol of the run
+        :param keep_chains: how many of the longest blocking chains to keep
+    """
+    def __init__(self, collition_protocol: Optional[CollitionProtocols] = None, keep_chains: int = 5):
+        self.collition_protocol = collition_protocol
+        self.phases: Dict[str, float] = {}
+        self.keep_chains = keep_chains
+        self.longest_chains: List[List[int]] = []
+        for name in COUNTERS:
+            setattr(self, name, array("q"))
+        # Set when the outcome was read from a ResultCache, nothing ran so the counters stay at zero
+        self.cached = False
+
+    def resize(self, n: int):
+        """ Make room for counters of n mowers
+        """
+        for name in COUNTERS:
+            counters = getattr(self, name)
+            if len(counters) < n:
+                counters.extend([0] * (n - len(counters)))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """ Time a block and add it to the given phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record_chain(self, chain: List[int]):
+        """ Keep chain if it is among the longest blocking chains seen
+        """
+        if len(self.longest_chains) < self.keep_chains or len(chain) > len(self.longest_chains[-1]):
+            self.longest_chains.append(chain)
+            self.longest_chains.sort(key=len, reverse=True)
+            del self.longest_chains[self.keep_chains:]
+
+    def mower(self, mow_id: int) -> Dict[str, int]:
+        """ Counters of a single mower
+        """
+        return {name: getattr(self, name)[mow_id] for name in COUNTERS}
+
+    def totals(self) -> Dict[str, int]:
+        """ Counters added up over the fleet
+        """
+        return {name: sum(getattr(self, name)) for name in COUNTERS}
+
+    def report(self) -> List[str]:
+        """ Human readable summary
+        """
+        protocol = self.collition_protocol.name if self.collition_protocol else "-"
+        out = [f"protocol {protocol}, {len(self.successes)} mowers"]
+        if self.cached:
+            out.append("movement statistics unavailable, the outcome was read from the cache")
+        else:
+            out += [f"{name} {value}" for name, value in self.totals().items()]
+        out += [f"phase {name} {seconds:.6f}s" for name, seconds in self.phases.items()]
+        out += [f"blocking chain {' -> '.join(map(str, chain))}" for chain in self.longest_chains]
+        return out
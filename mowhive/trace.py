@@ -0,0 +1,202 @@
+""" Trajectory traces: every step each mower took or tried to take, for auditing.
+
+    A step is one cell advanced, one quarter turn, one rejected M, or one scheduling event under
+    AWAIT_ON_COLLITIONS. Each step is stored as a 3 bit code relative to the previous state, packed
+    in a bytearray per mower, so the trace of a mower costs 3 bits per step. Positions are rebuilt by
+    replaying the codes from the starting state; a keyframe with the full state is kept every
+    KEYFRAME_INTERVAL steps or so, so replaying up to any step only decodes the steps after the last
+    keyframe before it.
+"""
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+from .mowcontroller import DISPLACEMENT_DELTAS, MowController
+from .mowerstate import CARDINALS, Cardinal, MovementResult, ObstructingMower, OutOfBounds, UnknownObstacle
+
+# Step codes
+FORWARD = 0
+LEFT = 1
+RIGHT = 2
+REJECTED_OUT_OF_BOUNDS = 3
+REJECTED_OBSTRUCTED = 4
+REJECTED_OBSTACLE = 5
+DEFERRED = 6
+REQUEUED = 7
+
+CODE_NAMES = ("forward", "left", "right", "out_of_bounds", "obstructed", "obstacle", "deferred", "requeued")
+REJECTION_CODES = {OutOfBounds: REJECTED_OUT_OF_BOUNDS, ObstructingMower: REJECTED_OBSTRUCTED, UnknownObstacle: REJECTED_OBSTACLE}
+BITS = 3
+KEYFRAME_INTERVAL = 256
+
+MowerState = Tuple[int, int, Cardinal]
+
+
+class MowerTrace:
+    """ Packed steps of one mower
+
+        :param x: starting x
+        :param y: starting y
+        :param o: starting orientation value
+    """
+    __slots__ = ("start", "data", "acc", "nbits", "steps", "x", "y", "o", "keyframes")
+
+    def __init__(self, x: int, y: int, o: int):
+        self.start = (x, y, o)
+        self.data = bytearray()
+        # Bits not yet written to data
+        self.acc = 0
+        self.nbits = 0
+        self.steps = 0
+        # State after the last step
+        self.x, self.y, self.o = x, y, o
+        # step, x, y, o of the state before that step
+        self.keyframes = array("q")
+
+    def append(self, code: int, count: int = 1):
+        """ Append count times the same code
+        """
+        if self.steps - (self.keyframes[-4] if self.keyframes else 0) >= KEYFRAME_INTERVAL:
+            self.keyframes.extend((self.steps, self.x, self.y, self.o))
+        if code:
+            # code repeated count times, 3 bits each
+            self.acc |= (code * ((1 << BITS * count) - 1) // 7) << self.nbits
+        self.nbits += BITS * count
+        self.steps += count
+        if self.nbits >= 8:
+            n = self.nbits >> 3
+            self.data += (self.acc & ((1 << 8 * n) - 1)).to_bytes(n, "little")
+            self.acc >>= 8 * n
+            self.nbits &= 7
+
+    def codes(self, start: int = 0, stop: Optional[int] = None) -> List[int]:
+        """ Decoded codes of the steps in [start, stop)
+        """
+        stop = self.steps if stop is None else min(stop, self.steps)
+        if start >= stop:
+            return []
+        first = BITS * start >> 3
+        last = (BITS * stop + 7) >> 3
+        bits = int.from_bytes(self.data[first:last], "little")
+        if last > len(self.data):
+            bits |= self.acc << 8 * (len(self.data) - first)
+        bits >>= BITS * start - 8 * first
+        out = []
+        for _ in range(stop - start):
+            out.append(bits & 7)
+            bits >>= BITS
+        return out
+
+    def state_at(self, step: int) -> MowerState:
+        """ State after the first step steps
+        """
+        step = min(max(step, 0), self.steps)
+        s, x, y, o = 0, *self.start
+        keyframes = self.keyframes
+        # Last keyframe at or before step, keyframe steps are increasing
+        lo, hi = 0, len(keyframes) // 4
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keyframes[4 * mid] <= step:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo:
+            s, x, y, o = keyframes[4 * lo - 4:4 * lo]
+        for code in self.codes(s, step):
+            x, y, o = _apply(code, x, y, o)
+        return x, y, CARDINALS[o]
+
+
+def _apply(code: int, x: int, y: int, o: int) -> Tuple[int, int, int]:
+    if code == FORWARD:
+        dx, dy = DISPLACEMENT_DELTAS[o]
+        return x + dx, y + dy, o
+    if code == LEFT:
+        return x, y, (o - 1) % len(Cardinal)
+    if code == RIGHT:
+        return x, y, (o + 1) % len(Cardinal)
+    return x, y, o
+
+
+class TraceRecorder:
+    """ Records the trajectory of every mower of a controller from now on, including the mowers
+        registered later. Recording stops with detach. While no recorder is attached the controller
+        only pays for an `is None` check per executed opcode.
+
+        :param controller: MowController to record
+    """
+    def __init__(self, controller: MowController):
+        self.controller = controller
+        self.traces: List[MowerTrace] = []
+        for m in controller.mowers:
+            self.add(m.location.x, m.location.y, m.orientation)
+        controller.trace = self
+
+    def detach(self):
+        if self.controller.trace is self:
+            self.controller.trace = None
+
+    def add(self, x: int, y: int, o: Cardinal):
+        self.traces.append(MowerTrace(x, y, o.value))
+
+    def forward(self, mow_id: int, n: int):
+        t = self.traces[mow_id]
+        t.append(FORWARD, n)
+        dx, dy = DISPLACEMENT_DELTAS[t.o]
+        t.x += dx * n
+        t.y += dy * n
+
+    def turn(self, mow_id: int, quarter_turns: int):
+        t = self.traces[mow_id]
+        quarter_turns %= len(Cardinal)
+        if quarter_turns == 3:
+            t.append(LEFT)
+        elif quarter_turns:
+            t.append(RIGHT, quarter_turns)
+        t.o = (t.o + quarter_turns) % len(Cardinal)
+
+    def reject(self, mow_id: int, result: MovementResult, n: int = 1):
+        if n:
+            self.traces[mow_id].append(REJECTION_CODES[type(result)], n)
+
+    def defer(self, mow_id: int):
+        self.traces[mow_id].append(DEFERRED)
+
+    def requeue(self, mow_id: int):
+        self.traces[mow_id].append(REQUEUED)
+
+    def steps(self, mow_id: int) -> int:
+        return self.traces[mow_id].steps
+
+    def codes(self, mow_id: int, start: int = 0, stop: Optional[int] = None) -> List[int]:
+        """ Step codes of a mower, see the module constants
+        """
+        return self.traces[mow_id].codes(start, stop)
+
+    def state_at(self, mow_id: int, step: int) -> MowerState:
+        """ Position and orientation of a mower after its first step steps
+        """
+        return self.traces[mow_id].state_at(step)
+
+    def path(self, mow_id: int) -> Iterator[MowerState]:
+        """ Yields the starting state of a mower and its state after every step
+        """
+        t = self.traces[mow_id]
+        x, y, o = t.start
+        yield x, y, CARDINALS[o]
+        for code in t.codes():
+            x, y, o = _apply(code, x, y, o)
+            yield x, y, CARDINALS[o]
+
+    def counts(self, mow_id: int) -> dict:
+        """ Number of steps of each kind, by CODE_NAMES
+        """
+        out = dict.fromkeys(CODE_NAMES, 0)
+        for code in self.codes(mow_id):
+            out[CODE_NAMES[code]] += 1
+        return out
+
+    def nbytes(self) -> int:
+        """ Bytes held by the packed steps
+        """
+        return sum(len(t.data) for t in self.traces)
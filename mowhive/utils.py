@@ -1,6 +1,12 @@
-from typing import Tuple
-from .mowerstate import Cardinal, Movements
-from .mowcontroller import MowController
+import mmap
+import time
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Optional, Tuple
+from .mowerstate import Cardinal, CollitionProtocols, PathProgram
+if TYPE_CHECKING:
+    from .mowcontroller import MowController
+    from .stats import SwarmStats
+
+_BYTE_CARDINALS = {c.name.encode(): c for c in Cardinal}
 
 def read_mower_line(line: str)-> Tuple[int, int, Cardinal]:
     m_data = line.split(" ")
@@ -9,7 +15,7 @@ def read_mower_line(line: str)-> Tuple[int, int, Cardinal]:
     orientation = Cardinal[m_data[2]]
     return x,y,orientation
 
-def read_input(stream, controller: MowController):
+def read_input(stream, controller: "MowController"):
     i = 0
     for line in stream:
         line = line.strip("\n")
@@ -17,6 +23,119 @@ def read_input(stream, controller: MowController):
             x,y,orientation = read_mower_line(line)
             controller.register_mower(x, y, orientation)
         else:
-            path = list(map(lambda op: Movements[op], line))
-            controller.mowers[-1].desired_path = path
-        i+=1
\ No newline at end of file
+            controller.mowers[-1].program = PathProgram.from_string(line)
+        i+=1
+
+def read_header(line: bytes) -> Tuple[int, int]:
+    """ Parse the plateau size line of a scenario read from a binary stream
+
+        :param line: header line, such as b"5 5\n"
+    """
+    dims = line.split()
+    return int(dims[0]), int(dims[1])
+
+def read_mower_record(line: bytes) -> Tuple[int, int, Cardinal]:
+    """ Parse a mower line of a scenario read from a binary stream
+
+        :param line: mower line, such as b"1 2 N\n"
+    """
+    x, y, o = line.split()
+    return int(x), int(y), _BYTE_CARDINALS[o]
+
+def _lines(stream) -> Iterator[bytes]:
+    # readline works the same on files and mmap objects, which are not line iterable
+    return iter(stream.readline, b"")
+
+def read_swarm(stream: BinaryIO, controller: "MowController"):
+    """ Register every mower of a binary scenario stream positioned after its header, with its compiled
+        program, without running them
+
+        :param stream: binary stream (file, mmap or sys.stdin.buffer) positioned after the header line
+        :param controller: MowController to register the mowers in
+    """
+    registered = False
+    for n, line in enumerate(_lines(stream)):
+        if n % 2 == 0:
+            x, y, orientation = read_mower_record(line)
+            registered = controller.register_mower(x, y, orientation)
+        elif registered:
+            controller.mowers[-1].program = PathProgram.from_bytes(line)
+
+def stream_swarm(stream: BinaryIO, controller: "MowController", stats: Optional["SwarmStats"] = None):
+    """ Register and execute the mowers of a binary scenario stream positioned after its header,
+        without holding more than one path in memory.
+
+        Under STOP_ON_COLLITIONS and ABORT_ON_COLLITIONS mower i only interacts with the final
+        cells of the mowers before it and the starting cells of the mowers after it. So a first pass
+        registers every mower skipping the paths, and a second pass compiles and executes each mower
+        as soon as its path line is read, dropping the program afterwards. The final state is the same
+        as read_input followed by move_swarm. Non seekable streams are spooled to a temporary file.
+        AWAIT_ON_COLLITIONS needs every path at once, so the scenario is loaded and run with move_swarm.
+
+        :param stream: binary stream (file, mmap or sys.stdin.buffer) positioned after the header line
+        :param controller: MowController with no mowers registered
+        :param stats: optional SwarmStats, filled with the register, parse and simulate phases and the movement outcomes
+    """
+    if controller.collition_protocol is CollitionProtocols.AWAIT_ON_COLLITIONS:
+        start = time.perf_counter()
+        read_swarm(stream, controller)
+        if stats is not None:
+            stats.add_time("register", time.perf_counter() - start)
+        controller.move_swarm(stats)
+        return
+
+    if not getattr(stream, "seekable", lambda: True)():
+        import shutil
+        import tempfile
+        with tempfile.TemporaryFile() as spool:
+            shutil.copyfileobj(stream, spool)
+            spool.seek(0)
+            return stream_swarm(spool, controller, stats)
+
+    start = stream.tell()
+    # First pass: starting cells only
+    clock = time.perf_counter()
+    registered = bytearray()
+    for n, line in enumerate(_lines(stream)):
+        if n % 2 == 0:
+            x, y, orientation = read_mower_record(line)
+            registered.append(controller.register_mower(x, y, orientation))
+    if stats is not None:
+        stats.add_time("register", time.perf_counter() - clock)
+        stats.collition_protocol = controller.collition_protocol
+        stats.resize(len(controller.mowers))
+
+    # Second pass: run each mower as soon as its path is known
+    stream.seek(start)
+    i = -1
+    for n, line in enumerate(_lines(stream)):
+        if n % 2 == 0:
+            ok = registered[n // 2]
+            i += ok
+        elif ok:
+            m = controller.mowers[i]
+            if stats is None:
+                m.program = PathProgram.from_bytes(line)
+                controller.run_mower(i)
+            else:
+                clock = time.perf_counter()
+                m.program = PathProgram.from_bytes(line)
+                parsed = time.perf_counter()
+                controller.run_mower(i, stats)
+                stats.add_time("parse", parsed - clock)
+                stats.add_time("simulate", time.perf_counter() - parsed)
+            m.program = None
+
+def stream_swarm_file(path: str, collition_protocol: CollitionProtocols = CollitionProtocols.STOP_ON_COLLITIONS, ignore_unregisterable_mowers=False) -> "MowController":
+    """ Load and execute a scenario file through mmap, returns the controller in its final state
+
+        :param path: scenario file path
+        :param collition_protocol: protocol of the controller
+        :param ignore_unregisterable_mowers: passed to the controller
+    """
+    from .mowcontroller import MowController
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        dimx, dimy = read_header(mm.readline())
+        controller = MowController(dimx, dimy, collition_protocol=collition_protocol, ignore_unregisterable_mowers=ignore_unregisterable_mowers)
+        stream_swarm(mm, controller)
+    return controller
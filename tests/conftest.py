@@ -0,0 +1,25 @@
+import random
+from typing import Collection, List, Optional, Tuple, Union
+
+
+def random_path(rng: random.Random, path_len: int, moves: str = "MMMLR") -> str:
+    return "".join(rng.choices(moves, k=rng.randint(0, path_len)))
+
+
+def scenario(seed: int, size: Union[int, Tuple[int, int]], n_mowers: int, path_len: int, moves: str = "MMMLR",
+             blocked: Optional[Collection[Tuple[int, int]]] = None, full_paths: bool = False) -> List[str]:
+    """ Seeded swarm as read_input lines, two per mower, on distinct cells
+
+        :param size: plateau size, or its side for a square one
+        :param path_len: longest path, every path has that length with full_paths
+        :param moves: movements the paths are drawn from
+        :param blocked: cells no mower starts on, such as an ObstacleMap
+    """
+    rng = random.Random(seed)
+    size_x, size_y = (size, size) if isinstance(size, int) else size
+    free = [(x, y) for x in range(size_x + 1) for y in range(size_y + 1) if blocked is None or (x, y) not in blocked]
+    lines = []
+    for x, y in rng.sample(free, n_mowers):
+        lines.append(f"{x} {y} {rng.choice('NESW')}")
+        lines.append("".join(rng.choices(moves, k=path_len)) if full_paths else random_path(rng, path_len, moves))
+    return lines
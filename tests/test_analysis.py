@@ -0,0 +1,155 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mowhive import AttemptedOutOfBoundsMovement, Cardinal, MowController, read_input
+from mowhive.analysis import RouteAnalysis, overlapping_pairs
+from mowhive.mowcontroller import DISPLACEMENT_DELTAS
+from mowhive.mowerstate import CollitionProtocols, PathProgram
+from mowhive.obstacles import ObstacleMap
+from mowhive.partition import reachable_box
+from tests.conftest import scenario
+from mowhive.plateau import TiledBitmap
+
+
+def planned_route(m):
+    # Positions after every M of the mower, as if they all succeeded
+    x, y, o = m.location.x, m.location.y, m.orientation.value
+    out = []
+    for movement in m.program.remaining() if m.program else []:
+        if movement.name == "M":
+            dx, dy = DISPLACEMENT_DELTAS[o]
+            x, y = x + dx, y + dy
+            out.append((x, y))
+        else:
+            o = (o + movement.value) % 4
+    return out
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("tiled", [False, True])
+def test_analysis_matches_planned_routes(seed, tiled):
+    size = 12
+    obstacles = TiledBitmap(size, size, tile_size=8) if tiled else ObstacleMap(size, size)
+    obstacles.add_rectangle(5, 5, 6, 7)
+    mow_hive = MowController(size, size, ignore_unregisterable_mowers=True, obstacles=obstacles)
+    read_input(scenario(seed, size, 20, 15), mow_hive)
+    # Start one mower half way through an advance
+    mow_hive.mowers[0].program = PathProgram.from_string("MMMRMM")
+    mow_hive.mowers[0].program.offset = 2
+    analysis = RouteAnalysis(mow_hive)
+
+    for i, m in enumerate(mow_hive.mowers):
+        route = planned_route(m)
+        xs = [m.location.x] + [x for x, _ in route]
+        ys = [m.location.y] + [y for _, y in route]
+        assert analysis.boxes[i].tolist() == [min(xs), min(ys), max(xs), max(ys)]
+        assert tuple(analysis.reach_boxes[i].tolist()) == reachable_box(m)
+        outside = [k for k, (x, y) in enumerate(route) if not (0 <= x <= size and 0 <= y <= size)]
+        blocked = [k for k, (x, y) in enumerate(route) if k not in outside and obstacles.is_blocked(x, y)]
+        assert analysis.out_of_bounds[i] == len(outside)
+        assert analysis.first_out_of_bounds[i] == (outside[0] if outside else -1)
+        assert analysis.first_obstacle[i] == (blocked[0] if blocked else -1)
+        assert analysis.first_failure[i] == min(outside[:1] + blocked[:1], default=-1)
+
+
+def test_overlapping_pairs():
+    boxes = np.array([(0, 0, 2, 2), (5, 5, 6, 6), (2, 2, 4, 4), (10, 0, 11, 1), (4, 0, 4, 0), (6, 6, 6, 9), (0, 2, 9, 2)])
+    expected = [(i, j) for i in range(len(boxes)) for j in range(i + 1, len(boxes))
+                if boxes[i][0] <= boxes[j][2] and boxes[j][0] <= boxes[i][2] and boxes[i][1] <= boxes[j][3] and boxes[j][1] <= boxes[i][3]]
+    assert overlapping_pairs(boxes).tolist() == [list(p) for p in expected]
+    assert overlapping_pairs(np.zeros((0, 4), dtype=np.int64)).shape == (0, 2)
+
+
+def test_isolated_mowers():
+    mow_hive = MowController(20, 20)
+    read_input(["0 0 N", "MMRMM", "1 1 E", "MM", "15 15 S", "MMMLM", "10 0 W", "L"], mow_hive)
+    analysis = RouteAnalysis(mow_hive)
+    assert analysis.conflicts.tolist() == [[0, 1]]
+    assert analysis.isolated.tolist() == [False, False, True, True]
+    assert analysis.failing() == []
+
+
+@pytest.mark.parametrize("protocol", list(CollitionProtocols))
+@pytest.mark.parametrize("seed", range(3))
+def test_skip_isolated_checks_keeps_final_state(protocol, seed):
+    lines = scenario(seed, 40, 60, 10)
+    obstacles = ObstacleMap.from_rectangles(40, 40, [(18, 18, 22, 22)])
+    results = []
+    for skip in (False, True):
+        mow_hive = MowController(40, 40, collition_protocol=protocol, ignore_unregisterable_mowers=True, obstacles=obstacles)
+        read_input(lines, mow_hive)
+        if skip:
+            analysis = RouteAnalysis(mow_hive)
+            assert analysis.isolated.any()
+            analysis.skip_isolated_checks()
+        try:
+            mow_hive.move_swarm()
+            error = None
+        except Exception as e:
+            error = type(e)
+        results.append((error, mow_hive.show_current_state(), dict(mow_hive.occupancy), mow_hive.wait_for))
+    assert results[0] == results[1]
+
+
+def test_abort_failure_found_beforehand():
+    mow_hive = MowController(5, 5, collition_protocol=CollitionProtocols.ABORT_ON_COLLITIONS)
+    read_input(["0 0 N", "MMRMMLMMMM", "5 0 W", "M"], mow_hive)
+    analysis = RouteAnalysis(mow_hive)
+    assert analysis.failing() == [0]
+    assert analysis.first_out_of_bounds[0] == 7
+    with pytest.raises(AttemptedOutOfBoundsMovement):
+        mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == ["2 5 N", "5 0 W"]
+
+
+def test_isolated_checks_turned_off_by_changes():
+    mow_hive = MowController(9, 9)
+    read_input(["0 0 N", "MM"], mow_hive)
+    RouteAnalysis(mow_hive).skip_isolated_checks()
+    assert mow_hive.isolated == b"\x01"
+    mow_hive.register_mower(0, 2, Cardinal.N)
+    assert mow_hive.isolated is None
+    RouteAnalysis(mow_hive).skip_isolated_checks()
+    mow_hive.move_mower(1)
+    assert mow_hive.isolated is None
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == ["0 2 N", "0 3 N"]
+
+
+def test_isolated_checks_only_hold_for_the_routes_analysed():
+    mow_hive = MowController(9, 9)
+    read_input(["0 5 E", "", "5 5 N", ""], mow_hive)
+    RouteAnalysis(mow_hive).skip_isolated_checks()
+    mow_hive.move_swarm()
+    assert mow_hive.isolated is None
+    mow_hive.mowers[0].desired_path = PathProgram.from_string("MMMMMMMM").remaining()
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == ["4 5 E", "5 5 N"]
+
+    # A new program given before the run also turns them off
+    for compact_fleet in (False, True):
+        mow_hive = MowController(9, 9, compact_fleet=compact_fleet)
+        read_input(["0 5 E", "", "5 5 N", ""], mow_hive)
+        RouteAnalysis(mow_hive).skip_isolated_checks()
+        assert mow_hive.isolated == b"\x01\x01"
+        mow_hive.mowers[0].program = PathProgram.from_string("MMMMMMMM")
+        mow_hive.move_swarm()
+        assert mow_hive.show_current_state() == ["4 5 E", "5 5 N"]
+
+
+def test_isolated_checks_ignore_other_controllers():
+    mow_hive = MowController(9, 9)
+    read_input(["0 5 E", "MM", "5 5 N", "MM"], mow_hive)
+    RouteAnalysis(mow_hive).skip_isolated_checks()
+    # Programs given to the mowers of another controller, or live ones, leave this analysis valid
+    other = MowController(9, 9)
+    read_input(["0 0 N", "M"], other)
+    other.mowers[0].program = PathProgram.from_string("MM")
+
+    checks = []
+    advance_mower = mow_hive.advance_mower
+    mow_hive.advance_mower = lambda mow_id, steps, check_occupancy: checks.append(check_occupancy) or advance_mower(mow_id, steps, check_occupancy)
+    mow_hive.move_swarm()
+    assert checks == [False, False]
+    assert mow_hive.show_current_state() == ["2 5 E", "5 7 N"]
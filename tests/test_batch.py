@@ -0,0 +1,70 @@
+import io
+
+from mowhive.batch import main, run_scenario, run_scenarios, split_scenarios
+from mowhive.mowerstate import CollitionProtocols
+
+SCENARIOS = b"""5 5
+1 2 N
+LMLMLMLMM
+3 3 E
+MMRMMRMRRM
+
+2 2
+0 0 N
+MMRMMRMRM
+0 2 E
+LLMMRMML
+2 2
+1 1 N
+
+1 1 E
+M
+"""
+
+
+def test_split_scenarios():
+    scenarios = list(split_scenarios(io.BytesIO(SCENARIOS)))
+    assert scenarios == [
+        b"5 5\n1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n",
+        b"2 2\n0 0 N\nMMRMMRMRM\n0 2 E\nLLMMRMML\n",
+        b"2 2\n1 1 N\n\n1 1 E\nM\n",
+    ]
+
+
+def test_run_scenario_reports_errors():
+    assert run_scenario(b"5 5\n1 2 N\nLMLMLMLMM\n") == (["1 3 N"], None)
+    state, error = run_scenario(b"2 2\n1 1 N\n\n1 1 E\nM\n")
+    assert state == []
+    assert error.startswith("PlaceOccupied:")
+    state, error = run_scenario(b"2 2\n0 0 N\nMMRMMRMRM\n0 2 E\nLLMMRMML\n", CollitionProtocols.ABORT_ON_COLLITIONS)
+    assert error.startswith("MowerObstructingPath:")
+
+
+def test_run_scenarios_keeps_input_order():
+    scenarios = [f"9 9\n{i} 0 N\n{'M' * i}\n".encode() for i in range(10)]
+    results = list(run_scenarios(scenarios, workers=2, chunksize=3))
+    assert results == [([f"{i} {i} N"], None) for i in range(10)]
+
+
+def test_run_scenarios_reads_ahead_by_a_window():
+    read = []
+
+    def scenarios():
+        for i in range(100):
+            read.append(i)
+            yield f"9 9\n0 0 N\n{'M' * (i % 10)}\n".encode()
+
+    results = run_scenarios(scenarios(), workers=1, chunksize=2, window=3)
+    assert next(results) == (["0 0 N"], None)
+    # The first chunk is yielded once three chunks are in flight
+    assert len(read) == 6
+    assert len(list(results)) == 99 and len(read) == 100
+
+
+def test_main_directory(tmp_path, capsys):
+    (tmp_path / "a.txt").write_bytes(SCENARIOS)
+    (tmp_path / "b.txt").write_bytes(b"1 1\n0 0 E\nM\n")
+    assert main([str(tmp_path), "--workers", "2"]) == 1
+    out = capsys.readouterr().out
+    assert out.split("\n\n") == ["1 3 N\n5 1 E", "1 0 W\n0 2 W", out.split("\n\n")[2], "1 0 E\n"]
+    assert out.split("\n\n")[2].startswith("ERROR PlaceOccupied:")
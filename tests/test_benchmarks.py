@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from benchmarks.bench_controller import compare, main, run_suite, scaling_exponent
+from benchmarks.scenarios import generate_scenario
+from mowhive.mowerstate import CollitionProtocols
+
+
+def test_generate_scenario_is_seeded():
+    assert generate_scenario(3, 20, 10).lines() == generate_scenario(3, 20, 10).lines()
+    assert generate_scenario(3, 20, 10).lines() != generate_scenario(4, 20, 10).lines()
+    lanes = generate_scenario(0, 5, 30, layout="lanes")
+    assert len({x for x, _, _, _ in lanes.mowers}) == 5
+
+
+def test_quick_suite():
+    results = run_suite(quick=True)
+    json.loads(json.dumps(results))
+    protocols = {c["protocol"] for c in results["cases"] if c["name"] == "move_swarm"}
+    assert protocols == {p.name for p in CollitionProtocols}
+    assert all(c["steps_per_second"] > 0 and c["peak_bytes"] > 0 for c in results["cases"])
+    assert set(results["scaling"]["fleet"]) == {p.name for p in CollitionProtocols} | {"register_mower", "run_batch"}
+    assert all(c["speedup"] > 0 for c in results["cases"] if c["name"] == "run_batch")
+    assert len(compare(results, results)) == len(results["cases"])
+
+
+def test_sweeps():
+    results = run_suite(quick=True, path_lengths=[5, 10], densities=[0.05, 0.2], plateau_sizes=[30, 60])
+    swarm = [c for c in results["cases"] if c["name"] == "move_swarm"]
+    assert sorted({c["path_length"] for c in swarm if c["sweep"] == "path_length"}) == [5, 10]
+    density = [c for c in swarm if c["sweep"] == "density"]
+    assert {tuple(c["plateau"]) for c in density} == {(20, 20)}
+    assert sorted({c["fleet"] for c in density}) == [22, 88]
+    assert sorted({c["plateau"][0] for c in swarm if c["sweep"] == "plateau"}) == [30, 60]
+    assert set(results["scaling"]) == {"fleet", "path_length", "density", "plateau"}
+    assert set(results["scaling"]["path_length"]) == {p.name for p in CollitionProtocols}
+    assert set(results["scaling"]["density"]) == {"STOP_ON_COLLITIONS", "AWAIT_ON_COLLITIONS"}
+
+
+@pytest.mark.parametrize("axis,field", [("fleet", "fleet"), ("path_length", "path_length"), ("density", "density"), ("plateau", "cells")])
+def test_scaling_exponent(axis, field):
+    cases = [{field: n, "seconds": n ** 2 * 1e-6} for n in (10, 100, 1000)]
+    assert abs(scaling_exponent(cases, axis) - 2) < 1e-9
+
+
+def test_cli_sweep_flags(capsys):
+    assert main(["--quick", "--path-lengths", "5,10", "--densities", "0.1", "--plateau-sizes", "30"]) == 0
+    out = capsys.readouterr().out
+    assert "path_length=5 " in out and "plateau=30 " in out
+    assert "scaling plateau" in out
+
+
+def test_startup_imports_no_backend():
+    from benchmarks.bench_startup import FORBIDDEN, import_times, run_main
+    _, out, err = run_main(python_args=("-X", "importtime"))
+    assert out == b"1 3 N\n5 1 E\n"
+    modules = import_times(err)
+    assert "mowhive.mowcontroller" in modules
+    assert not set(modules) & set(FORBIDDEN)
+
+
+def test_startup_compare():
+    from benchmarks.bench_startup import compare
+    old = {"median_seconds": 0.05, "interpreter_seconds": 0.02, "forbidden": []}
+    assert compare(old, old, 0.2) == []
+    slower = dict(old, median_seconds=0.06)
+    assert len(compare(old, slower, 0.2)) == 1
+    assert compare(old, dict(old, forbidden=["numpy"]), 0.2) == ["numpy is imported"]
+
+
+def test_concurrent_quick_suite():
+    from benchmarks.bench_concurrent import run_suite
+    results = run_suite(quick=True, threads=[1, 2])
+    json.loads(json.dumps(results))
+    assert [c["controller"] for c in results["cases"]] == ["plain"] + ["stripes=256"] * 2 + ["stripes=1"] * 2
+    assert all(c["consistent"] and c["calls"] > 0 for c in results["cases"])
@@ -0,0 +1,113 @@
+import io
+
+import pytest
+
+from mowhive import MowController, read_input
+from mowhive.binary import (BinaryScenario, binary_to_text, load_scenario, read_results, results_to_text,
+                            text_to_binary, write_results)
+from mowhive.mowerstate import CollitionProtocols
+from tests.conftest import scenario
+
+
+def scenario_text(seed, size, n_mowers, path_len):
+    return "\n".join([f"{size} {size}"] + scenario(seed, size, n_mowers, path_len, moves="MMLR")) + "\n"
+
+
+def to_binary(text):
+    out = io.BytesIO()
+    text_to_binary(io.BytesIO(text.encode()), out)
+    return out.getvalue()
+
+
+def run_text(text, **kwargs):
+    lines = text.splitlines()
+    dimx, dimy = map(int, lines[0].split())
+    controller = MowController(dimx, dimy, **kwargs)
+    read_input(lines[1:], controller)
+    controller.move_swarm()
+    return controller
+
+
+def test_readme_sample():
+    data = to_binary("5 5\n1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n")
+    scenario = BinaryScenario(data)
+    assert scenario.plateau_size == (5, 5)
+    assert len(scenario) == 2
+    assert scenario.xs.tolist() == [1, 3] and scenario.ys.tolist() == [2, 3]
+    assert scenario.program(0).ops.tolist() == [-7, 1, -7, 1, -7, 1, -7, 2]
+    # Columns are views of the buffer, not copies
+    assert scenario.ops.obj is not None and len(data) % 8 == 0
+
+    controller = MowController(*scenario.plateau_size)
+    scenario.register(controller)
+    controller.move_swarm()
+    out = io.BytesIO()
+    write_results(out, controller)
+    text = io.BytesIO()
+    results_to_text(out.getvalue(), text)
+    assert text.getvalue() == b"1 3 N\n5 1 E\n"
+
+
+@pytest.mark.parametrize("protocol", list(CollitionProtocols))
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_binary_matches_text(tmp_path, protocol, seed):
+    text = scenario_text(seed, 12, 40, 20)
+    path = tmp_path / "scenario.bin"
+    path.write_bytes(to_binary(text))
+
+    for use_mmap in (True, False):
+        scenario = load_scenario(str(path), use_mmap)
+        controller = MowController(*scenario.plateau_size, collition_protocol=protocol)
+        scenario.register(controller)
+        reference = MowController(12, 12, collition_protocol=protocol)
+        read_input(text.splitlines()[1:], reference)
+        try:
+            reference.move_swarm()
+        except Exception as e:
+            with pytest.raises(type(e)):
+                controller.move_swarm()
+            continue
+        controller.move_swarm()
+        assert controller.show_current_state() == reference.show_current_state()
+
+
+def test_text_round_trip():
+    text = scenario_text(3, 10, 30, 15)
+    out = io.BytesIO()
+    binary_to_text(to_binary(text), out)
+    # Paths come back compiled, but run the same and convert to the same binary
+    assert to_binary(out.getvalue().decode()) == to_binary(text)
+    assert run_text(out.getvalue().decode()).show_current_state() == run_text(text).show_current_state()
+
+
+@pytest.mark.parametrize("compact_fleet", [False, True])
+def test_results(compact_fleet):
+    controller = run_text(scenario_text(4, 10, 30, 15), compact_fleet=compact_fleet)
+    out = io.BytesIO()
+    write_results(out, controller)
+    xs, ys, orientations = read_results(out.getvalue())
+    assert [f"{x} {y} {'NESW'[o]}" for x, y, o in zip(xs, ys, orientations)] == controller.show_current_state()
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        BinaryScenario(b"5 5\n1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n")
+    with pytest.raises(ValueError):
+        read_results(to_binary("5 5\n"))
+    with pytest.raises(ValueError):
+        BinaryScenario(to_binary("5 5\n1 2 N\nLMLM\n")[:-8])
+
+
+@pytest.mark.parametrize("compact_fleet", [False, True])
+def test_coordinates_past_int32(compact_fleet):
+    size = 2 ** 33
+    text = f"{size} {size}\n{2 ** 32} {2 ** 31} E\nMMLM\n0 {size} S\nMM\n"
+    scenario = BinaryScenario(to_binary(text))
+    assert scenario.plateau_size == (size, size)
+    assert scenario.xs.tolist() == [2 ** 32, 0]
+
+    controller = run_text(text, compact_fleet=compact_fleet)
+    out = io.BytesIO()
+    write_results(out, controller)
+    xs, ys, orientations = read_results(out.getvalue())
+    assert (xs.tolist(), ys.tolist()) == ([2 ** 32 + 2, 0], [2 ** 31 + 1, size - 2])
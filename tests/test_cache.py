@@ -0,0 +1,169 @@
+import io
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from mowhive import Cardinal, MowController, read_input
+from mowhive.cache import ResultCache, scenario_key
+from mowhive.mowerstate import CollitionProtocols, PathProgram
+from mowhive.obstacles import ObstacleMap
+from mowhive.plateau import TiledBitmap
+from mowhive.trace import TraceRecorder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIO = ["1 2 N", "LMLMLMLMM", "3 3 E", "MMRMMRMRRM", "0 0 E", "MMMMMLMMMMM"]
+# The third mower waits on the fourth one under AWAIT_ON_COLLITIONS, then goes on
+REQUEUED = SCENARIO[:4] + ["0 0 E", "M", "1 0 N", "MM"]
+
+
+def controller(lines=SCENARIO, protocol=CollitionProtocols.STOP_ON_COLLITIONS, obstacles=None, compact_fleet=False):
+    mow_hive = MowController(5, 5, collition_protocol=protocol, obstacles=obstacles, compact_fleet=compact_fleet)
+    read_input(lines, mow_hive)
+    return mow_hive
+
+
+def test_key_follows_the_compiled_scenario():
+    key = scenario_key(controller())
+    # Folded rotations compile to the same program
+    assert scenario_key(controller(["1 2 N", "LRLMLMLMLMM", "3 3 E", "MMRMMRMRRM", "0 0 E", "MMMMMLLLLLMMMMM"])) == key
+    assert scenario_key(controller(compact_fleet=True)) == key
+    assert scenario_key(controller(SCENARIO[:4] + ["0 0 E", "MMMMMLMMMM"])) != key
+    assert scenario_key(controller(["1 2 E"] + SCENARIO[1:])) != key
+    assert scenario_key(controller(protocol=CollitionProtocols.AWAIT_ON_COLLITIONS)) != key
+    assert scenario_key(controller(obstacles=ObstacleMap.from_rectangles(5, 5, [(4, 4, 4, 4)]))) != key
+    assert scenario_key(controller(obstacles=ObstacleMap(5, 5))) != key
+    tiled = TiledBitmap(5, 5, tile_size=8)
+    tiled.add(4, 4)
+    assert scenario_key(controller(obstacles=tiled)) != key
+
+    # A mower half way through its program has the key of the rest of it
+    halfway = controller()
+    halfway.mowers[2].program.offset = 2
+    rest = controller(SCENARIO[:4] + ["0 0 E", "MMMLMMMMM"])
+    assert scenario_key(halfway) == scenario_key(rest)
+
+
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+@pytest.mark.parametrize("compact_fleet", [False, True])
+def test_hit_gives_the_final_state(tmp_path, protocol, compact_fleet):
+    cache = ResultCache(str(tmp_path))
+    expected = controller(REQUEUED, protocol, compact_fleet=compact_fleet)
+    expected.move_swarm()
+    assert not expected.wait_for
+
+    first = controller(REQUEUED, protocol, compact_fleet=compact_fleet)
+    first.move_swarm(cache=cache)
+    assert (cache.hits, cache.misses, cache.stores) == (0, 1, 1)
+    second = controller(REQUEUED, protocol, compact_fleet=compact_fleet)
+    stats = second.move_swarm(stats=True, cache=cache)
+    assert (cache.hits, cache.misses, cache.stores) == (1, 1, 1)
+
+    for mow_hive in (first, second):
+        assert mow_hive.show_current_state() == expected.show_current_state()
+        assert mow_hive.occupancy == expected.occupancy
+        assert all(m.program.finished() for m in mow_hive.mowers)
+    assert sum(stats.successes) == 0 and "cache" in stats.phases
+    assert stats.cached and "movement statistics unavailable, the outcome was read from the cache" in stats.report()
+
+
+def test_unfinished_runs_are_not_stored(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    # Two mowers swapping cells deadlock
+    mow_hive = controller(["0 0 E", "M", "1 0 W", "M"], CollitionProtocols.AWAIT_ON_COLLITIONS)
+    mow_hive.move_swarm(cache=cache)
+    assert mow_hive.deadlocks
+    mow_hive = controller(["0 0 N", "MMMMMMM"], CollitionProtocols.ABORT_ON_COLLITIONS)
+    with pytest.raises(Exception):
+        mow_hive.move_swarm(cache=cache)
+    assert (cache.misses, cache.stores) == (2, 0)
+    assert not list(cache.entries())
+
+
+def test_runs_with_a_trace_bypass_the_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    mow_hive = controller()
+    TraceRecorder(mow_hive)
+    mow_hive.move_swarm(cache=cache)
+    assert cache.misses == 0
+    assert not list(cache.entries())
+
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    mow_hive = controller()
+    key = cache.key(mow_hive)
+    mow_hive.move_swarm(cache=cache)
+    with open(os.path.join(str(tmp_path), key + ".res"), "r+") as f:
+        f.truncate(12)
+    assert cache.get(key) is None
+    mow_hive = controller()
+    mow_hive.move_swarm(cache=cache)
+    assert cache.get(key) == mow_hive.show_current_state()
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_entries=4, check_every=1)
+    keys = [f"{i:040x}" for i in range(6)]
+    for i, key in enumerate(keys[:4]):
+        cache.put(key, [f"{i} 0 N"])
+        os.utime(os.path.join(str(tmp_path), key + ".res"), ns=(i * 10**9, i * 10**9))
+    # Reading the oldest one makes it the most recent
+    assert cache.get(keys[0]) == ["0 0 N"]
+    cache.put(keys[4], ["4 0 N"])
+    cache.put(keys[5], ["5 0 N"])
+    assert cache.evictions == 2
+    # Down to 90% of max_entries once it was outgrown
+    assert sorted(e.name[:-4] for e in cache.entries()) == [keys[0], keys[3], keys[4], keys[5]]
+
+    cache = ResultCache(str(tmp_path), max_bytes=30, check_every=1)
+    cache.put(keys[1], ["1 0 N"])
+    assert sum(e.stat().st_size for e in cache.entries()) <= 27
+
+
+def _worker(args):
+    directory, seed = args
+    cache = ResultCache(directory, max_entries=20, check_every=4)
+    states = []
+    for i in range(40):
+        n = (seed * 7 + i) % 30
+        mow_hive = MowController(40, 40)
+        mow_hive.register_mower(n, 0, Cardinal.N, PathProgram.from_string("M" * n))
+        mow_hive.move_swarm(cache=cache)
+        states.append((n, mow_hive.show_current_state()))
+    cache.flush()
+    return states
+
+
+def test_concurrent_processes(tmp_path):
+    with ProcessPoolExecutor(4) as executor:
+        results = list(executor.map(_worker, [(str(tmp_path), seed) for seed in range(8)]))
+    for states in results:
+        for n, state in states:
+            assert state == [f"{n} {n} N"]
+    totals = ResultCache(str(tmp_path)).totals()
+    assert totals["hits"] + totals["misses"] == 8 * 40
+    assert totals["hits"] > 0 and totals["evictions"] > 0
+    assert len(list(ResultCache(str(tmp_path)).entries())) <= 20 + 4 * 4
+    assert not [name for name in os.listdir(str(tmp_path)) if name.startswith(".tmp-")]
+
+
+def test_main_cache(tmp_path):
+    from mowhive.binary import text_to_binary
+    scenario = b"5 5\n1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n"
+    binary = io.BytesIO()
+    text_to_binary(io.BytesIO(scenario), binary)
+    outputs = []
+    for args, data in [([], scenario), (["--cache", str(tmp_path)], scenario), (["--cache", str(tmp_path)], scenario),
+                       (["--cache", str(tmp_path), "--format", "binary"], binary.getvalue())]:
+        done = subprocess.run([sys.executable, "main.py", *args], input=data, capture_output=True, cwd=ROOT, check=True)
+        outputs.append(done.stdout)
+    assert outputs[0] == outputs[1] == outputs[2] == b"1 3 N\n5 1 E\n"
+    # A hit has no movements to count
+    done = subprocess.run([sys.executable, "main.py", "--stats", "--cache", str(tmp_path)], input=scenario, capture_output=True, cwd=ROOT, check=True)
+    assert b"statistics unavailable" in done.stderr and b"successes" not in done.stderr
+    report = subprocess.run([sys.executable, "-m", "mowhive.cache", str(tmp_path)], capture_output=True, cwd=ROOT, check=True)
+    # The binary scenario has the same key as the text one
+    assert b"hits 3\n" in report.stdout and b"misses 1\n" in report.stdout
@@ -0,0 +1,163 @@
+import os
+
+import pytest
+
+from mowhive import MowController, read_input
+from mowhive.checkpoint import MAGIC, RECORD, Checkpointer, iter_snapshots, load_snapshot
+from mowhive.mowerstate import CollitionProtocols
+from tests.conftest import scenario
+
+
+def controller(protocol, lines=None):
+    mow_hive = MowController(8, 8, collition_protocol=protocol)
+    if lines is not None:
+        read_input(lines, mow_hive)
+    return mow_hive
+
+
+def final_state(mow_hive):
+    return mow_hive.show_current_state(), mow_hive.occupancy, mow_hive.wait_for, mow_hive.deadlocks, [m.desired_path for m in mow_hive.mowers]
+
+
+class Interrupted(Exception):
+    pass
+
+
+class DyingCheckpointer(Checkpointer):
+    """ Dies right after writing a number of snapshots """
+    def __init__(self, path, die_after, **kwargs):
+        super().__init__(path, **kwargs)
+        self.die_after = die_after
+
+    def _record(self, tag, values):
+        super()._record(tag, values)
+        if self.snapshots == self.die_after:
+            raise Interrupted()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+@pytest.mark.parametrize("seed,die_after", [(0, 2), (1, 4), (2, 7)])
+def test_resume_after_crash(tmp_path, protocol, seed, die_after, use_mmap):
+    lines = scenario(seed, 8, 30, 15, moves="MMLR", full_paths=True)
+    reference = controller(protocol, lines)
+    reference.move_swarm()
+
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = controller(protocol, lines)
+    with DyingCheckpointer(path, die_after, every_steps=3, use_mmap=use_mmap) as checkpoint:
+        with pytest.raises(Interrupted):
+            mow_hive.move_swarm(checkpoint=checkpoint)
+
+    # A new process only has the checkpoint file
+    resumed = controller(protocol)
+    resumed.resume(path)
+    assert final_state(resumed) == final_state(reference)
+
+    # The interrupted controller can also be rewound to the snapshot
+    mow_hive.resume(path)
+    assert final_state(mow_hive) == final_state(reference)
+
+
+def test_deltas_and_inspection(tmp_path):
+    lines = scenario(3, 8, 30, 15, moves="MMLR", full_paths=True)
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = controller(CollitionProtocols.STOP_ON_COLLITIONS, lines)
+    with Checkpointer(path, every_steps=1) as checkpoint:
+        mow_hive.move_swarm(checkpoint=checkpoint)
+
+    snapshots = list(iter_snapshots(path))
+    assert len(snapshots) == 31
+    assert [s.steps for s in snapshots] == list(range(31))
+    assert snapshots[0].ready == list(range(30))
+    assert snapshots[10].ready == list(range(10, 30))
+    assert snapshots[-1].finished()
+    assert [f"{x} {y} {'NESW'[o]}" for x, y, o, _, _ in snapshots[-1].mowers] == mow_hive.show_current_state()
+    # Each delta only carries the mower that ran, not the fleet nor the ready queue
+    with open(path, "rb") as f:
+        data = f.read()
+    base = len(MAGIC) + RECORD.size + RECORD.unpack_from(data, len(MAGIC))[1]
+    assert (os.path.getsize(path) - base) / 30 <= RECORD.size + 12 * 8
+
+    # Resuming a finished run does nothing
+    assert load_snapshot(path).finished()
+    before = mow_hive.show_current_state()
+    mow_hive.resume(path)
+    assert mow_hive.show_current_state() == before
+
+
+@pytest.mark.parametrize("every_steps", [2, 5, 100])
+@pytest.mark.parametrize("lines", [["0 0 N", "MM", "0 1 E", "M"], scenario(5, 8, 40, 20, moves="MMLR", full_paths=True)])
+def test_woken_mowers_run_between_snapshots(tmp_path, lines, every_steps):
+    # Mowers woken and run again between two snapshots, under AWAIT_ON_COLLITIONS
+    protocol = CollitionProtocols.AWAIT_ON_COLLITIONS
+    reference = controller(protocol, lines)
+    reference.move_swarm()
+
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = controller(protocol, lines)
+    with Checkpointer(path, every_steps=every_steps) as checkpoint:
+        mow_hive.move_swarm(checkpoint=checkpoint)
+    assert final_state(mow_hive) == final_state(reference)
+    assert load_snapshot(path).finished()
+    for snapshot in iter_snapshots(path):
+        resumed = controller(protocol)
+        resumed.resume(snapshot)
+        assert final_state(resumed) == final_state(reference)
+
+
+def test_woken_mowers_are_logged_without_the_queue(tmp_path):
+    # Mower 0 waits on mower 1 and is woken behind a long queue of idle mowers, the delta only has where it went
+    lines = ["0 0 N", "MM", "0 1 E", "M"] + [line for x in range(2, 202) for line in (f"{x % 9} {x // 9 + 2} N", "")]
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = MowController(8, 30, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS)
+    read_input(lines, mow_hive)
+    with Checkpointer(path, every_steps=1) as checkpoint:
+        mow_hive.move_swarm(checkpoint=checkpoint)
+    assert mow_hive.show_current_state()[:2] == ["0 2 N", "1 1 E"]
+
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = len(MAGIC) + RECORD.size + RECORD.unpack_from(data, len(MAGIC))[1]
+    while pos < len(data):
+        length = RECORD.unpack_from(data, pos)[1]
+        assert length <= 16 * 8
+        pos += RECORD.size + length
+    snapshots = list(iter_snapshots(path))
+    assert snapshots[2].ready == list(range(2, 202)) + [0]
+    assert snapshots[-1].finished()
+
+
+def test_coordinates_past_int32(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = MowController(2 ** 33, 2 ** 33)
+    read_input([f"{2 ** 32} {2 ** 31} E", "MMLM"], mow_hive)
+    with Checkpointer(path) as checkpoint:
+        mow_hive.move_swarm(checkpoint=checkpoint)
+    assert load_snapshot(path).plateau_size == (2 ** 33, 2 ** 33)
+    assert load_snapshot(path).mowers == [[2 ** 32 + 2, 2 ** 31 + 1, 0, 3, 0]]
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    lines = scenario(4, 8, 10, 10, moves="MMLR", full_paths=True)
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = controller(CollitionProtocols.STOP_ON_COLLITIONS, lines)
+    with Checkpointer(path, every_steps=4) as checkpoint:
+        mow_hive.move_swarm(checkpoint=checkpoint)
+    steps = [s.steps for s in iter_snapshots(path)]
+    assert steps == [0, 4, 8, 10]
+
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert load_snapshot(path).steps == 8
+
+
+def test_resume_checks_controller(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    mow_hive = controller(CollitionProtocols.STOP_ON_COLLITIONS, ["1 2 N", "LMLMLMLMM"])
+    with Checkpointer(path) as checkpoint:
+        mow_hive.move_swarm(checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        controller(CollitionProtocols.AWAIT_ON_COLLITIONS).resume(path)
+    with pytest.raises(ValueError):
+        MowController(5, 5).resume(path)
@@ -223,4 +223,132 @@ def test_rotate_mowner_fail(plateau_size, unregistered_mower, operation, expecte
         mow_hive.register_mower(unregistered_mower[0], unregistered_mower[1], unregistered_mower[2])
         result = mow_hive.rotate_mower(0, operation)
         assert type(result) is type(expected_result)
-        assert mow_hive.mowers[0] == expected_mower
\ No newline at end of file
+        assert mow_hive.mowers[0] == expected_mower
+
+@pytest.mark.parametrize("plateau_size,unregistered_mowers,moved_mower,expected_occupancy", 
+[
+    ((5,5),
+     [
+        (1,1,Cardinal.N),
+        (3,3,Cardinal.E),
+     ],
+     0,
+     {(1,2): 0, (3,3): 1},
+    ),
+    ((5,5),
+     [
+        (1,1,Cardinal.N),
+        (1,2,Cardinal.E),
+     ],
+     0,
+     {(1,1): 0, (1,2): 1},
+    ),
+])
+def test_occupancy_follows_mowers(plateau_size, unregistered_mowers, moved_mower, expected_occupancy):
+    mow_hive = MowController(plateau_size[0], plateau_size[1])
+    for um in unregistered_mowers:
+        mow_hive.register_mower(um[0], um[1], um[2])
+    mow_hive.move_mower(moved_mower)
+
+    assert mow_hive.occupancy == expected_occupancy
+    for (x, y), i in expected_occupancy.items():
+        assert mow_hive.who_is_there(x, y) == i
+        assert mow_hive.is_a_mower_there(x, y)
+    assert mow_hive.who_is_there(0, 0) is None
+    assert not mow_hive.is_a_mower_there(0, 0)
+
+
+@pytest.mark.parametrize("plateau_size,unregistered_mowers,steps,expected_done,expected_mower,expected_result", 
+[
+    ((5,5),
+     [(1,1,Cardinal.N)],
+     3,
+     3,
+     Mower(Coord(1,4),Cardinal.N),
+     MovementSucess()
+    ),
+    ((5,5),
+     [(1,1,Cardinal.N)],
+     9,
+     4,
+     Mower(Coord(1,5),Cardinal.N),
+     OutOfBounds()
+    ),
+    ((5,5),
+     [(1,1,Cardinal.E), (4,1,Cardinal.N)],
+     9,
+     2,
+     Mower(Coord(3,1),Cardinal.E),
+     ObstructingMower(1)
+    ),
+    ((5,5),
+     [(6,1,Cardinal.W)],
+     9,
+     6,
+     Mower(Coord(0,1),Cardinal.W),
+     OutOfBounds()
+    ),
+    ((5,5),
+     [(7,1,Cardinal.W)],
+     9,
+     0,
+     Mower(Coord(7,1),Cardinal.W),
+     OutOfBounds()
+    ),
+])
+def test_advance_mowner(plateau_size, unregistered_mowers, steps, expected_done, expected_mower, expected_result):
+    mow_hive = MowController(plateau_size[0], plateau_size[1])
+    for um in unregistered_mowers:
+        mow_hive.register_mower(um[0], um[1], um[2])
+    done, result = mow_hive.advance_mower(0, steps)
+    assert done == expected_done
+    assert type(result) is type(expected_result)
+    assert mow_hive.mowers[0] == expected_mower
+    assert mow_hive.who_is_there(expected_mower.location.x, expected_mower.location.y) == 0
+
+
+def test_results_are_shared():
+    from mowhive.mowerstate import OUT_OF_BOUNDS, SUCCESS
+    mow_hive = MowController(1, 1)
+    mow_hive.register_mower(0, 0, Cardinal.N)
+    assert mow_hive.move_mower(0) is SUCCESS
+    assert mow_hive.move_mower(0) is OUT_OF_BOUNDS
+    assert mow_hive.rotate_mower(0, Movements.R) is SUCCESS
+
+
+@pytest.mark.parametrize("compact_fleet", [False, True])
+@pytest.mark.parametrize("buffer_size", [1, 16, 1 << 16])
+def test_write_current_state(compact_fleet, buffer_size):
+    import io
+    mow_hive = MowController(1000, 1000, compact_fleet=compact_fleet)
+    for i in range(100):
+        mow_hive.register_mower(i * 7 % 1001, i, Cardinal(i % 4))
+    expected = [f"{i * 7 % 1001} {i} {'NESW'[i % 4]}" for i in range(100)]
+    assert list(mow_hive.iter_current_state()) == expected
+    assert mow_hive.show_current_state() == expected
+
+    out = io.BytesIO()
+    assert mow_hive.write_current_state(out, buffer_size) == 100
+    assert out.getvalue().decode() == "".join(f"{s}\n" for s in expected)
+
+
+@pytest.mark.parametrize("buffer_size", [1, 40, 100, 1 << 16])
+def test_write_current_state_long_lines(buffer_size):
+    import io
+    # Coordinates far off the plateau make lines longer than 64 bytes
+    mow_hive = MowController(5, 5)
+    mow_hive.register_mower(10 ** 40, -10 ** 40, Cardinal.W)
+    mow_hive.register_mower(1, 2, Cardinal.N)
+    mow_hive.register_mower(-10 ** 30, 10 ** 45, Cardinal.S)
+    out = io.BytesIO()
+    assert mow_hive.write_current_state(out, buffer_size) == 3
+    assert out.getvalue().decode().splitlines() == mow_hive.show_current_state()
+
+
+def test_print_current_state(capsys):
+    mow_hive = MowController(5, 5)
+    mow_hive.register_mower(1, 2, Cardinal.N)
+    mow_hive.register_mower(3, 3, Cardinal.E)
+    print("before")
+    mow_hive.print_current_state()
+    assert capsys.readouterr().out == "before\n1 2 N\n3 3 E\n"
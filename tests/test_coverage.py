@@ -0,0 +1,120 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mowhive import Cardinal, MowController, read_input
+from mowhive.coverage import Coverage
+from mowhive.mowerstate import CollitionProtocols
+from mowhive.obstacles import ObstacleMap
+from mowhive.plateau import TiledBitmap
+from mowhive.trace import TraceRecorder
+from tests.conftest import scenario
+
+
+def brute_regions(free):
+    # 4-connected components of a set of cells
+    seen, regions = set(), []
+    for cell in sorted(free):
+        if cell in seen:
+            continue
+        stack, cells = [cell], []
+        seen.add(cell)
+        while stack:
+            x, y = stack.pop()
+            cells.append((x, y))
+            for n in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if n in free and n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+        xs, ys = [c[0] for c in cells], [c[1] for c in cells]
+        regions.append((len(cells), min(xs), min(ys), max(xs), max(ys)))
+    return sorted(regions, key=lambda r: (-r[0], r[1:]))
+
+
+@pytest.mark.parametrize("obstacle_kind", [None, "map", "tiled"])
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_coverage_matches_trace(protocol, seed, obstacle_kind):
+    size_x, size_y = 14, 9
+    rectangles = [(3, 3, 5, 4), (10, 0, 10, 9)]
+    if obstacle_kind == "map":
+        obstacles = ObstacleMap.from_rectangles(size_x, size_y, rectangles)
+    elif obstacle_kind == "tiled":
+        obstacles = TiledBitmap(size_x, size_y, tile_size=8)
+        for r in rectangles:
+            obstacles.add_rectangle(*r)
+    else:
+        obstacles = None
+    blocked = {(x, y) for x in range(size_x + 1) for y in range(size_y + 1) if obstacles is not None and obstacles.is_blocked(x, y)}
+
+    mow_hive = MowController(size_x, size_y, collition_protocol=protocol, obstacles=obstacles)
+    coverage = Coverage(mow_hive)
+    recorder = TraceRecorder(mow_hive)
+    read_input(scenario(seed, 9, 6, 40, blocked=blocked, full_paths=True), mow_hive)
+    mow_hive.move_swarm()
+
+    visited = [{(x, y) for x, y, _ in recorder.path(i)} for i in range(len(mow_hive.mowers))]
+    covered = set().union(*visited)
+    mowable = {(x, y) for x in range(size_x + 1) for y in range(size_y + 1)} - blocked
+    assert coverage.covered_cells() == len(covered)
+    assert coverage.mowable_cells() == len(mowable)
+    assert coverage.percentage() == pytest.approx(100 * len(covered) / len(mowable))
+    assert coverage.per_mower().tolist() == [len(v) for v in visited]
+
+    rows = coverage.row_intervals()
+    assert {(x, y) for y, x0, x1 in rows.tolist() for x in range(x0, x1 + 1)} == covered
+    assert sum(x1 - x0 + 1 for _, x0, x1 in rows.tolist()) == len(covered)
+
+    uncovered = mowable - covered
+    intervals = coverage.uncovered_intervals().tolist()
+    assert {(x, y) for y, x0, x1 in intervals for x in range(x0, x1 + 1)} == uncovered
+    assert sum(x1 - x0 + 1 for _, x0, x1 in intervals) == len(uncovered)
+    regions = coverage.uncovered_regions()
+    assert sorted(regions, key=lambda r: (-r[0], r[1:])) == brute_regions(uncovered)
+
+
+def test_empty_and_detach():
+    mow_hive = MowController(4, 4)
+    coverage = Coverage(mow_hive)
+    assert coverage.covered_cells() == 0
+    assert coverage.per_mower().tolist() == []
+    assert coverage.uncovered_regions() == [(25, 0, 0, 4, 4)]
+
+    mow_hive.register_mower(0, 0, Cardinal.N)
+    read_input(["4 4 S", "MMMMRMM"], mow_hive)
+    mow_hive.move_swarm()
+    # (0, 0) plus column x = 4 and (3, 0), (2, 0)
+    assert coverage.covered_cells() == 8
+    assert coverage.row_intervals().tolist()[:2] == [[0, 0, 0], [0, 2, 4]]
+    assert coverage.report()[0] == "covered 8 of 25 mowable cells (32.00%)"
+
+    coverage.detach()
+    mow_hive.register_mower(2, 2, Cardinal.N)
+    assert coverage.covered_cells() == 8
+
+
+def test_mowers_outside_the_plateau():
+    mow_hive = MowController(4, 4)
+    coverage = Coverage(mow_hive)
+    # Off the plateau on every side: only the cells they reach inside it count
+    read_input(["-1 2 E", "MMM", "2 5 S", "MMMM", "5 0 N", "M", "0 -1 N", ""], mow_hive)
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == ["2 2 E", "2 3 S", "5 0 N", "0 -1 N"]
+    assert coverage.row_intervals().tolist() == [[2, 0, 2], [3, 2, 2], [4, 2, 2]]
+    assert coverage.covered_cells() == 5
+    assert coverage.per_mower().tolist() == [3, 2, 0, 0]
+    assert coverage.uncovered_intervals()[:1].tolist() == [[0, 0, 4]]
+
+
+def test_back_and_forth_runs_across_rows():
+    mow_hive = MowController(20, 20, compact_fleet=True)
+    coverage = Coverage(mow_hive)
+    recorder = TraceRecorder(mow_hive)
+    # Columns walked over and over, crossed by rows walked just as often
+    read_input(["3 0 N", "MMMMMMMMMMRR" * 300, "0 5 E", "MMMMMMMMRR" * 300, "10 2 N", "MMMMMMRRMMMMMMRRLMMMMMMRR" * 200], mow_hive)
+    mow_hive.move_swarm()
+    assert len(coverage.columns) // 4 >= 300
+
+    visited = [{(x, y) for x, y, _ in recorder.path(i)} for i in range(len(mow_hive.mowers))]
+    assert coverage.covered_cells() == len(set().union(*visited))
+    assert coverage.per_mower().tolist() == [len(v) for v in visited]
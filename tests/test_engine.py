@@ -0,0 +1,79 @@
+import pytest
+
+from mowhive import Cardinal, MowController, Movements, read_input
+from mowhive.engine import run_batch
+from mowhive.errors import UnsupportedCollitionProtocol
+from mowhive.mowerstate import CollitionProtocols, PathProgram
+from mowhive.obstacles import ObstacleMap
+from tests.conftest import scenario
+
+
+def build(size, lines):
+    mow_hive = MowController(size[0], size[1])
+    read_input(lines, mow_hive)
+    return mow_hive
+
+
+@pytest.mark.parametrize("seed,size,n_mowers,path_len", [
+    (0, (2,2), 3, 12),
+    (1, (5,5), 10, 40),
+    (2, (5,5), 30, 80),
+    (3, (20,10), 60, 200),
+    (4, (1,1), 4, 30),
+])
+def test_batch_matches_sequential(seed, size, n_mowers, path_len):
+    lines = scenario(seed, size, n_mowers, path_len, moves="LRM")
+    reference = build(size, lines)
+    reference.move_swarm()
+    batch = build(size, lines)
+    run_batch(batch)
+
+    assert batch.show_current_state() == reference.show_current_state()
+    assert batch.occupancy == reference.occupancy
+
+
+def step_by_step(size, lines, obstacles):
+    # STOP_ON_COLLITIONS one movement at a time, each mower finishing its path before the next one
+    mow_hive = MowController(size[0], size[1], obstacles=obstacles)
+    for i in range(0, len(lines), 2):
+        x, y, o = lines[i].split(" ")
+        mow_hive.register_mower(int(x), int(y), Cardinal[o])
+    for i, path in enumerate(lines[1::2]):
+        for c in path:
+            mow_hive.move_mower(i) if c == "M" else mow_hive.rotate_mower(i, Movements[c])
+    return mow_hive
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_batch_matches_step_by_step(seed):
+    size = (12, 9)
+    obstacles = ObstacleMap.from_rectangles(size[0], size[1], [(4, 3, 6, 5), (10, 0, 10, 2)])
+    lines = scenario(seed, size, 40, 60, blocked=obstacles)
+    reference = step_by_step(size, lines, obstacles)
+    batch = MowController(size[0], size[1], obstacles=obstacles)
+    read_input(lines, batch)
+    run_batch(batch)
+
+    assert batch.show_current_state() == reference.show_current_state()
+    assert batch.occupancy == reference.occupancy
+
+
+def test_batch_rejects_other_protocols():
+    mow_hive = MowController(5, 5, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS)
+    with pytest.raises(UnsupportedCollitionProtocol):
+        run_batch(mow_hive)
+
+
+def test_batch_outside_plateau_and_started_programs():
+    # Mowers registered off the plateau, and programs already part way through an advance run
+    lines = [(-1, 2, Cardinal.E, "MMMLMM"), (3, 7, Cardinal.S, "MMMMMMMMRM"), (2, 2, Cardinal.N, "MMMMRRMMMMMM"), (6, -2, Cardinal.W, "M")]
+    results = []
+    for batch in (False, True):
+        for compact_fleet in (False, True):
+            mow_hive = MowController(5, 5, compact_fleet=compact_fleet)
+            for x, y, o, path in lines:
+                mow_hive.register_mower(x, y, o, PathProgram.from_string(path))
+            mow_hive.mowers[2].program.offset = 2
+            run_batch(mow_hive) if batch else mow_hive.move_swarm()
+            results.append((mow_hive.show_current_state(), mow_hive.occupancy))
+    assert all(r == results[0] for r in results)
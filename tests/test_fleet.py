@@ -0,0 +1,48 @@
+import pytest
+
+from mowhive import Cardinal, Coord, Mower, MowController, Movements, read_input
+from mowhive.fleet import Fleet, MowerView
+from mowhive.mowerstate import CollitionProtocols, ObstructingMower
+
+
+def test_fleet_behaves_as_mower_list():
+    fleet = Fleet()
+    fleet.append(Mower(Coord(1,1), Cardinal.N, [Movements.M]))
+    fleet.append(Mower(Coord(2,3), Cardinal.W))
+
+    assert len(fleet) == 2
+    assert fleet == [Mower(Coord(1,1), Cardinal.N), Mower(Coord(2,3), Cardinal.W)]
+    assert isinstance(fleet[-1], MowerView)
+    assert fleet[0].desired_path == [Movements.M]
+    with pytest.raises(IndexError):
+        fleet[2]
+
+    fleet[1].location.x = 4
+    fleet[1].orientation = Cardinal.S
+    assert fleet[1] == Mower(Coord(4,3), Cardinal.S)
+    assert (fleet.xs[1], fleet.ys[1], fleet.orientations[1]) == (4, 3, Cardinal.S.value)
+
+
+def test_compact_fleet_controller_moves():
+    mow_hive = MowController(5, 5, compact_fleet=True)
+    mow_hive.register_mower(1, 1, Cardinal.N)
+    mow_hive.register_mower(1, 3, Cardinal.S)
+
+    mow_hive.move_mower(0)
+    result = mow_hive.move_mower(1)
+    assert type(result) is ObstructingMower
+    assert result.mow_int == 0
+    mow_hive.rotate_mower(1, Movements.L)
+    assert mow_hive.mowers == [Mower(Coord(1,2), Cardinal.N), Mower(Coord(1,3), Cardinal.E)]
+
+
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+def test_compact_fleet_swarm_matches_list(protocol):
+    case = ["0 0 N", "MMRMMRMRM", "0 2 E", "LLMMRMRM", "2 2 S", "MRMLM"]
+    states = []
+    for compact in (False, True):
+        mow_hive = MowController(2, 2, collition_protocol=protocol, compact_fleet=compact)
+        read_input(case, mow_hive)
+        mow_hive.move_swarm()
+        states.append(mow_hive.show_current_state())
+    assert states[0] == states[1]
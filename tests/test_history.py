@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from mowhive import Cardinal, MowController, read_input
+from mowhive.mowerstate import CollitionProtocols, Movements, PathProgram
+from mowhive.obstacles import ObstacleMap
+from mowhive.stats import SwarmStats
+from tests.conftest import random_path, scenario
+
+
+def full_run(lines, size, obstacles, compact_fleet):
+    mow_hive = MowController(size, size, compact_fleet=compact_fleet, obstacles=obstacles)
+    read_input(lines, mow_hive)
+    mow_hive.move_swarm()
+    return mow_hive
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("compact_fleet", [False, True])
+def test_change_path_matches_full_run(seed, compact_fleet):
+    rng = random.Random(seed)
+    size = 15
+    obstacles = ObstacleMap.from_rectangles(size, size, [(7, 7, 8, 9)])
+    lines = scenario(seed, size, 40, 20, blocked=obstacles)
+    mow_hive = MowController(size, size, compact_fleet=compact_fleet, obstacles=obstacles)
+    read_input(lines, mow_hive)
+    mow_hive.move_swarm_incremental()
+
+    # Several edits in a row, each checked against a run from scratch
+    for _ in range(5):
+        k = rng.randrange(len(mow_hive.mowers))
+        path = random_path(rng, 20)
+        lines[2 * k + 1] = path
+        rerun = mow_hive.change_path(k, PathProgram.from_string(path))
+        expected = full_run(lines, size, obstacles, compact_fleet)
+        assert rerun[0] == k and rerun == sorted(rerun)
+        assert mow_hive.show_current_state() == expected.show_current_state()
+        assert mow_hive.occupancy == expected.occupancy
+        assert all(m.program is None or m.program.finished() for m in mow_hive.mowers)
+
+
+def test_unaffected_mowers_are_not_run():
+    mow_hive = MowController(20, 20)
+    read_input(["0 0 N", "MMM", "10 10 E", "MM", "0 6 S", "MMMMMM", "3 4 W", "MMMM"], mow_hive)
+    mow_hive.move_swarm_incremental()
+    assert mow_hive.show_current_state() == ["0 3 N", "12 10 E", "0 4 S", "1 4 W"]
+
+    # Same final cell, nobody else can tell
+    assert mow_hive.change_path(0, [Movements.M, Movements.M, Movements.M, Movements.L, Movements.R]) == [0]
+    # Mower 0 now ends in (0, 2): mower 2 gets one cell further, which lets mower 3 reach the edge
+    assert mow_hive.change_path(0, PathProgram.from_string("MM")) == [0, 2, 3]
+    assert mow_hive.show_current_state() == ["0 2 N", "12 10 E", "0 3 S", "0 4 W"]
+    assert mow_hive.change_path(1, None) == [1]
+    assert mow_hive.show_current_state() == ["0 2 N", "10 10 E", "0 3 S", "0 4 W"]
+
+
+def test_stats_count_the_mowers_run_again():
+    mow_hive = MowController(20, 20)
+    read_input(["0 0 N", "MMM", "10 10 E", "MM"], mow_hive)
+    mow_hive.move_swarm_incremental()
+    stats = SwarmStats()
+    mow_hive.change_path(0, PathProgram.from_string("MMMMM"))
+    mow_hive.change_path(1, PathProgram.from_string("LM"), stats)
+    assert stats.successes.tolist() == [0, 2]
+
+
+def test_change_path_needs_an_incremental_run():
+    mow_hive = MowController(9, 9)
+    read_input(["0 0 N", "MM"], mow_hive)
+    with pytest.raises(ValueError):
+        mow_hive.change_path(0, PathProgram.from_string("M"))
+    mow_hive.move_swarm_incremental()
+    mow_hive.register_mower(5, 5, Cardinal.N)
+    with pytest.raises(ValueError):
+        mow_hive.change_path(0, PathProgram.from_string("M"))
+    with pytest.raises(ValueError):
+        MowController(9, 9, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS).move_swarm_incremental()
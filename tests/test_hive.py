@@ -1,6 +1,15 @@
+import io
+import random
+import subprocess
+import sys
+from collections import deque
+
 import pytest
 from mowhive import read_mower_line, MowController, read_input, MowerObstructingPath, MowerObstructingPath, AttemptedOutOfBoundsMovement
-from mowhive.mowerstate import CollitionProtocols
+from mowhive import Cardinal, MovementSucess, Movements
+from mowhive.mowcontroller import ReadyQueue
+from mowhive.mowerstate import CollitionProtocols, ObstructingMower
+from mowhive.utils import read_header, stream_swarm, stream_swarm_file
 
 @pytest.mark.parametrize("case,expected", [
     (["5 5",
@@ -97,4 +106,146 @@ def test_await_collition_protocol_swarm_await_on_collision(case,expected):
     mow_hive.move_swarm()
 
     state = mow_hive.show_current_state()
-    assert state == expected
\ No newline at end of file
+    assert state == expected
+
+
+class UnseekableStream(io.BytesIO):
+    def seekable(self):
+        return False
+
+
+STREAM_CASES = [
+    ["5 5", "1 2 N", "LMLMLMLMM", "3 3 E", "MMRMMRMRRM"],
+    ["2 2", "0 0 N", "MMRMMRMRM", "2 0 E", "LLMMRMML"],
+    ["2 2", "0 0 N", "MMRMMRMRM", "0 2 E", "LLMMRMRM"],
+    ["3 3", "0 0 E", "MMM", "1 0 N", "", "2 2 S", "MMLMMM"],
+]
+
+@pytest.mark.parametrize("case", STREAM_CASES)
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+@pytest.mark.parametrize("stream_type", [io.BytesIO, UnseekableStream])
+def test_stream_swarm_matches_move_swarm(case, protocol, stream_type):
+    dimx, dimy = map(int, case[0].split(" "))
+    reference = MowController(dimx, dimy, collition_protocol=protocol)
+    read_input(case[1:], reference)
+    reference.move_swarm()
+
+    stream = stream_type("\n".join(case).encode() + b"\n")
+    dims = read_header(stream.readline())
+    mow_hive = MowController(dims[0], dims[1], collition_protocol=protocol)
+    stream_swarm(stream, mow_hive)
+
+    assert mow_hive.show_current_state() == reference.show_current_state()
+
+
+def test_stream_swarm_file(tmp_path):
+    scenario = tmp_path / "scenario.txt"
+    scenario.write_text("5 5\n1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n")
+    mow_hive = stream_swarm_file(str(scenario))
+    assert mow_hive.show_current_state() == ["1 3 N", "5 1 E"]
+
+
+def test_stream_swarm_abort():
+    with pytest.raises(MowerObstructingPath):
+        mow_hive = MowController(2, 2, collition_protocol=CollitionProtocols.ABORT_ON_COLLITIONS)
+        stream_swarm(io.BytesIO(b"0 0 N\nMMRMMRMRM\n0 2 E\nLLMMRMML\n"), mow_hive)
+
+
+@pytest.mark.parametrize("case,expected,expected_wait_for,expected_deadlocks", [
+    (["2 2", "0 0 N", "MM", "0 1 E", "M"],
+     ["0 2 N", "1 1 E"], {}, []),
+    (["2 2", "0 0 N", "M", "0 1 N", "M", "0 2 N", ""],
+     ["0 0 N", "0 1 N", "0 2 N"], {0: 1, 1: 2}, []),
+    (["2 2", "0 0 E", "M", "1 0 W", "M"],
+     ["0 0 E", "1 0 W"], {0: 1, 1: 0}, [[1, 0]]),
+    ])
+def test_await_collition_protocol_wait_for_graph(case, expected, expected_wait_for, expected_deadlocks):
+    dimx, dimy = map(int, case[0].split(" "))
+    mow_hive = MowController(dimx, dimy, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS)
+    read_input(case[1:], mow_hive)
+    mow_hive.move_swarm()
+
+    assert mow_hive.show_current_state() == expected
+    assert mow_hive.wait_for == expected_wait_for
+    assert mow_hive.deadlocks == expected_deadlocks
+
+
+def round_robin_await(lines, size):
+    """ AWAIT_ON_COLLITIONS as first written: one movement at a time, an obstructed mower goes to the
+        back of the queue and is retried there, until every mower left is obstructed
+    """
+    mow_hive = MowController(size[0], size[1])
+    paths = []
+    for i in range(0, len(lines), 2):
+        x, y, o = lines[i].split(" ")
+        mow_hive.register_mower(int(x), int(y), Cardinal[o])
+        paths.append([Movements[c] for c in lines[i + 1]])
+    queue = deque(range(len(paths)))
+    deferred = 0
+    while queue and deferred != len(paths):
+        i = queue.popleft()
+        while paths[i]:
+            operation = paths[i][0]
+            result = mow_hive.move_mower(i) if operation is Movements.M else mow_hive.rotate_mower(i, operation)
+            if type(result) is ObstructingMower:
+                deferred += 1
+                queue.append(i)
+                break
+            if type(result) is MovementSucess:
+                deferred = 0
+            paths[i].pop(0)
+    return mow_hive.show_current_state()
+
+
+@pytest.mark.parametrize("seeds", [range(0, 150), range(150, 300)])
+def test_await_runs_mowers_in_the_round_robin_order(seeds):
+    # Crowded little plateaus, where the order waiting mowers run again in changes where they end
+    for seed in seeds:
+        rng = random.Random(seed)
+        size = (rng.randint(2, 6), rng.randint(2, 6))
+        cells = rng.sample([(x, y) for x in range(size[0] + 1) for y in range(size[1] + 1)], rng.randint(4, 9))
+        lines = []
+        for x, y in cells:
+            lines.append(f"{x} {y} {rng.choice('NESW')}")
+            lines.append("".join(rng.choices("MMMLR", k=rng.randint(0, 20))))
+        mow_hive = MowController(size[0], size[1], collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS)
+        read_input(lines, mow_hive)
+        mow_hive.move_swarm()
+        assert mow_hive.show_current_state() == round_robin_await(lines, size), seed
+
+
+def test_ready_queue_keeps_the_round_order():
+    rng = random.Random(7)
+    for _ in range(200):
+        keys = list(range(rng.randint(1, 30)))
+        queue = ReadyQueue(keys)
+        expected = list(keys)
+        while expected:
+            last = queue.popleft()
+            assert last == expected.pop(0)
+            for key in rng.sample(range(30), rng.randint(0, 3)):
+                if key in expected:
+                    continue
+                position = queue.insert(key)
+                expected.append(key)
+                expected.sort(key=lambda r: (r <= last, r))
+                assert position == expected.index(key)
+            assert list(queue) == expected
+            # A queue rebuilt from its order, as resume does, carries on the same
+            if rng.random() < 0.2 and expected:
+                queue = ReadyQueue(list(queue))
+
+
+def test_package_is_lazy():
+    code = ("import sys, mowhive\n"
+            "assert 'mowhive.mowcontroller' not in sys.modules\n"
+            "assert mowhive.MowController.__module__ == 'mowhive.mowcontroller'\n"
+            "assert 'mowhive.engine' not in sys.modules and 'numpy' not in sys.modules\n"
+            "assert 'TraceRecorder' in dir(mowhive)\n"
+            "from mowhive import *\n"
+            "assert read_input and PlaceOccupied and 'run_batch' not in globals()\n"
+            "assert mowhive.engine.run_batch and mowhive.mowcontroller.MowController is mowhive.MowController\n")
+    subprocess.run([sys.executable, "-c", code], check=True)
+    import mowhive
+    with pytest.raises(AttributeError):
+        mowhive.not_there
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from benchmarks.live_load import Client, run_local
+from mowhive import Cardinal, MowController, read_input
+from mowhive.errors import MowersDeadlocked, PlaceOccupied
+from mowhive.live import LiveController, serve
+from mowhive.mowerstate import CollitionProtocols
+from tests.conftest import scenario
+
+
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_one_batch_matches_move_swarm(protocol, seed):
+    lines = scenario(seed, 6, 20, 12, moves="MMLR", full_paths=True)
+    mowers = []
+    for line, path in zip(lines[::2], lines[1::2]):
+        x, y, o = line.split()
+        mowers.append((int(x), int(y), o, path))
+    reference = MowController(6, 6, collition_protocol=protocol)
+    read_input(lines, reference)
+    reference.move_swarm()
+
+    async def run():
+        live = LiveController(MowController(6, 6, collition_protocol=protocol))
+        ids = [live.register(x, y, Cardinal[o]) for x, y, o, _ in mowers]
+        futures = [live.submit(i, path) for i, (_, _, _, path) in zip(ids, mowers)]
+        await asyncio.wait(futures, timeout=0.05)
+        assert live.batches == 1
+        return live.controller.show_current_state()
+
+    assert asyncio.run(run()) == reference.show_current_state()
+
+
+def test_waiting_mower_resumes_when_blocker_moves():
+    async def run():
+        live = LiveController(MowController(5, 5, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS))
+        a = live.register(1, 1, Cardinal.N)
+        b = live.register(1, 2, Cardinal.N)
+        waiting = live.submit(a, "MM")
+        await asyncio.sleep(0)
+        assert live.controller.wait_for == {a: b}
+        assert not waiting.done()
+        assert await live.move(b, "RM") == (2, 2, Cardinal.E)
+        assert await waiting == (1, 3, Cardinal.N)
+        assert live.controller.wait_for == {}
+
+    asyncio.run(run())
+
+
+def test_commands_queue_behind_a_waiting_one():
+    async def run():
+        live = LiveController(MowController(5, 5, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS))
+        a = live.register(1, 1, Cardinal.N)
+        b = live.register(1, 2, Cardinal.N)
+        first = live.submit(a, "M")
+        second = live.submit(a, "R")
+        await asyncio.sleep(0)
+        assert not second.done()
+        live.submit(b, "M")
+        assert await first == (1, 2, Cardinal.N)
+        assert await second == (1, 2, Cardinal.E)
+
+    asyncio.run(run())
+
+
+def test_deadlock_fails_the_cycle():
+    async def run():
+        live = LiveController(MowController(5, 5, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS))
+        a = live.register(1, 1, Cardinal.N)
+        b = live.register(1, 2, Cardinal.S)
+        results = await asyncio.gather(live.move(a, "M"), live.move(b, "M"), return_exceptions=True)
+        assert all(isinstance(r, MowersDeadlocked) for r in results)
+        assert live.controller.deadlocks == [[b, a]]
+        assert live.controller.wait_for == {}
+        # Both can carry on with new commands
+        assert await live.move(a, "RM") == (2, 1, Cardinal.E)
+        assert await live.move(b, "M") == (1, 1, Cardinal.S)
+
+    asyncio.run(run())
+
+
+def test_wait_timeout():
+    async def run():
+        live = LiveController(MowController(5, 5, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS), wait_timeout=0.01)
+        a = live.register(1, 1, Cardinal.N)
+        live.register(1, 2, Cardinal.N)
+        with pytest.raises(asyncio.TimeoutError):
+            await live.move(a, "M")
+        assert live.controller.wait_for == {}
+        assert live.state(a) == (1, 1, Cardinal.N)
+
+    asyncio.run(run())
+
+
+def test_abort_fails_the_command():
+    async def run():
+        live = LiveController(MowController(5, 5, collition_protocol=CollitionProtocols.ABORT_ON_COLLITIONS))
+        a = live.register(0, 0, Cardinal.S)
+        with pytest.raises(Exception):
+            await live.move(a, "M")
+        assert await live.move(a, "LLM") == (0, 1, Cardinal.N)
+        with pytest.raises(PlaceOccupied):
+            live.register(0, 1, Cardinal.N)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("unix", [False, True])
+def test_server(tmp_path, unix):
+    async def run():
+        live = LiveController(MowController(5, 5))
+        path = str(tmp_path / "live.sock") if unix else None
+        server = await serve(live, unix_path=path)
+        async with server:
+            if unix:
+                client = Client(*await asyncio.open_unix_connection(path))
+            else:
+                client = Client(*await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1]))
+            assert await client.request("REGISTER 1 2 N") == "OK 0"
+            assert await client.request("REGISTER 3 3 E") == "OK 1"
+            assert (await client.request("REGISTER 1 2 N")).startswith("ERR PlaceOccupied")
+            replies = await asyncio.gather(client.request("MOVE 0 LMLMLMLMM"), client.request("MOVE 1 MMRMMRMRRM"))
+            assert replies == ["OK 1 3 N", "OK 5 1 E"]
+            assert await client.request("STATE 0") == "OK 1 3 N"
+            assert (await client.request("FLY 0")).startswith("ERR")
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_load_generator():
+    results = asyncio.run(run_local(CollitionProtocols.STOP_ON_COLLITIONS, fleet=30, commands=3, connections=2, plateau_size=10))
+    assert results["fleet"] == 30
+    assert results["commands"] == 90
+    assert results["errors"] == 0
+    assert results["p99_ms"] >= results["p50_ms"] > 0
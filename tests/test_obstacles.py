@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from mowhive import Cardinal, MowController, read_input
+from mowhive.errors import PlaceOccupied, UnknownObstacleinPath
+from mowhive.mowerstate import CollitionProtocols, UnknownObstacle
+from mowhive.obstacles import ObstacleMap
+
+RASTER = [
+    "..#..",
+    ".....",
+    ".##..",
+    ".....",
+]
+
+
+def test_raster_and_rectangles_agree():
+    raster = ObstacleMap.from_raster(RASTER)
+    rectangles = ObstacleMap.from_rectangles(4, 3, [(2, 3, 2, 3), (1, 1, 2, 1)])
+    assert (raster.width, raster.height) == (5, 4)
+    assert raster.bits == rectangles.bits
+    assert (2, 3) in raster and (1, 1) in raster and (2, 1) in raster
+    assert (0, 0) not in raster and (3, 1) not in raster
+
+
+def test_large_rectangle():
+    obstacles = ObstacleMap.from_rectangles(99, 9, [(3, 2, 90, 4), (-5, 8, 200, 20)])
+    cells = {(x, y) for x in range(100) for y in range(10) if obstacles.is_blocked(x, y)}
+    assert cells == {(x, y) for x in range(3, 91) for y in range(2, 5)} | {(x, y) for x in range(100) for y in (8, 9)}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_free_run_matches_cell_by_cell(seed):
+    rng = random.Random(seed)
+    obstacles = ObstacleMap(40, 30)
+    for _ in range(60):
+        obstacles.add(rng.randint(0, 40), rng.randint(0, 30))
+    for _ in range(200):
+        x, y = rng.randint(0, 40), rng.randint(0, 30)
+        dx, dy = rng.choice([(0, 1), (1, 0), (0, -1), (-1, 0)])
+        limit = 40 - x if dx > 0 else x if dx < 0 else 30 - y if dy > 0 else y
+        limit = rng.randint(0, limit)
+        expected = 0
+        while expected < limit and not obstacles.is_blocked(x + dx * (expected + 1), y + dy * (expected + 1)):
+            expected += 1
+        assert obstacles.free_run(x, y, dx, dy, limit) == expected
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_save_and_load(tmp_path, use_mmap):
+    path = str(tmp_path / "map.bin")
+    ObstacleMap.from_raster(RASTER).save(path)
+    loaded = ObstacleMap.load(path, use_mmap=use_mmap)
+    assert (loaded.width, loaded.height) == (5, 4)
+    assert bytes(loaded.bits) == bytes(ObstacleMap.from_raster(RASTER).bits)
+    assert loaded.free_run(0, 1, 1, 0, 4) == 0
+    assert loaded.free_run(2, 2, 0, 1, 1) == 0
+
+
+def test_mower_hits_obstacle():
+    mow_hive = MowController(4, 3, obstacles=ObstacleMap.from_raster(RASTER))
+    mow_hive.register_mower(0, 1, Cardinal.E)
+    result = mow_hive.move_mower(0)
+    assert type(result) is UnknownObstacle
+    assert mow_hive.show_current_state() == ["0 1 E"]
+    with pytest.raises(PlaceOccupied):
+        mow_hive.register_mower(2, 3, Cardinal.N)
+
+
+@pytest.mark.parametrize("protocol,expected", [
+    (CollitionProtocols.STOP_ON_COLLITIONS, ["1 2 E", "3 3 N"]),
+    (CollitionProtocols.AWAIT_ON_COLLITIONS, ["1 2 E", "3 3 N"]),
+])
+def test_swarm_skips_obstacles(protocol, expected):
+    mow_hive = MowController(4, 3, collition_protocol=protocol, obstacles=ObstacleMap.from_raster(RASTER))
+    read_input(["0 0 N", "MMRM", "3 0 N", "MMMLMRM"], mow_hive)
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == expected
+
+
+def test_abort_on_obstacle():
+    mow_hive = MowController(4, 3, collition_protocol=CollitionProtocols.ABORT_ON_COLLITIONS, obstacles=ObstacleMap.from_raster(RASTER))
+    read_input(["0 1 E", "M"], mow_hive)
+    with pytest.raises(UnknownObstacleinPath):
+        mow_hive.move_swarm()
+
+
+def test_batch_engine_with_obstacles():
+    from mowhive.engine import run_batch
+    rng = random.Random(7)
+    obstacles = ObstacleMap.from_rectangles(20, 20, [(5, 5, 8, 12), (14, 0, 15, 3)])
+    mowers = []
+    for x in range(0, 21, 2):
+        mowers.append(f"{x} 20 {rng.choice('NESW')}")
+        mowers.append("".join(rng.choices("MMMLR", k=60)))
+    states = []
+    for batch in (False, True):
+        mow_hive = MowController(20, 20, obstacles=obstacles)
+        read_input(mowers, mow_hive)
+        run_batch(mow_hive) if batch else mow_hive.move_swarm()
+        states.append(mow_hive.show_current_state())
+    assert states[0] == states[1]
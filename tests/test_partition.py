@@ -0,0 +1,41 @@
+import pytest
+
+from mowhive import Cardinal, MowController, read_input
+from mowhive.mowerstate import CollitionProtocols
+from mowhive.obstacles import ObstacleMap
+from mowhive.partition import move_swarm_partitioned, partition, reachable_box
+from tests.conftest import scenario
+
+
+def test_reachable_box():
+    mow_hive = MowController(9, 9)
+    read_input(["5 5 N", "MMRMLLLMMM"], mow_hive)
+    assert reachable_box(mow_hive.mowers[0]) == (5, 2, 6, 7)
+    mow_hive.register_mower(0, 0, Cardinal.E)
+    assert reachable_box(mow_hive.mowers[1]) == (0, 0, 0, 0)
+
+
+def test_partition_merges_overlapping_boxes():
+    boxes = [(0, 0, 2, 2), (5, 5, 6, 6), (2, 2, 4, 4), (10, 0, 11, 1), (4, 0, 4, 0), (6, 6, 6, 9)]
+    assert partition(boxes) == [[0, 2], [1, 5], [3], [4]]
+
+
+@pytest.mark.parametrize("protocol", [CollitionProtocols.STOP_ON_COLLITIONS, CollitionProtocols.AWAIT_ON_COLLITIONS])
+@pytest.mark.parametrize("seed,workers", [(0, 1), (1, 1), (2, 2), (3, 1)])
+def test_partitioned_matches_move_swarm(protocol, seed, workers):
+    lines = scenario(seed, 30, 80, 12, moves="MMLR")
+    obstacles = ObstacleMap.from_rectangles(30, 30, [(10, 10, 12, 12)])
+    reference = MowController(30, 30, collition_protocol=protocol, ignore_unregisterable_mowers=True, obstacles=obstacles)
+    read_input(lines, reference)
+    reference.move_swarm()
+
+    mow_hive = MowController(30, 30, collition_protocol=protocol, ignore_unregisterable_mowers=True, obstacles=obstacles)
+    read_input(lines, mow_hive)
+    groups = move_swarm_partitioned(mow_hive, workers=workers, chunksize=4)
+
+    assert len(groups) > 1
+    assert mow_hive.show_current_state() == reference.show_current_state()
+    assert mow_hive.occupancy == reference.occupancy
+    assert mow_hive.wait_for == reference.wait_for
+    assert sorted(mow_hive.deadlocks) == sorted(reference.deadlocks)
+    assert [m.desired_path for m in mow_hive.mowers] == [m.desired_path for m in reference.mowers]
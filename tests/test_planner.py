@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from mowhive import Cardinal, MowController, PlaceOccupied, read_input
+from mowhive.mowerstate import CollitionProtocols, Movements
+from mowhive.obstacles import ObstacleMap
+from mowhive.planner import FOREVER, Planner, ReservationTable, boustrophedon
+from mowhive.trace import TraceRecorder
+
+
+def test_reservation_table():
+    table = ReservationTable()
+    table.reserve((1, 1), 0, 5, 0)
+    table.reserve((1, 1), 8, FOREVER, 1)
+    assert not table.is_free((1, 1), 4, 1)
+    assert table.is_free((1, 1), 4, 0)
+    assert table.is_free((1, 1), 5, 2)
+    assert not table.is_free((1, 1), 100, 2)
+    assert table.free_from((1, 1), 5, 1)
+    assert not table.free_from((1, 1), 5, 2)
+    table.release((1, 1), 1)
+    assert table.free_from((1, 1), 5, 2)
+    assert len(table) == 1
+
+
+def test_boustrophedon():
+    assert boustrophedon((1, 1, 3, 2)) == [(1, 1), (2, 1), (3, 1), (3, 2), (2, 2), (1, 2)]
+
+
+def test_shortest_route():
+    mow_hive = MowController(9, 9)
+    planner = Planner(mow_hive, weight=1)
+    planner.add_target(1, 2, Cardinal.S, (4, 6))
+    path, = planner.plan()
+    # Turn east, 3 cells, turn north, 4 cells
+    assert len(path) == 1 + 3 + 1 + 4
+    planner.register()
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state()[0].startswith("4 6 ")
+
+
+def test_route_around_obstacles():
+    obstacles = ObstacleMap.from_rectangles(9, 9, [(0, 4, 7, 4)])
+    mow_hive = MowController(9, 9, obstacles=obstacles)
+    planner = Planner(mow_hive, weight=1)
+    planner.add_target(0, 0, Cardinal.N, (0, 8))
+    path, = planner.plan()
+    assert path.count(Movements.M) == 8 + 2 * 8
+    assert planner.field_misses == 1
+    planner.register()
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state()[0].startswith("0 8 ")
+
+
+def test_unreachable_target():
+    obstacles = ObstacleMap.from_rectangles(9, 9, [(0, 4, 9, 4)])
+    mow_hive = MowController(9, 9, obstacles=obstacles)
+    planner = Planner(mow_hive)
+    planner.add_target(0, 0, Cardinal.N, (5, 5))
+    planner.add_target(1, 0, Cardinal.N, (1, 3))
+    assert planner.plan()[0] is None
+    assert planner.plan()[1] is not None
+    assert planner.register() == [True, True]
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == ["0 0 N", "1 3 N"]
+
+
+def test_add_checks_cells():
+    obstacles = ObstacleMap.from_rectangles(9, 9, [(5, 5, 5, 5)])
+    mow_hive = MowController(9, 9, obstacles=obstacles)
+    mow_hive.register_mower(0, 0, Cardinal.N)
+    planner = Planner(mow_hive)
+    planner.add_target(1, 1, Cardinal.N, (2, 2))
+    for cell in [(0, 0), (1, 1), (5, 5), (10, 0)]:
+        with pytest.raises(PlaceOccupied):
+            planner.add_target(*cell, Cardinal.N, (3, 3))
+
+
+def test_needs_finished_mowers():
+    mow_hive = MowController(9, 9)
+    read_input(["0 0 N", "MM"], mow_hive)
+    with pytest.raises(ValueError):
+        Planner(mow_hive)
+    mow_hive.move_swarm()
+    planner = Planner(mow_hive)
+    planner.add_target(0, 0, Cardinal.E, (5, 0))
+    mow_hive.register_mower(9, 9, Cardinal.N)
+    with pytest.raises(ValueError):
+        planner.register()
+
+
+@pytest.mark.parametrize("protocol", list(CollitionProtocols))
+@pytest.mark.parametrize("seed", range(3))
+def test_fleet_never_obstructed(protocol, seed):
+    rng = random.Random(seed)
+    size = 30
+    obstacles = ObstacleMap.from_rectangles(size, size, [(10, 0, 11, 20), (20, 10, 21, 30)])
+    mow_hive = MowController(size, size, collition_protocol=protocol, obstacles=obstacles)
+    mow_hive.register_mower(15, 15, Cardinal.N)
+    planner = Planner(mow_hive)
+    free = [(x, y) for x in range(size + 1) for y in range(size + 1) if not obstacles.is_blocked(x, y) and (x, y) != (15, 15)]
+    cells = rng.sample(free, 80)
+    starts, targets = cells[:40], cells[40:]
+    # A few mowers share targets, only the first one of them can get there
+    targets[5] = targets[6] = targets[7]
+    for start, target in zip(starts, targets):
+        planner.add_target(*start, rng.choice(list(Cardinal)), target)
+    paths = planner.plan()
+    assert planner.field_hits >= 2
+    planner.register()
+    stats = mow_hive.move_swarm(stats=True)
+    assert sum(stats.obstructions) == sum(stats.out_of_bounds) == sum(stats.obstacles) == 0
+    for m, target, path in zip(mow_hive.mowers[1:], targets, paths):
+        if path is not None:
+            assert (m.location.x, m.location.y) == target
+    assert sum(path is None for path in paths) >= 2
+
+
+def test_coverage_sweep():
+    obstacles = ObstacleMap.from_rectangles(12, 12, [(4, 4, 5, 6)])
+    mow_hive = MowController(12, 12, obstacles=obstacles)
+    recorder = TraceRecorder(mow_hive)
+    planner = Planner(mow_hive)
+    planner.add_coverage(0, 0, Cardinal.E, (2, 2, 8, 8))
+    planner.add_coverage(12, 12, Cardinal.W, (9, 0, 14, 3))
+    planner.register()
+    stats = mow_hive.move_swarm(stats=True)
+    assert sum(stats.obstructions) == 0
+
+    first = {(x, y) for x, y, _ in recorder.path(0)}
+    area = {(x, y) for x in range(2, 9) for y in range(2, 9) if not obstacles.is_blocked(x, y)}
+    assert area <= first
+    second = {(x, y) for x, y, _ in recorder.path(1)}
+    assert {(x, y) for x in range(9, 13) for y in range(0, 4)} <= second
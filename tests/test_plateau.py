@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from mowhive import MowController, read_input
+from mowhive.mowerstate import CollitionProtocols, UnknownObstacle
+from mowhive.obstacles import ObstacleMap
+from mowhive.plateau import Plateau, TiledBitmap
+
+
+def random_maps(seed, size, tile_size):
+    rng = random.Random(seed)
+    rectangles = []
+    for _ in range(15):
+        x, y = rng.randint(0, size[0]), rng.randint(0, size[1])
+        rectangles.append((x, y, x + rng.randint(0, 20), y + rng.randint(0, 3)))
+    tiled = TiledBitmap(size[0], size[1], tile_size=tile_size)
+    for r in rectangles:
+        tiled.add_rectangle(*r)
+    tiled.add(size[0], size[1])
+    dense = ObstacleMap.from_rectangles(size[0], size[1], rectangles)
+    dense.add(size[0], size[1])
+    return rng, tiled, dense
+
+
+@pytest.mark.parametrize("seed,tile_size", [(0, 8), (1, 16), (2, 64)])
+def test_tiled_bitmap_matches_dense_map(seed, tile_size):
+    size = (90, 50)
+    rng, tiled, dense = random_maps(seed, size, tile_size)
+    cells = {(x, y) for x in range(size[0] + 1) for y in range(size[1] + 1) if dense.is_blocked(x, y)}
+    assert set(tiled.cells()) == cells
+    for _ in range(300):
+        x, y = rng.randint(0, size[0]), rng.randint(0, size[1])
+        dx, dy = rng.choice([(0, 1), (1, 0), (0, -1), (-1, 0)])
+        limit = size[0] - x if dx > 0 else x if dx < 0 else size[1] - y if dy > 0 else y
+        assert tiled.free_run(x, y, dx, dy, limit) == dense.free_run(x, y, dx, dy, limit)
+
+
+def test_tiles_are_allocated_lazily():
+    tiled = TiledBitmap(10**6, 10**6)
+    assert tiled.nbytes() == 0
+    tiled.add_rectangle(500_000, 500_000, 500_010, 500_002)
+    assert len(tiled.tiles) == 1
+    assert tiled.free_run(0, 500_001, 1, 0, 10**6) == 499_999
+
+
+def test_plateau_bounds():
+    plateau = Plateau(5, 3)
+    assert plateau.contains(5, 3) and not plateau.contains(6, 0) and not plateau.contains(0, -1)
+    assert plateau.free_run(0, 0, 1, 0) == 5
+    assert plateau.free_run(0, 0, 0, -1) == 0
+    assert plateau.free_run(-1, 2, 1, 0) == 6
+    assert plateau.free_run(7, 2, -1, 0) == 0
+
+
+def test_huge_sparse_plateau():
+    mow_hive = MowController(10**6, 10**6, collition_protocol=CollitionProtocols.AWAIT_ON_COLLITIONS)
+    mow_hive.plateau.add_obstacles([(800_000, 0, 800_000, 10)])
+    read_input(["0 5 E", "M" * 900_000, "999999 999999 S", "MMMM"], mow_hive)
+    mow_hive.move_swarm()
+    assert mow_hive.show_current_state() == ["799999 5 E", "999999 999995 S"]
+    assert type(mow_hive.move_mower(0)) is UnknownObstacle
+    assert mow_hive.obstacles.nbytes() < 10_000
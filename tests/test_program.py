@@ -0,0 +1,37 @@
+import pytest
+
+from mowhive import Cardinal, Coord, Mower, Movements
+from mowhive.mowerstate import PathProgram
+
+
+@pytest.mark.parametrize("line,expected_ops", [
+    ("", []),
+    ("MMM", [3]),
+    ("LLL", [-13]),
+    ("LR", [-8]),
+    ("MLRM", [1, -8, 1]),
+    ("LMLMLMLMM", [-7, 1, -7, 1, -7, 1, -7, 2]),
+    ("RRMMMMRRRRL", [-10, 4, -23]),
+])
+def test_compile_folds_rotations_and_merges_moves(line, expected_ops):
+    assert list(PathProgram.from_string(line).ops) == expected_ops
+    assert list(PathProgram.compile([Movements[c] for c in line]).ops) == expected_ops
+    # The remaining movements compile back to the same program
+    assert list(PathProgram.compile(PathProgram.from_string(line).remaining()).ops) == expected_ops
+
+
+def test_unknown_movement_is_rejected():
+    with pytest.raises(KeyError):
+        PathProgram.from_string("MMX")
+
+
+def test_remaining_path_follows_program_counter():
+    m = Mower(Coord(0,0), Cardinal.N, [Movements.M, Movements.M, Movements.M, Movements.L, Movements.R, Movements.R])
+    assert m.desired_path == [Movements.M, Movements.M, Movements.M, Movements.R, Movements.R, Movements.L]
+    m.program.offset = 2
+    assert m.desired_path == [Movements.M, Movements.R, Movements.R, Movements.L]
+    m.program.pc = 2
+    m.program.offset = 0
+    assert m.desired_path == []
+    assert m.program.finished()
+    assert Mower(Coord(0,0), Cardinal.N).desired_path is None
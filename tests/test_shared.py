@@ -0,0 +1,124 @@
+import random
+import sys
+import threading
+
+import pytest
+
+from mowhive import Cardinal, MowController, PlaceOccupied
+from mowhive.mowerstate import Movements, ObstructingMower
+from mowhive.obstacles import ObstacleMap
+from mowhive.shared import ConcurrentMowController
+
+
+def run_threads(target, n):
+    threads = [threading.Thread(target=target, args=(t,)) for t in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+    assert not any(t.is_alive() for t in threads)
+
+
+def assert_consistent(controller):
+    assert len(controller.occupancy) == len(controller.mowers)
+    for i, m in enumerate(controller.mowers):
+        assert controller.occupancy[(m.location.x, m.location.y)] == i
+
+
+@pytest.mark.parametrize("stripes", [1, 4, 256])
+def test_single_thread_matches_plain_controller(stripes):
+    rng = random.Random(stripes)
+    obstacles = ObstacleMap.from_rectangles(12, 12, [(5, 5, 6, 6)])
+    plain = MowController(12, 12, ignore_unregisterable_mowers=True, obstacles=obstacles)
+    shared = ConcurrentMowController(12, 12, ignore_unregisterable_mowers=True, obstacles=obstacles, stripes=stripes, region_size=2)
+    for _ in range(30):
+        x, y, o = rng.randint(0, 12), rng.randint(0, 12), rng.choice(list(Cardinal))
+        assert plain.register_mower(x, y, o) == shared.register_mower(x, y, o)
+    for _ in range(2000):
+        i = rng.randrange(len(plain.mowers))
+        op = rng.choice("MMMLR")
+        if op == "M":
+            a, b = plain.move_mower(i), shared.move_mower(i)
+            assert type(a) is type(b)
+            if isinstance(a, ObstructingMower):
+                assert a.mow_int == b.mow_int
+        else:
+            plain.rotate_mower(i, Movements[op])
+            shared.rotate_mower(i, Movements[op])
+    assert plain.show_current_state() == shared.show_current_state()
+    assert plain.occupancy == shared.occupancy
+
+
+def test_concurrent_registrations():
+    controller = ConcurrentMowController(20, 20, ignore_unregisterable_mowers=True, stripes=8)
+    cells = [(x, y) for x in range(21) for y in range(21)]
+    won = [0] * 8
+
+    def worker(t):
+        # Every thread tries every cell, in its own order
+        order = cells[:]
+        random.Random(t).shuffle(order)
+        for x, y in order:
+            won[t] += controller.register_mower(x, y, Cardinal.N)
+
+    run_threads(worker, 8)
+    assert sum(won) == len(cells) == len(controller.mowers)
+    assert_consistent(controller)
+    with pytest.raises(PlaceOccupied):
+        ConcurrentMowController(5, 5, obstacles=ObstacleMap.from_rectangles(5, 5, [(0, 0, 0, 0)])).register_mower(0, 0, Cardinal.N)
+
+
+@pytest.fixture
+def frequent_switches():
+    # Switch threads as often as possible, so races have a chance to show up under the GIL
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("stripes", [1, 16])
+def test_concurrent_moves_keep_occupancy(frequent_switches, stripes):
+    controller = ConcurrentMowController(15, 15, stripes=stripes, region_size=2)
+    rng = random.Random(0)
+    for x, y in rng.sample([(x, y) for x in range(16) for y in range(16)], 120):
+        controller.register_mower(x, y, rng.choice(list(Cardinal)))
+
+    def worker(t):
+        # Threads share mowers, so the same mower is also moved from several threads at once
+        rng = random.Random(t)
+        for _ in range(3000):
+            i = rng.randrange(len(controller.mowers))
+            if rng.random() < 0.7:
+                controller.move_mower(i)
+            else:
+                controller.rotate_mower(i, rng.choice([Movements.L, Movements.R]))
+
+    run_threads(worker, 8)
+    assert_consistent(controller)
+
+
+def test_crossing_moves_do_not_deadlock(frequent_switches):
+    # Every move crosses a region border, two mowers go back and forth in opposite directions
+    controller = ConcurrentMowController(3, 0, stripes=2, region_size=1)
+    controller.register_mower(0, 0, Cardinal.E)
+    controller.register_mower(3, 0, Cardinal.W)
+    assert controller.stripe(1, 0) != controller.stripe(2, 0)
+
+    def worker(t):
+        for _ in range(5000):
+            controller.move_mower(t)
+            controller.rotate_mower(t, Movements.L)
+            controller.rotate_mower(t, Movements.L)
+
+    run_threads(worker, 2)
+    assert_consistent(controller)
+    x, y, o = controller.mower_state(0)
+    assert 0 <= x <= 3 and o in (Cardinal.E, Cardinal.W)
+
+
+def test_stripes_must_be_powers_of_2():
+    with pytest.raises(ValueError):
+        ConcurrentMowController(5, 5, stripes=12)
+    with pytest.raises(ValueError):
+        ConcurrentMowController(5, 5, region_size=3)
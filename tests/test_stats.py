@@ -0,0 +1,50 @@
+import io
+
+from mowhive import MowController, read_input
+from mowhive.mowerstate import CollitionProtocols
+from mowhive.stats import SwarmStats
+from mowhive.utils import stream_swarm
+
+
+def run(case, protocol, stats=True):
+    dimx, dimy = map(int, case[0].split(" "))
+    mow_hive = MowController(dimx, dimy, collition_protocol=protocol)
+    read_input(case[1:], mow_hive)
+    return mow_hive.move_swarm(stats)
+
+
+def test_stats_disabled_by_default():
+    assert run(["2 2", "0 0 N", "MMM"], CollitionProtocols.STOP_ON_COLLITIONS, stats=False) is None
+
+
+def test_stop_stats():
+    stats = run(["2 2", "0 0 N", "MMMRMMM", "1 1 N", "L"], CollitionProtocols.STOP_ON_COLLITIONS)
+    assert stats.collition_protocol is CollitionProtocols.STOP_ON_COLLITIONS
+    assert stats.mower(0) == {"successes": 5, "out_of_bounds": 2, "obstructions": 0, "obstacles": 0, "defers": 0, "requeues": 0}
+    assert stats.mower(1)["successes"] == 1
+    assert stats.totals()["out_of_bounds"] == 2
+    assert stats.phases["simulate"] >= 0
+
+
+def test_successes_count_every_rotation():
+    # LR and LLL fold into a single opcode, or none, but every movement counts
+    stats = run(["2 2", "0 0 N", "LR", "1 1 N", "LLL", "2 2 N", "LRMLLR"], CollitionProtocols.STOP_ON_COLLITIONS)
+    assert stats.successes.tolist() == [2, 3, 5]
+    assert stats.out_of_bounds.tolist() == [0, 0, 1]
+
+
+def test_await_stats():
+    stats = run(["2 2", "0 0 N", "MMRMMRMRM", "0 2 E", "LLMMRMRM"], CollitionProtocols.AWAIT_ON_COLLITIONS)
+    assert stats.defers.tolist() == [2, 0]
+    assert stats.requeues.tolist() == [1, 0]
+    assert stats.obstructions.tolist() == [2, 0]
+    assert stats.longest_chains[0] == [0, 1]
+
+
+def test_stream_stats_phases():
+    stats = SwarmStats()
+    mow_hive = MowController(5, 5)
+    stream_swarm(io.BytesIO(b"1 2 N\nLMLMLMLMM\n3 3 E\nMMRMMRMRRM\n"), mow_hive, stats)
+    assert set(stats.phases) == {"register", "parse", "simulate"}
+    assert stats.totals()["successes"] == 19
+    assert stats.report()[0] == "protocol STOP_ON_COLLITIONS, 2 mowers"
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from mowhive import Cardinal, MowController, Movements, read_input
+from mowhive.mowerstate import CollitionProtocols
+from mowhive.obstacles import ObstacleMap
+from mowhive.trace import FORWARD, KEYFRAME_INTERVAL, REJECTED_OBSTACLE, REJECTED_OUT_OF_BOUNDS, RIGHT, LEFT, TraceRecorder
+from tests.conftest import scenario
+
+
+@pytest.mark.parametrize("compact_fleet", [False, True])
+@pytest.mark.parametrize("protocol", list(CollitionProtocols))
+@pytest.mark.parametrize("seed", [0, 1])
+def test_replay_matches_run(protocol, seed, compact_fleet):
+    obstacles = ObstacleMap.from_rectangles(10, 10, [(4, 4, 5, 5)])
+    mow_hive = MowController(10, 10, collition_protocol=protocol, compact_fleet=compact_fleet, obstacles=obstacles)
+    read_input(scenario(seed, 10, 25, 40, blocked=obstacles, full_paths=True), mow_hive)
+    recorder = TraceRecorder(mow_hive)
+    try:
+        stats = mow_hive.move_swarm(stats=True)
+    except Exception:
+        stats = None
+
+    for i, state in enumerate(mow_hive.show_current_state()):
+        x, y, o = recorder.state_at(i, recorder.steps(i))
+        assert f"{x} {y} {o.name}" == state
+        assert list(recorder.path(i))[-1] == (x, y, o)
+        # Every cell of the path is next to the previous one
+        path = list(recorder.path(i))
+        assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) <= 1 for a, b in zip(path, path[1:]))
+
+    if stats is not None:
+        for i in range(len(mow_hive.mowers)):
+            counts = recorder.counts(i)
+            assert counts["out_of_bounds"] == stats.out_of_bounds[i]
+            assert counts["obstacle"] == stats.obstacles[i]
+            assert counts["obstructed"] + counts["deferred"] == stats.obstructions[i]
+            assert counts["deferred"] == stats.defers[i]
+            assert counts["requeued"] == stats.requeues[i]
+
+
+def test_random_access_and_packing():
+    mow_hive = MowController(50, 50)
+    rng = random.Random(7)
+    path = "".join(rng.choices("MMLR", k=3000))
+    read_input(["25 25 N", path], mow_hive)
+    recorder = TraceRecorder(mow_hive)
+    mow_hive.move_swarm()
+
+    steps = recorder.steps(0)
+    assert steps > 2 * KEYFRAME_INTERVAL
+    assert len(recorder.traces[0].keyframes) > 0
+    states = list(recorder.path(0))
+    assert len(states) == steps + 1
+    for step in [0, 1, KEYFRAME_INTERVAL - 1, KEYFRAME_INTERVAL, KEYFRAME_INTERVAL + 1, steps // 2, steps - 1, steps]:
+        assert recorder.state_at(0, step) == states[step]
+    # 3 bits per step
+    assert recorder.nbytes() <= (3 * steps) // 8 + 1
+    assert recorder.codes(0, 10, 20) == recorder.codes(0)[10:20]
+
+
+def test_single_step_api_and_detach():
+    mow_hive = MowController(2, 2)
+    mow_hive.register_mower(0, 0, Cardinal.N)
+    recorder = TraceRecorder(mow_hive)
+    mow_hive.register_mower(2, 2, Cardinal.S)
+    mow_hive.move_mower(0)
+    mow_hive.move_mower(0)
+    mow_hive.move_mower(0)
+    mow_hive.rotate_mower(0, Movements.R)
+    mow_hive.rotate_mower(0, Movements.L)
+    mow_hive.rotate_mower(1, Movements.L)
+    assert recorder.codes(0) == [FORWARD, FORWARD, REJECTED_OUT_OF_BOUNDS, RIGHT, LEFT]
+    assert recorder.state_at(0, 2) == (0, 2, Cardinal.N)
+    assert recorder.state_at(1, 1) == (2, 2, Cardinal.E)
+
+    recorder.detach()
+    assert mow_hive.trace is None
+    mow_hive.move_mower(1)
+    assert recorder.steps(1) == 1
+
+
+def test_skipped_moves_are_recorded():
+    obstacles = ObstacleMap.from_rectangles(5, 5, [(3, 0, 3, 0)])
+    mow_hive = MowController(5, 5, obstacles=obstacles)
+    read_input(["0 0 E", "MMMMMLM"], mow_hive)
+    recorder = TraceRecorder(mow_hive)
+    mow_hive.move_swarm()
+    assert recorder.codes(0) == [FORWARD, FORWARD] + [REJECTED_OBSTACLE] * 3 + [LEFT, FORWARD]
+    assert recorder.state_at(0, recorder.steps(0)) == (2, 1, Cardinal.N)